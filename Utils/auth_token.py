@@ -1,15 +1,27 @@
 import os
+import json
+import base64
 from pathlib import Path
 import time
-import pytest
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv, set_key
 
 # Load environment variables once at the top level
 load_dotenv()
-from playwright.sync_api import Page, expect
+from Utils.rag_respose import refresh_env_values
+from Utils.file_lock import file_lock
 
+if TYPE_CHECKING:
+    from playwright.sync_api import Page
+
+LOCAL_LIGHTSPEED_URL = "http://localhost:7007/api/lightspeed"
+
+
+def get_auth_token(page: "Page") -> None:
+    # Playwright is imported only when a token actually has to be fetched
+    from playwright.sync_api import expect
 
-def get_auth_token(page: Page) -> None:
     auth_token = None
 
     def handle_request(request):
@@ -38,18 +50,95 @@ def get_auth_token(page: Page) -> None:
     except Exception as e:
         print(f"Navigation or interaction failed: {e}")
 
-    # Wait to allow additional requests/responses to complete
-    page.wait_for_timeout(3000)
+    # Allow additional requests/responses up to 3 seconds, stopping as soon as a token is seen
+    for _ in range(30):
+        if auth_token is not None:
+            break
+        page.wait_for_timeout(100)
 
     return auth_token
 
-def replace_auth_token(page: Page) -> None:
-    token = get_auth_token(page)
-    assert token is not None, "❌ No authorization Bearer token found"
-    print("✓ Successfully extracted authorization Bearer token")
+@contextmanager
+def open_browser_page(headless: bool = True):
+    # A standalone Playwright page for callers outside pytest-playwright, such as the engine CLI
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch(headless=headless)
+        try:
+            yield browser.new_context().new_page()
+        finally:
+            browser.close()
+
+def get_token_expiry(token: str) -> float | None:
+    # Reads the JWT `exp` claim without verifying the signature
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return float(exp) if exp is not None else None
+    except (IndexError, ValueError, TypeError, AttributeError):
+        return None
+
+
+class BearerTokenProvider:
+    # Session-wide bearer token shared by all pytest-xdist workers through a locked cache file.
+    # A browser page is only opened when no cached token is valid for another refresh_skew seconds.
+    def __init__(self, cache_path: str | None = None, refresh_skew: float | None = None,
+                 max_age: float | None = None):
+        self.cache_path = Path(cache_path or os.getenv("BEARER_TOKEN_CACHE", ".bearer_token.json"))
+        self.lock_path = self.cache_path.with_name(self.cache_path.name + ".lock")
+        self.refresh_skew = refresh_skew if refresh_skew is not None else float(os.getenv("TOKEN_REFRESH_SKEW_SEC", "60"))
+        # Expiry assumed for tokens that are not JWTs
+        self.max_age = max_age if max_age is not None else float(os.getenv("TOKEN_MAX_AGE_SEC", "3600"))
+        self.token = None
+        self.expires_at = 0.0
+
+    def _is_fresh(self, expires_at: float) -> bool:
+        return expires_at - self.refresh_skew > time.time()
+
+    def _read_cache(self) -> dict | None:
+        try:
+            return json.loads(self.cache_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, token: str, expires_at: float):
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        tmp_path.write_text(json.dumps({"token": token, "expires_at": expires_at, "obtained_at": time.time()}))
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.cache_path)
+
+    def _adopt(self, token: str, expires_at: float) -> str:
+        self.token, self.expires_at = token, expires_at
+        if os.environ.get("BEARER_TOKEN") != token:
+            os.environ["BEARER_TOKEN"] = token
+            refresh_env_values()
+        return token
+
+    def get(self, page_factory) -> str:
+        # page_factory() returns a context manager yielding a Playwright Page
+        if self.token and self._is_fresh(self.expires_at):
+            return self.token
+
+        with file_lock(self.lock_path):
+            cached = self._read_cache()
+            if cached and self._is_fresh(cached["expires_at"]):
+                return self._adopt(cached["token"], cached["expires_at"])
+
+            env_token = os.getenv("BEARER_TOKEN")
+            env_expiry = get_token_expiry(env_token) if env_token else None
+            if env_expiry and self._is_fresh(env_expiry):
+                self._write_cache(env_token, env_expiry)
+                return self._adopt(env_token, env_expiry)
 
-    # Update .env file with the retrieved token
-    env_path = Path('.env')
-    set_key(str(env_path), 'BEARER_TOKEN', token)
-    print("✓ Updated BEARER_TOKEN in .env file")
+            print("🔐 Fetching a new Bearer token with Playwright")
+            with page_factory() as page:
+                token = get_auth_token(page)
+            assert token is not None, "❌ No authorization Bearer token found"
+            expires_at = get_token_expiry(token) or time.time() + self.max_age
 
+            set_key(str(Path('.env')), 'BEARER_TOKEN', token)
+            self._write_cache(token, expires_at)
+            print(f"✓ Cached Bearer token until {time.strftime('%H:%M:%S', time.localtime(expires_at))}")
+            return self._adopt(token, expires_at)
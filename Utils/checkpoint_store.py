@@ -0,0 +1,125 @@
+import os
+import copy
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from dataclasses import asdict
+from Utils.judge_cache import apply_verdict, metric_name
+from Utils.incremental import fingerprint
+from Utils.rag_respose import RagResult
+
+# Run-scoped checkpoints of every completed stage per question: the RAG answer ("rag")
+# and each metric verdict ("metric:<name>"). `pytest --resume <run-id>` reads them back
+# so an interrupted run continues where it stopped instead of asking the backend and
+# the judge again.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    run_id TEXT NOT NULL,
+    question TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    created REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (run_id, question, stage)
+);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_created ON checkpoints(created);
+"""
+
+
+def is_checkpointing_enabled() -> bool:
+    return os.getenv("CHECKPOINTS", "yes").lower() == "yes"
+
+
+class CheckpointStore:
+    def __init__(self, run_id: str, path: str | None = None):
+        self.run_id = run_id
+        self.scope = ""
+        self.path = Path(path or os.getenv("CHECKPOINT_DB", ".checkpoints.db"))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def scoped(self, scope: str) -> "CheckpointStore":
+        # A view on the same database whose stages are prefixed with scope, e.g. one per
+        # model in a matrix run, so the models' answers and verdicts don't overwrite each other
+        view = copy.copy(self)
+        view.scope = scope
+        return view
+
+    def _stage(self, stage: str) -> str:
+        return f"{self.scope}|{stage}" if self.scope else stage
+
+    def save(self, question: str, stage: str, data: dict):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (run_id, question, stage, created, data) VALUES (?, ?, ?, ?, ?)",
+                (self.run_id, question, self._stage(stage), time.time(), json.dumps(data))
+            )
+
+    def load_stage(self, question: str, stage: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM checkpoints WHERE run_id = ? AND question = ? AND stage = ?",
+                (self.run_id, question, self._stage(stage))
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def questions_with(self, stage: str) -> set:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question FROM checkpoints WHERE run_id = ? AND stage = ?", (self.run_id, self._stage(stage))
+            ).fetchall()
+        return {question for (question,) in rows}
+
+    def has_run(self) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM checkpoints WHERE run_id = ? LIMIT 1", (self.run_id,)
+            ).fetchone() is not None
+
+    def prune(self, keep_runs: int) -> int:
+        # Drops checkpoints of all but the most recent keep_runs runs (this one included)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM checkpoints WHERE run_id NOT IN ("
+                "  SELECT run_id FROM checkpoints GROUP BY run_id ORDER BY MAX(created) DESC LIMIT ?"
+                ") AND run_id != ?",
+                (keep_runs, self.run_id)
+            )
+            return cursor.rowcount
+
+    def fetch_rag(self, question: str, fetch):
+        # The checkpointed answer if there is one, otherwise fetch(question); only
+        # successful answers are kept, so failed requests are retried on resume
+        data = self.load_stage(question, "rag")
+        if data is not None:
+            return RagResult(**data)
+        result = fetch(question)
+        if result.ok:
+            self.save(question, "rag", asdict(result))
+        return result
+
+    # Same interface as JudgeCache, so measure_metrics can treat both as verdict sources
+    def load(self, metric, test_case) -> bool:
+        data = self.load_stage(test_case.input, f"metric:{metric_name(metric)}")
+        if data is None or data["fingerprint"] != fingerprint(test_case, [metric]):
+            return False
+        apply_verdict(metric, data)
+        return True
+
+    def store(self, metric, test_case):
+        if metric.score is None or getattr(metric, "error", None) is not None:
+            return
+        self.save(test_case.input, f"metric:{metric_name(metric)}", {
+            "score": metric.score,
+            "reason": metric.reason,
+            "success": metric.success,
+            "fingerprint": fingerprint(test_case, [metric]),
+        })
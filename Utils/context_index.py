@@ -0,0 +1,186 @@
+import os
+import re
+import json
+import time
+import argparse
+from pathlib import Path
+from collections import Counter
+import numpy as np
+from Utils.file_lock import file_lock
+
+# BM25 index over reference passages, stored as an inverted index of flat NumPy arrays:
+# the postings of term t are doc_ids/weights[term_ptr[t]:term_ptr[t + 1]], with the BM25
+# weight precomputed per (term, passage). Everything is memory-mapped on load, so
+# opening the index costs next to nothing and a query only touches its terms' postings.
+
+INDEX_VERSION = 1
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from how i if in is it its of on or so "
+    "that the their there these this to was what when where which who why will with you your".split()
+)
+CORPUS_SUFFIXES = (".txt", ".md", ".jsonl")
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def read_corpus(path) -> list[str]:
+    # .jsonl: one {"text": ...} per line; .txt/.md: passages separated by blank lines;
+    # a directory: every such file under it, in sorted order
+    path = Path(path)
+    files = sorted(p for p in path.rglob("*") if p.suffix in CORPUS_SUFFIXES) if path.is_dir() else [path]
+    passages = []
+    for file in files:
+        text = file.read_text(encoding="utf-8")
+        if file.suffix == ".jsonl":
+            passages += [json.loads(line)["text"] for line in text.splitlines() if line.strip()]
+        else:
+            passages += [" ".join(block.split()) for block in re.split(r"\n\s*\n", text) if block.strip()]
+    return passages
+
+
+def corpus_signature(path) -> list:
+    path = Path(path)
+    files = sorted(p for p in path.rglob("*") if p.suffix in CORPUS_SUFFIXES) if path.is_dir() else [path]
+    return [INDEX_VERSION] + [[str(f), f.stat().st_size, f.stat().st_mtime_ns] for f in files]
+
+
+class ContextIndex:
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        meta = json.loads((self.directory / "meta.json").read_text())
+        self.signature = meta["signature"]
+        self.vocabulary = json.loads((self.directory / "vocab.json").read_text())
+        self.term_ptr = np.load(self.directory / "term_ptr.npy", mmap_mode="r")
+        self.doc_ids = np.load(self.directory / "doc_ids.npy", mmap_mode="r")
+        self.weights = np.load(self.directory / "weights.npy", mmap_mode="r")
+        self.text_offsets = np.load(self.directory / "text_offsets.npy", mmap_mode="r")
+        self.texts = np.memmap(self.directory / "texts.bin", dtype=np.uint8, mode="r") \
+            if self.text_offsets[-1] else np.zeros(0, dtype=np.uint8)
+        self.n_docs = len(self.text_offsets) - 1
+
+    @classmethod
+    def build(cls, passages: list[str], directory, signature=None, k1: float = 1.5, b: float = 0.75) -> "ContextIndex":
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        vocabulary, term_ids, doc_ids, tfs, lengths = {}, [], [], [], []
+        for doc_id, passage in enumerate(passages):
+            counts = Counter(tokenize(passage))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        tfs = np.asarray(tfs, dtype=np.float32)
+        lengths = np.asarray(lengths, dtype=np.float32)
+        order = np.lexsort((doc_ids, term_ids))
+        term_ids, doc_ids, tfs = term_ids[order], doc_ids[order], tfs[order]
+
+        n_docs = len(passages)
+        df = np.bincount(term_ids, minlength=len(vocabulary)).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        avg_length = lengths.mean() if n_docs else 1.0
+        norm = k1 * (1 - b + b * lengths[doc_ids] / max(avg_length, 1e-9))
+        weights = (idf[term_ids] * tfs * (k1 + 1) / (tfs + norm)).astype(np.float32)
+        term_ptr = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+
+        encoded = [passage.encode("utf-8") for passage in passages]
+        text_offsets = np.concatenate([[0], np.cumsum([len(e) for e in encoded])]).astype(np.int64)
+
+        # Written under temporary names and renamed, so readers never see a half-built index
+        files = {
+            "term_ptr.npy": term_ptr, "doc_ids.npy": doc_ids,
+            "weights.npy": weights, "text_offsets.npy": text_offsets,
+        }
+        for name, array in files.items():
+            with open(directory / f"{name}.tmp", "wb") as handle:
+                np.save(handle, array)
+        (directory / "texts.bin.tmp").write_bytes(b"".join(encoded))
+        (directory / "vocab.json.tmp").write_text(json.dumps(vocabulary))
+        (directory / "meta.json.tmp").write_text(json.dumps({
+            "signature": signature, "n_docs": n_docs, "k1": k1, "b": b
+        }))
+        for name in list(files) + ["texts.bin", "vocab.json", "meta.json"]:
+            os.replace(directory / f"{name}.tmp", directory / name)
+        return cls(directory)
+
+    def passage(self, doc_id: int) -> str:
+        start, end = int(self.text_offsets[doc_id]), int(self.text_offsets[doc_id + 1])
+        return bytes(self.texts[start:end]).decode("utf-8")
+
+    def search(self, query: str, k: int = 3, min_score: float = 0.0) -> list[tuple[str, float]]:
+        # Only passages sharing a term with the query are scored, so cost follows the
+        # query terms' posting lists rather than the corpus size
+        term_ids = {self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary}
+        if not term_ids or k <= 0:
+            return []
+        postings = [slice(self.term_ptr[t], self.term_ptr[t + 1]) for t in term_ids]
+        docs = np.concatenate([self.doc_ids[s] for s in postings])
+        candidates, positions = np.unique(docs, return_inverse=True)
+        scores = np.bincount(positions, weights=np.concatenate([self.weights[s] for s in postings]))
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.passage(int(candidates[i])), float(scores[i])) for i in top if scores[i] > min_score]
+
+
+_index_cache = {}
+
+
+def get_context_index() -> ContextIndex | None:
+    # CONTEXT_CORPUS enables retrieval; the index is rebuilt only when the corpus files change
+    corpus = os.getenv("CONTEXT_CORPUS")
+    if not corpus:
+        return None
+    directory = Path(os.getenv("CONTEXT_INDEX_DIR", ".context_index"))
+    if directory not in _index_cache:
+        signature = corpus_signature(corpus)
+        with file_lock(directory.with_name(directory.name + ".lock")):
+            try:
+                index = ContextIndex(directory)
+                if index.signature != signature:
+                    raise ValueError("stale index")
+            except (OSError, ValueError, KeyError):
+                start = time.perf_counter()
+                index = ContextIndex.build(read_corpus(corpus), directory, signature)
+                print(f"✓ Indexed {index.n_docs} passages from {corpus} in {time.perf_counter() - start:.2f}s")
+        _index_cache[directory] = index
+    return _index_cache[directory]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the BM25 reference-context index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Index a corpus file or directory")
+    build_parser.add_argument("corpus")
+    build_parser.add_argument("--index", default=".context_index")
+    query_parser = subparsers.add_parser("query", help="Show the top-k passages for questions")
+    query_parser.add_argument("questions", nargs="+")
+    query_parser.add_argument("--index", default=".context_index")
+    query_parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        index = ContextIndex.build(read_corpus(args.corpus), args.index, corpus_signature(args.corpus))
+        print(f"✓ Indexed {index.n_docs} passages ({len(index.vocabulary)} terms) "
+              f"into {args.index} in {time.perf_counter() - start:.2f}s")
+    else:
+        index = ContextIndex(args.index)
+        start = time.perf_counter()
+        results = [index.search(question, args.k) for question in args.questions]
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for question, hits in zip(args.questions, results):
+            print(f"\n🔎 {question}")
+            for passage, score in hits:
+                print(f"  {score:6.2f}  {passage[:120]}")
+        print(f"\n⏱ {len(args.questions)} queries in {elapsed_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
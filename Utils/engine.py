@@ -0,0 +1,480 @@
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import datetime
+import threading
+import importlib
+import functools
+from pathlib import Path
+from dataclasses import dataclass, field
+from Utils.pre_checks import run_pre_checks
+from Utils.tracing import get_tracer
+from Utils.metric_runner import measure_metrics
+from Utils.repeated_trials import TrialSettings, run_trials, summarize_trials
+from Utils.incremental import is_incremental_mode, carry_over, collect_verdicts, fingerprint
+from Utils.model_matrix import (get_model_matrix, parse_model_matrix, result_key, index_previous,
+                                 is_matrix_result, score_label, compare_models, comparison_chart_specs,
+                                 model_comparison_html, unscored_result)
+
+# The evaluation pipeline behind test_lightspeedEvaludation.py, usable as a library and
+# as a CLI (`python -m Utils.engine`). Importing this module stays cheap: deepeval, the
+# judge pool, requests, NumPy, pandas, matplotlib and Playwright are imported only by
+# the stage that needs them (python -m Utils.startup_bench keeps an eye on that).
+
+# GEval criteria: score_data key -> (name, evaluation steps)
+GEVAL_CRITERIA = {
+    "informativeness": ("Informativeness", [
+        "Does the response provide sufficient and useful information?",
+        "Does the response go beyond generic statements and provide depth?"
+    ]),
+    "clarity": ("Clarity", [
+        "Is the response written in a clear and understandable manner?",
+        "Are technical or complex ideas explained in a way the target user can follow?"
+    ]),
+    "completeness": ("Completeness", [
+        "Does the response address all relevant aspects of the question?",
+        "Is any significant part of the question left unanswered?"
+    ]),
+    "tone_appropriateness": ("Tone Appropriateness", [
+        "Is the tone of the response suitable for the context?",
+        "Is the language professional, empathetic, or neutral as appropriate?"
+    ]),
+}
+SCORE_KEYS = ["relevancy", "bias", "faithfulness", "hallucination", *GEVAL_CRITERIA]
+# Order in which threshold failures are reported. glitch_check is the deterministic glitch
+# pre-check, asserted with the GEval criteria like the Output Glitch Check GEval it replaced
+ASSERT_ORDER = ["relevancy", "bias", *GEVAL_CRITERIA, "glitch_check", "faithfulness", "hallucination"]
+
+_preload = None
+
+
+def is_geval_enabled() -> bool:
+    return os.getenv("ENABLE_GENERAL_EVAL_METRICS", "no").lower() == "yes"
+
+
+def preload_judge_stack():
+    # deepeval takes over a second to import; starting it in the background lets the
+    # import overlap the first RAG call instead of delaying it
+    global _preload
+    if _preload is None:
+        _preload = threading.Thread(target=importlib.import_module, args=("deepeval.metrics",), daemon=True)
+        _preload.start()
+
+
+def wait_for_judge_stack():
+    # deepeval's circular imports break when two threads import it at once, so every
+    # deepeval import waits for the background one to finish
+    if _preload is not None:
+        _preload.join()
+
+
+def build_metrics(has_context: bool) -> dict:
+    # Fresh metric instances keyed like score_data; metrics keep their last score on the
+    # object, so every measurement (and every repeated trial) needs its own set
+    wait_for_judge_stack()
+    from deepeval.metrics import AnswerRelevancyMetric, BiasMetric, FaithfulnessMetric, HallucinationMetric, GEval
+    from deepeval.test_case import LLMTestCaseParams
+    from Utils.judge_pool import get_judge_model
+
+    # Judge pool over JUDGE_ENDPOINTS, or None for the default `deepeval set-ollama` judge
+    judge = get_judge_model()
+    metrics = {
+        "relevancy": AnswerRelevancyMetric(include_reason=True, model=judge),
+        "bias": BiasMetric(include_reason=True, model=judge),
+    }
+    if has_context:
+        metrics["faithfulness"] = FaithfulnessMetric(include_reason=True, model=judge)
+        metrics["hallucination"] = HallucinationMetric(include_reason=True, model=judge)
+    if is_geval_enabled():
+        for key, (name, steps) in GEVAL_CRITERIA.items():
+            metrics[key] = GEval(
+                name=name,
+                evaluation_steps=steps,
+                evaluation_params=[LLMTestCaseParams.ACTUAL_OUTPUT],
+                model=judge
+            )
+    return metrics
+
+
+def make_test_case(question: str, answer: str, context):
+    wait_for_judge_stack()
+    from deepeval.test_case import LLMTestCase
+
+    return LLMTestCase(input=question, actual_output=answer, context=context, retrieval_context=context)
+
+
+@dataclass
+class Evaluation:
+    question: str
+    status: str = "passed"        # passed | failed (thresholds) | error (RAG or pre-check) | skipped (no recording)
+    message: str = ""
+    score_data: dict | None = None
+    failures: list = field(default_factory=list)
+    duration: float = 0.0
+    model: str | None = None      # "provider/model" in a matrix run
+
+
+def evaluate_question(question: str, fetch=None, checkpoints=None, previous: dict | None = None,
+                      log=print, target=None) -> Evaluation:
+    # fetch(question, target=...) -> RagResult defaults to a direct RAG call; checkpoints is a
+    # CheckpointStore for resumable runs; previous is the question's latest history row;
+    # target is the ModelTarget of a matrix run (None: Model/Provider from .env)
+    from Utils.rag_respose import fetch_rag_answer, get_env_values
+    from Utils.rag_replay import is_replay_mode
+    from Utils.prompt_contexts import get_context
+
+    preload_judge_stack()
+    fetch = functools.partial(fetch or fetch_rag_answer, target=target)
+    label = target.label if target else None
+    if checkpoints is not None and target is not None:
+        checkpoints = checkpoints.scoped(label)
+    log("\n" + "=" * 100)
+    log(f"🚀 Testing question: {question}" + (f" [{label}]" if label else ""))
+
+    start_time = time.time()
+    with get_tracer().span("rag.get"):
+        # A resumed run (--resume) reuses the answer checkpointed by the interrupted session
+        rag_result = checkpoints.fetch_rag(question, fetch) if checkpoints else fetch(question)
+    response, rag_time = rag_result.answer, rag_result.rag_time
+
+    if not rag_result.ok:
+        # Retries are exhausted by now, so a failed answer fails the question; only a
+        # question without a recording in replay mode (the stub's 404) is skipped
+        if is_replay_mode() and rag_result.status == 404:
+            return Evaluation(question, "skipped", f"RAG response failed: {response}", model=label)
+        message = f"RAG response failed after {rag_result.attempts} attempt(s): {response}"
+        return Evaluation(question, "error", message, model=label)
+
+    log(f"\n📥 Model Response:\n{response}")
+
+    # Deterministic pre-checks run before any judge call; "fail" actions stop here
+    with get_tracer().span("pre_checks"):
+        pre_checks = run_pre_checks(response)
+    log(f"\n🧹 Pre-checks ({pre_checks.elapsed_ms} ms): {pre_checks.summary()}")
+    if pre_checks.failures:
+        message = "Pre-check failed: " + "; ".join(f"{r.name}: {r.reason}" for r in pre_checks.failures)
+        return Evaluation(question, "error", message, model=label)
+    if pre_checks.skipped_metrics:
+        log(f"⏭️ Skipping judge metrics after pre-checks: {', '.join(sorted(pre_checks.skipped_metrics))}")
+    glitch_check = pre_checks.results["glitch"]
+
+    context_retrieved = get_context(question)
+    if not context_retrieved:
+        log("\n⚠️ No context retrieved. Skipping faithfulness and hallucination metrics.\n")
+        context_retrieved = None
+    else:
+        log(f"\n📚 Context Retrieved:\n{context_retrieved}")
+
+    test_case = make_test_case(question, response, context_retrieved)
+
+    # Core metrics, faithfulness/hallucination when there is context, GEval when enabled;
+    # the glitch check is the deterministic pre-check
+    candidates = build_metrics(context_retrieved is not None)
+    measured = {key: metric for key, metric in candidates.items() if not pre_checks.skips(key)}
+    metrics = list(measured.values())
+    trial_settings = TrialSettings.from_env()
+
+    # Unchanged answers reuse the previous run's verdicts (INCREMENTAL_EVAL=yes, not with
+    # repeated trials); otherwise all applicable metrics run together, bounded by METRIC_CONCURRENCY
+    carried_over = is_incremental_mode() and not trial_settings.enabled and \
+        carry_over(metrics, test_case, previous)
+    if carried_over:
+        log("\n🔁 Answer unchanged since the previous run. Reusing its scores and reasons.")
+    else:
+        measure_metrics(metrics, test_case, checkpoint=checkpoints)
+
+    # Repeated trials (EVAL_TRIALS > 1): the answer above is the first trial; further RAG calls
+    # and uncached judge passes run until each metric's 95% CI is within EVAL_CI_TARGET
+    trial_summary = {}
+    if trial_settings.enabled:
+        def trial_scores(trial_metrics, result):
+            return {
+                **{key: metric.score for key, metric in trial_metrics.items()},
+                "rag_time_sec": result.rag_time,
+                "ttft_sec": result.latency_stats()["ttft_sec"]
+            }
+
+        def run_trial():
+            result = fetch_rag_answer(question, verbose=False, target=target)
+            if not result.ok or run_pre_checks(result.answer).failures:
+                return None
+            trial_metrics = {
+                key: metric for key, metric in build_metrics(context_retrieved is not None).items()
+                if key in measured
+            }
+            trial_case = make_test_case(question, result.answer, context_retrieved)
+            measure_metrics(list(trial_metrics.values()), trial_case, use_cache=False)
+            return trial_scores(trial_metrics, result)
+
+        with get_tracer().span("trials", question=question) as span:
+            trials, failed, converged = run_trials(
+                run_trial, list(measured), trial_settings, first=trial_scores(measured, rag_result)
+            )
+            span.update(trials=len(trials), failed=failed, converged=converged)
+        trial_summary = summarize_trials(trials, list(measured), failed, converged)
+
+        # Thresholds are asserted on the mean score
+        for key, metric in measured.items():
+            if trial_summary[key] is None:
+                continue
+            metric.score = trial_summary[key]
+            metric.reason = (f"Mean of {len(trials)} trials (95% CI ±{trial_summary[f'{key}_ci95']}). "
+                             f"First trial: {metric.reason}")
+            metric.is_successful()
+        log(f"\n🔁 Trials: {len(trials)} ok, {failed} failed, "
+            f"{'converged' if converged else 'CI target not reached'} | "
+            f"RAG time p50/p95: {trial_summary['rag_time_p50']}/{trial_summary['rag_time_p95']} sec")
+
+    if is_geval_enabled():
+        for key, score_icon, reason_icon in [("clarity", "🧼", "🔍"), ("informativeness", "🔎", "📝"),
+                                             ("completeness", "📋", "✅"), ("tone_appropriateness", "🎯", "🗣️")]:
+            metric = candidates[key]
+            log(f"\n{score_icon} {metric.name} Score: {metric.score}")
+            log(f"{reason_icon} {metric.name} Reason: {metric.reason}")
+
+        log(f"\n⚠️ Output Glitch Score: {glitch_check.score}")
+        log(f"🧪 Output Glitch Reason: {glitch_check.reason}")
+
+    duration = time.time() - start_time
+
+    # Print core metric scores
+    relevancy, bias = candidates["relevancy"], candidates["bias"]
+    log(f"\n✅ Relevancy Score: {relevancy.score}")
+    log(f"💬 Relevancy Reason: {relevancy.reason}")
+
+    log(f"\n⚖️ Bias Score: {bias.score}")
+    log(f"🧾 Bias Reason: {bias.reason}")
+
+    for key, score_icon, reason_icon in [("faithfulness", "🧠", "🔍"), ("hallucination", "🚨", "📌")]:
+        metric = measured.get(key)
+        log(f"\n{score_icon} {key.title()} Score: {metric.score if metric else None}")
+        log(f"{reason_icon} {key.title()} Reason: {metric.reason if metric else 'No context available.'}")
+
+    stream_stats = rag_result.latency_stats()
+    log(f"\n⚡ TTFT: {stream_stats['ttft_sec']} sec | TTFB: {stream_stats['ttfb_sec']} sec | "
+        f"Tokens: {stream_stats['token_count']} | Tokens/sec: {stream_stats['tokens_per_sec']} | "
+        f"Inter-token p50/p95: {stream_stats['itl_p50_ms']}/{stream_stats['itl_p95_ms']} ms")
+    log(f"⏱ Duration: {duration:.2f} seconds")
+    log("=" * 100 + "\n")
+
+    env = get_env_values()
+    score_data = {
+        "question": question,
+        "provider": target.provider if target else env["provider"],
+        "model": target.model if target else env["model"],
+        **{key: float(measured[key].score) if key in measured else None for key in SCORE_KEYS},
+        "glitch_check": glitch_check.score if is_geval_enabled() else None,
+        "repetition_score": pre_checks.results["repetition"].score,
+        "pre_checks": {name: result.passed for name, result in pre_checks.results.items()},
+        "rag_time_sec": rag_time,
+        **stream_stats,
+        "duration_sec": round(duration, 2),
+        "carried_over": carried_over,
+        "fingerprint": fingerprint(test_case, metrics),
+        "verdicts": collect_verdicts(metrics),
+        **trial_summary
+    }
+
+    # Threshold checks (metrics skipped by a pre-check are not checked)
+    failures = []
+    for key in ASSERT_ORDER:
+        if key == "glitch_check":
+            if is_geval_enabled() and not glitch_check.passed:
+                failures.append(f"Output Glitch Check Test Failed: {glitch_check.score} "
+                                f"(Reason: {glitch_check.reason})")
+        elif key in measured and not measured[key].is_successful():
+            metric = measured[key]
+            metric_label = metric.name if key in GEVAL_CRITERIA else key.title()
+            failures.append(f"{metric_label} Test Failed: {metric.score} (Reason: {metric.reason})")
+
+    score_data["passed"] = not failures
+    return Evaluation(
+        question, "failed" if failures else "passed",
+        score_data=score_data, failures=failures, duration=duration, model=label
+    )
+
+
+def model_results(evaluations) -> list[dict]:
+    # Every evaluation for the model comparison; in a matrix run errored and skipped ones
+    # count as failures of their model
+    return [e.score_data or unscored_result(e.question, e.model, e.status)
+            for e in evaluations if e.score_data or e.model]
+
+
+def write_report(evaluations, path) -> Path:
+    # A single-page summary; pandas and matplotlib are only imported here
+    from Utils.report_charts import ChartRenderer, bar_chart
+
+    scored = [e for e in evaluations if e.score_data]
+    matrix = is_matrix_result(model_results(evaluations))
+    specs = {
+        "scores": bar_chart([score_label(e.score_data, matrix) for e in scored], [{
+            "title": "Relevancy, Faithfulness, Bias & Hallucination",
+            "ylabel": "Score",
+            "bar_width": 0.2,
+            "series": [
+                {"label": key.title(), "values": [e.score_data[key] or 0 for e in scored],
+                 "color": color, "offset": offset}
+                for key, color, offset in [("relevancy", "skyblue", -1.5), ("faithfulness", "lightgreen", -0.5),
+                                           ("bias", "orange", 0.5), ("hallucination", "violet", 1.5)]
+            ]
+        }])
+    } if scored else {}
+    comparison = compare_models(model_results(evaluations)) if matrix else []
+    if comparison:
+        specs.update(comparison_chart_specs(comparison))
+    images = ChartRenderer().render(specs)
+
+    rows = "".join(
+        f"<tr><td>{e.question}</td><td>{e.model or ''}</td><td>{e.status}</td>"
+        + "".join(f"<td>{(e.score_data or {}).get(key, '')}</td>" for key in ["relevancy", "bias", "faithfulness",
+                                                                              "hallucination", "rag_time_sec"])
+        + f"<td>{'<br>'.join(e.failures) or e.message}</td></tr>"
+        for e in evaluations
+    )
+    charts = "".join(f'<img src="data:image/png;base64,{image}" width="900"/>' for image in images.values())
+    models = f"<h3>Model Comparison</h3>{model_comparison_html(comparison)}" if comparison else ""
+    html = (
+        "<html><head><meta charset='utf-8'><title>Lightspeed Evaluation</title></head><body>"
+        f"<h2>Lightspeed Evaluation ({datetime.datetime.now():%Y-%m-%d %H:%M})</h2>"
+        "<table border='1' cellpadding='4' style='border-collapse: collapse;'>"
+        "<tr><th>Question</th><th>Model</th><th>Status</th><th>Relevancy</th><th>Bias</th><th>Faithfulness</th>"
+        f"<th>Hallucination</th><th>RAG Time (s)</th><th>Details</th></tr>{rows}</table>{models}{charts}</body></html>"
+    )
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(html, encoding="utf-8")
+    return path
+
+
+def ensure_bearer_token():
+    # Only rhdh-local needs a browser-extracted token, and only when no cached one is still valid
+    from Utils.rag_respose import get_env_values
+    from Utils.auth_token import BearerTokenProvider, LOCAL_LIGHTSPEED_URL, open_browser_page
+
+    if get_env_values()["base_url"] == LOCAL_LIGHTSPEED_URL:
+        BearerTokenProvider().get(open_browser_page)
+
+
+def answered(result, question, target=None):
+    # fetch() for an answer that has already arrived
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Evaluate Lightspeed answers without pytest")
+    parser.add_argument("questions", nargs="*", help="Questions to evaluate (default: the configured dataset)")
+    parser.add_argument("--report", default="reports/engine_report.html", help="HTML summary path")
+    parser.add_argument("--no-report", action="store_true", help="Skip the HTML summary (no pandas/matplotlib)")
+    parser.add_argument("--no-history", action="store_true", help="Don't write results to the history database")
+    parser.add_argument("--resume", metavar="RUN_ID", help="Continue an interrupted run from its checkpoints")
+    parser.add_argument("--json", metavar="PATH", help="Also write every question's score_data as JSON")
+    parser.add_argument("--quiet", action="store_true", help="Only print one line per question")
+    parser.add_argument("--models", metavar="PROVIDER/MODEL,...",
+                        help="Evaluate against several models in one run (default: EVAL_MODELS)")
+    args = parser.parse_args(argv)
+
+    from Utils.rag_respose import RagPrefetcher
+    from Utils.prompt_contexts import get_all_questions
+    from Utils.history_store import HistoryStore, new_run_id
+    from Utils.checkpoint_store import CheckpointStore, is_checkpointing_enabled
+    from Utils.rag_replay import get_replay_dir, start_stub_server
+
+    # RAG_REPLAY_DIR serves recorded streams from a local stub, as under pytest
+    replay_server = None
+    if get_replay_dir():
+        replay_server, url = start_stub_server(get_replay_dir(), os.getenv("RAG_REPLAY_PACE", "fast"))
+        os.environ["RAG_REPLAY_URL"] = url
+
+    run_id = args.resume or os.getenv("EVAL_RUN_ID") or new_run_id()
+    checkpoints = CheckpointStore(run_id) if is_checkpointing_enabled() else None
+    if args.resume and (checkpoints is None or not checkpoints.has_run()):
+        parser.error(f"--resume {args.resume}: no checkpoints for this run (CHECKPOINTS=yes, CHECKPOINT_DB)")
+    if checkpoints is not None and not args.resume:
+        checkpoints.prune(int(os.getenv("CHECKPOINT_KEEP_RUNS", "5")))
+    history = None if args.no_history else HistoryStore()
+    previous = {}
+    if history is not None:
+        history.start_run(run_id)
+        if is_incremental_mode():
+            previous = index_previous(history.query(last_n=1))
+
+    questions = args.questions or get_all_questions()
+    targets = parse_model_matrix(args.models) if args.models is not None else get_model_matrix()
+    ensure_bearer_token()
+    done = set()
+    for target in targets or [None]:
+        scoped = checkpoints.scoped(target.label) if checkpoints and target else checkpoints
+        if scoped is not None:
+            done |= {result_key(question, target) for question in scoped.questions_with("rag")}
+    # In a matrix run every model's answers stream concurrently unless RAG_PREFETCH=no
+    prefetcher = RagPrefetcher(
+        questions, targets=targets, exclude=done,
+        enabled=os.getenv("RAG_PREFETCH", "yes" if targets else "no").lower() == "yes"
+    )
+    log = (lambda *_: None) if args.quiet else print
+    print(f"▶ Run {run_id}: {len(questions)} question(s)"
+          + (f" × {len(targets)} models ({', '.join(t.label for t in targets)})" if targets else ""))
+
+    evaluations = []
+
+    def run(question, target, fetch):
+        evaluation = evaluate_question(
+            question, fetch=fetch, checkpoints=checkpoints,
+            previous=previous.get(result_key(question, target)), log=log, target=target
+        )
+        evaluations.append(evaluation)
+        if evaluation.score_data and history is not None:
+            evaluation.score_data.update(timestamp=datetime.datetime.now().isoformat(), run_id=run_id)
+            history.append(evaluation.score_data, run_id, replace=bool(args.resume))
+        detail = "; ".join(evaluation.failures) or evaluation.message
+        model = f" [{evaluation.model}]" if evaluation.model else ""
+        print(f"{evaluation.status.upper():8} {question}{model}" + (f" | {detail}" if detail else ""))
+
+    try:
+        # Answers checkpointed by an interrupted run first, then every other answer as soon as
+        # it arrives, so the judge works on whichever answer is ready instead of waiting for
+        # the next question in order
+        for question in prefetcher.questions:
+            for target in targets or [None]:
+                if result_key(question, target) in done:
+                    run(question, target, prefetcher.get)
+        for question, target, result in prefetcher.iter_completed():
+            run(question, target, functools.partial(answered, result))
+    finally:
+        prefetcher.shutdown()
+        if replay_server is not None:
+            replay_server.shutdown()
+        for store in (history, checkpoints):
+            if store is not None:
+                store.close()
+
+    # Reported in question order, whatever order the answers arrived in
+    order = {result_key(question, target): index for index, (question, target)
+             in enumerate(itertools.product(prefetcher.questions, targets or [None]))}
+    evaluations.sort(key=lambda e: order[(e.question, e.model) if e.model else e.question])
+
+    if args.json:
+        Path(args.json).write_text(json.dumps([e.score_data for e in evaluations if e.score_data], indent=2))
+    if not args.no_report:
+        print(f"✓ Wrote {write_report(evaluations, args.report)}")
+    if targets:
+        for row in compare_models(model_results(evaluations)):
+            print(f"{'⭐' if row['recommended'] else ' '} {row['model']}: pass rate {row['pass_rate']:.0%} | "
+                  f"RAG time p50 {row['rag_time_p50']} sec | TTFT p50 {row['ttft_p50']} sec | "
+                  f"{row['tokens_per_sec']} tokens/sec")
+
+    from Utils.rag_scheduler import scheduler_stats_delta, format_stats
+
+    for label, stats in scheduler_stats_delta().items():
+        print(f"🚦 RAG scheduler{'' if label == 'default' else f' [{label}]'}: {format_stats(stats)}")
+    counts = {status: sum(e.status == status for e in evaluations) for status in ("passed", "failed", "error", "skipped")}
+    print(" | ".join(f"{count} {status}" for status, count in counts.items()))
+    return 1 if counts["failed"] or counts["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import os
+import json
+import random
+import hashlib
+import importlib
+from pathlib import Path
+
+NO_CONTEXT = ["No context found for this question."]
+INDEX_VERSION = 1
+
+
+def parse_shard(value: str | None) -> tuple[int, int] | None:
+    # "2/4" -> (1, 4): shards are 1-based on the command line, 0-based internally
+    if not value:
+        return None
+    index, count = (int(part) for part in value.split("/"))
+    if not 1 <= index <= count:
+        raise ValueError(f"Invalid shard {value!r}: expected INDEX/COUNT with 1 <= INDEX <= COUNT")
+    return index - 1, count
+
+def get_shard_from_env() -> tuple[int, int] | None:
+    shard = parse_shard(os.getenv("DATASET_SHARD"))
+    if shard is None and os.getenv("CI_NODE_INDEX") and os.getenv("CI_NODE_TOTAL"):
+        shard = parse_shard(f"{os.getenv('CI_NODE_INDEX')}/{os.getenv('CI_NODE_TOTAL')}")
+    return shard
+
+def in_shard(question: str, shard_index: int, shard_count: int) -> bool:
+    # Stable across machines and Python processes, unlike hash()
+    digest = hashlib.sha1(question.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count == shard_index
+
+
+def import_for_format(module: str, package: str, dataset_format: str):
+    # YAML and Parquet support are optional; name the package to install when it is missing
+    try:
+        return importlib.import_module(module)
+    except ImportError as error:
+        raise ImportError(f"{dataset_format} golden datasets need the {package} package: pip install {package}") from error
+
+
+class GoldenDataset:
+    # Question/context pairs from a JSONL, YAML or Parquet golden set. Only questions and tags
+    # are indexed up front; contexts are read on demand.
+    # Each record: {"question": str, "contexts": [str, ...], "tags": [str, ...]}
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.format = self.path.suffix.lower().lstrip(".")
+        self._index = {}   # question -> (locator, tags)
+        self._records = None
+        if self.format == "jsonl":
+            self._index_jsonl()
+        elif self.format in ("yaml", "yml"):
+            self._index_yaml()
+        elif self.format == "parquet":
+            self._index_parquet()
+        else:
+            raise ValueError(f"Unsupported golden dataset format: {self.path}")
+
+    @classmethod
+    def from_dict(cls, contexts: dict) -> "GoldenDataset":
+        dataset = cls.__new__(cls)
+        dataset.path, dataset.format = None, "dict"
+        dataset._records = {question: {"question": question, "contexts": ctx, "tags": []}
+                            for question, ctx in contexts.items()}
+        dataset._index = {question: (question, []) for question in contexts}
+        return dataset
+
+    def _index_jsonl(self):
+        # Byte offsets per question, cached next to the file until it changes
+        stat = self.path.stat()
+        index_path = self.path.with_name(self.path.name + ".index.json")
+        signature = [INDEX_VERSION, stat.st_size, stat.st_mtime_ns]
+        try:
+            cached = json.loads(index_path.read_text())
+            if cached["signature"] == signature:
+                self._index = {q: (offset, tags) for q, offset, tags in cached["entries"]}
+                return
+        except (OSError, ValueError, KeyError):
+            pass
+
+        entries = []
+        with self.path.open("rb") as handle:
+            offset = 0
+            for line in handle:
+                if line.strip():
+                    record = json.loads(line)
+                    entries.append((record["question"], offset, record.get("tags", [])))
+                offset += len(line)
+        self._index = {q: (offset, tags) for q, offset, tags in entries}
+        try:
+            index_path.write_text(json.dumps({"signature": signature, "entries": entries}))
+        except OSError:
+            pass
+
+    def _index_yaml(self):
+        yaml = import_for_format("yaml", "pyyaml", "YAML")
+        data = yaml.safe_load(self.path.read_text()) or []
+        self._records = {record["question"]: record for record in data}
+        self._index = {q: (q, record.get("tags", [])) for q, record in self._records.items()}
+
+    def _index_parquet(self):
+        pq = import_for_format("pyarrow.parquet", "pyarrow", "Parquet")
+        import pandas as pd
+
+        columns = [column for column in ("question", "tags") if column in pq.read_schema(self.path).names]
+        frame = pd.read_parquet(self.path, columns=columns)
+        tags = frame["tags"] if "tags" in frame else [None] * len(frame)
+        for row, (question, question_tags) in enumerate(zip(frame["question"], tags)):
+            self._index[question] = (row, list(question_tags) if question_tags is not None else [])
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, question):
+        return question in self._index
+
+    def get_contexts(self, question: str) -> list[str]:
+        entry = self._index.get(question)
+        if entry is None:
+            return NO_CONTEXT
+        locator = entry[0]
+        if self.format == "jsonl":
+            with self.path.open("rb") as handle:
+                handle.seek(locator)
+                return json.loads(handle.readline()).get("contexts", [])
+        if self.format == "parquet":
+            if self._records is None:
+                import pandas as pd
+                self._records = pd.read_parquet(self.path, columns=["contexts"])["contexts"]
+            return list(self._records.iloc[locator])
+        return self._records[locator].get("contexts", [])
+
+    def select(self, tags=None, sample: int | None = None, seed: int = 0, shard=None) -> list[str]:
+        # Tag filter, then seeded sample, then deterministic shard; file order is preserved
+        questions = [
+            question for question, (_, question_tags) in self._index.items()
+            if not tags or set(tags) & set(question_tags)
+        ]
+        if sample is not None and sample < len(questions):
+            chosen = set(random.Random(seed).sample(questions, sample))
+            questions = [question for question in questions if question in chosen]
+        if shard is not None:
+            questions = [question for question in questions if in_shard(question, *shard)]
+        return questions
+
+
+def select_from_env(dataset: GoldenDataset) -> list[str]:
+    tags = [tag.strip() for tag in os.getenv("DATASET_TAGS", "").split(",") if tag.strip()]
+    sample = os.getenv("DATASET_SAMPLE")
+    return dataset.select(
+        tags=tags or None,
+        sample=int(sample) if sample else None,
+        seed=int(os.getenv("DATASET_SEED", "0")),
+        shard=get_shard_from_env()
+    )
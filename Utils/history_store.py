@@ -0,0 +1,173 @@
+import os
+import json
+import uuid
+import sqlite3
+import argparse
+import datetime
+import threading
+from pathlib import Path
+from Utils.tracing import get_tracer
+from Utils.model_matrix import model_label
+
+LEGACY_HISTORY_FILE = "test_history.jsonl"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    metadata TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    question TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    data TEXT NOT NULL,
+    model TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_results_question_ts ON results(question, timestamp);
+CREATE INDEX IF NOT EXISTS idx_results_ts ON results(timestamp);
+"""
+# Results are tagged with "provider/model" ('' for rows from before matrix runs); databases
+# created without the column get it added when opened
+MODEL_INDEXES = """
+DROP INDEX IF EXISTS idx_results_run_question_ts;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_results_run_question_model_ts ON results(run_id, question, model, timestamp);
+CREATE INDEX IF NOT EXISTS idx_results_question_model_ts ON results(question, model, timestamp);
+"""
+
+
+def new_run_id() -> str:
+    return f"{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+class HistoryStore:
+    # SQLite-backed run history: O(1) appends, indexed per-question and time-window reads
+    def __init__(self, path: str | None = None, import_legacy: bool = True):
+        self.path = Path(path or os.getenv("HISTORY_DB", "test_history.db"))
+        is_new = not self.path.exists()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+        if "model" not in columns:
+            self._conn.execute("ALTER TABLE results ADD COLUMN model TEXT NOT NULL DEFAULT ''")
+        self._conn.executescript(MODEL_INDEXES)
+
+        legacy = self.path.with_name(LEGACY_HISTORY_FILE)
+        if import_legacy and is_new and legacy.exists():
+            imported = self.import_jsonl(legacy)
+            print(f"✓ Imported {imported} rows from {legacy} into {self.path}")
+
+    def close(self):
+        self._conn.close()
+
+    def start_run(self, run_id: str | None = None, metadata: dict | None = None) -> str:
+        run_id = run_id or new_run_id()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, started_at, metadata) VALUES (?, ?, ?)",
+                (run_id, datetime.datetime.now().isoformat(), json.dumps(metadata or {}))
+            )
+        return run_id
+
+    def append(self, score_data: dict, run_id: str, replace: bool = False):
+        # replace=True drops the question's earlier rows for the same model in this run
+        # (a resumed run re-reports them)
+        record = {**score_data, "run_id": run_id}
+        model = model_label(record.get("provider"), record.get("model")) or ""
+        with get_tracer().span("history.write"), self._lock, self._conn:
+            if replace:
+                self._conn.execute(
+                    "DELETE FROM results WHERE run_id = ? AND question = ? AND model = ?",
+                    (run_id, record["question"], model)
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (run_id, question, timestamp, data, model) VALUES (?, ?, ?, ?, ?)",
+                (run_id, record["question"], record["timestamp"], json.dumps(record), model)
+            )
+
+    def query(self, since: str | None = None, questions=None, last_n: int | None = None,
+              run_id: str | None = None) -> list[dict]:
+        # Rows in timestamp order; last_n keeps only the most recent rows per question and model
+        where, params = [], []
+        if since:
+            where.append("timestamp >= ?")
+            params.append(since)
+        if questions:
+            questions = list(questions)
+            where.append(f"question IN ({','.join('?' * len(questions))})")
+            params.extend(questions)
+        if run_id:
+            where.append("run_id = ?")
+            params.append(run_id)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        if last_n:
+            sql = (
+                "SELECT data FROM ("
+                "  SELECT data, timestamp, ROW_NUMBER() OVER (PARTITION BY question, model ORDER BY timestamp DESC) AS rn"
+                f"  FROM results {clause}"
+                ") WHERE rn <= ? ORDER BY timestamp"
+            )
+            params.append(last_n)
+        else:
+            sql = f"SELECT data FROM results {clause} ORDER BY timestamp"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def to_dataframe(self, **filters):
+        import pandas as pd
+
+        df = pd.DataFrame(self.query(**filters))
+        if not df.empty:
+            df["timestamp"] = pd.to_datetime(df["timestamp"])
+        return df
+
+    def import_jsonl(self, path) -> int:
+        # Legacy rows have no run ID; rows from the same day are grouped into one imported run
+        rows = []
+        for line in Path(path).read_text().splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            run_id = record.get("run_id") or f"imported-{record['timestamp'][:10]}"
+            rows.append((run_id, record["question"], record["timestamp"], json.dumps({**record, "run_id": run_id})))
+
+        run_starts = {}
+        for run_id, _, timestamp, _ in rows:
+            run_starts[run_id] = min(timestamp, run_starts.get(run_id, timestamp))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO runs (run_id, started_at, metadata) VALUES (?, ?, ?)",
+                [(run_id, started_at, json.dumps({"imported_from": str(path)})) for run_id, started_at in run_starts.items()]
+            )
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO results (run_id, question, timestamp, data) VALUES (?, ?, ?, ?)", rows
+            )
+            return self._conn.total_changes - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the evaluation run history database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="Import a legacy test_history.jsonl file")
+    import_parser.add_argument("jsonl", nargs="?", default=LEGACY_HISTORY_FILE)
+    import_parser.add_argument("--db", default=None, help="History database (default: HISTORY_DB or test_history.db)")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        store = HistoryStore(args.db, import_legacy=False)
+        imported = store.import_jsonl(args.jsonl)
+        print(f"✓ Imported {imported} rows from {args.jsonl} into {store.path}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import json
+import hashlib
+import unicodedata
+from Utils.judge_cache import _jsonable, apply_verdict, metric_name, metric_signature
+
+
+def is_incremental_mode() -> bool:
+    return os.getenv("INCREMENTAL_EVAL", "no").lower() == "yes"
+
+
+def normalise_answer(answer: str) -> str:
+    # Whitespace and Unicode form differences between streams do not count as a changed answer
+    return " ".join(unicodedata.normalize("NFC", answer or "").split())
+
+
+def fingerprint(test_case, metrics) -> str:
+    payload = {
+        "question": test_case.input,
+        "answer": normalise_answer(test_case.actual_output),
+        "context": _jsonable(test_case.context),
+        "metrics": sorted((metric_signature(metric) for metric in metrics), key=lambda s: s["name"]),
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def collect_verdicts(metrics) -> dict:
+    return {
+        metric_name(metric): {"score": metric.score, "reason": metric.reason, "success": metric.success}
+        for metric in metrics
+    }
+
+
+def carry_over(metrics, test_case, previous: dict | None) -> bool:
+    # Reuses the previous run's verdicts when the fingerprint is unchanged.
+    # Returns False (and touches nothing) when the metrics still need the judge.
+    if not previous or previous.get("fingerprint") != fingerprint(test_case, metrics):
+        return False
+    verdicts = previous.get("verdicts") or {}
+    if any(verdicts.get(metric_name(metric), {}).get("score") is None for metric in metrics):
+        return False
+    for metric in metrics:
+        apply_verdict(metric, verdicts[metric_name(metric)])
+    return True
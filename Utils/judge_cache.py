@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+# Metric attributes that change the verdict for the same test case
+CONFIG_ATTRS = [
+    "threshold", "include_reason", "strict_mode", "criteria",
+    "evaluation_steps", "evaluation_params", "rubric"
+]
+TEST_CASE_ATTRS = ["input", "actual_output", "expected_output", "context", "retrieval_context"]
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _jsonable(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    return getattr(value, "value", None) or repr(value)
+
+
+def metric_name(metric) -> str:
+    return getattr(metric, "name", None) or getattr(metric, "__name__", None) or type(metric).__name__
+
+def metric_signature(metric) -> dict:
+    # Everything about a metric that can change its verdict for the same test case
+    return {
+        "metric": type(metric).__name__,
+        "name": metric_name(metric),
+        "config": {attr: _jsonable(getattr(metric, attr, None)) for attr in CONFIG_ATTRS},
+        "judge_model": getattr(metric, "evaluation_model", None),
+    }
+
+def apply_verdict(metric, verdict: dict):
+    # Leaves the metric as if measure() had produced this verdict
+    metric.score = verdict["score"]
+    metric.reason = verdict["reason"]
+    metric.error = None
+    metric.success = verdict["success"]
+
+
+class JudgeCache:
+    def __init__(self, directory: str, max_bytes: int, max_age_sec: float, enabled: bool = True):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age_sec = max_age_sec
+        self.enabled = enabled
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0}
+        self._reported = dict(self.stats)
+        self._lock = threading.Lock()
+
+    def key_for(self, metric, test_case) -> str:
+        payload = {
+            **metric_signature(metric),
+            "test_case": {attr: _jsonable(getattr(test_case, attr, None)) for attr in TEST_CASE_ATTRS},
+        }
+        encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _count(self, stat: str, amount: int = 1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    def load(self, metric, test_case) -> bool:
+        # On a hit the cached verdict is applied to the metric as if measure() had run
+        if not self.enabled:
+            return False
+        path = self._path(self.key_for(metric, test_case))
+        try:
+            entry = json.loads(path.read_text())
+            expired = time.time() - entry["created"] > self.max_age_sec
+            verdict = {key: entry[key] for key in ("score", "reason", "success")}
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing, unreadable or malformed (e.g. written by an older version): store() replaces it
+            self._count("misses")
+            return False
+        if expired:
+            path.unlink(missing_ok=True)
+            self._count("misses")
+            return False
+
+        apply_verdict(metric, verdict)
+        os.utime(path)
+        self._count("hits")
+        return True
+
+    def store(self, metric, test_case):
+        if not self.enabled or metric.score is None or getattr(metric, "error", None) is not None:
+            return
+        path = self._path(self.key_for(metric, test_case))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "score": metric.score,
+            "reason": metric.reason,
+            "success": metric.success,
+            "created": time.time(),
+        }
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(entry))
+        os.replace(tmp_path, path)
+        self._count("writes")
+
+    def prune(self):
+        # Drop expired entries, then the least recently used until under max_bytes
+        if not self.directory.exists():
+            return
+        now = time.time()
+        entries = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age_sec:
+                path.unlink(missing_ok=True)
+                self._count("evicted")
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self._count("evicted")
+
+    def stats_delta(self) -> dict:
+        # Counter changes since the previous call, for aggregating across xdist workers
+        with self._lock:
+            delta = {key: value - self._reported[key] for key, value in self.stats.items()}
+            self._reported = dict(self.stats)
+        return delta
+
+
+def hit_rate(stats: dict) -> float:
+    lookups = stats["hits"] + stats["misses"]
+    return stats["hits"] / lookups if lookups else 0.0
+
+
+def get_judge_cache() -> JudgeCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = JudgeCache(
+                directory=os.getenv("JUDGE_CACHE_DIR", ".judge_cache"),
+                max_bytes=int(float(os.getenv("JUDGE_CACHE_MAX_MB", "100")) * 1024 * 1024),
+                max_age_sec=float(os.getenv("JUDGE_CACHE_MAX_AGE_DAYS", "30")) * 86400,
+                enabled=os.getenv("JUDGE_CACHE", "yes").lower() == "yes",
+            )
+            if _cache.enabled:
+                _cache.prune()
+    return _cache
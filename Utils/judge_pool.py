@@ -0,0 +1,157 @@
+import os
+import time
+import asyncio
+import threading
+import httpx
+import requests
+from ollama import ResponseError
+from deepeval.models import DeepEvalBaseLLM, OllamaModel
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_judge_endpoints() -> list[str]:
+    # JUDGE_ENDPOINTS=http://localhost:11434,http://gpu-2:11434
+    return [url.strip().rstrip("/") for url in os.getenv("JUDGE_ENDPOINTS", "").split(",") if url.strip()]
+
+
+def is_endpoint_error(error: Exception) -> bool:
+    # Connection failures, timeouts and 5xx responses are the endpoint's fault. Anything else
+    # (judge output that doesn't fit the schema, a 4xx for a bad request) would fail the same
+    # way on every endpoint
+    if isinstance(error, ResponseError):
+        return error.status_code >= 500
+    return isinstance(error, (OSError, httpx.TransportError))
+
+
+class JudgeEndpoint:
+    def __init__(self, url: str, model: str | None, max_concurrency: int):
+        self.url = url
+        self.model = OllamaModel(model=model, base_url=url)
+        self.max_concurrency = max_concurrency
+        self.outstanding = 0
+        self.healthy = True
+        self.checked_at = 0.0
+        self.errors = 0
+        self.latencies = []
+        self._reported = (0, 0)   # (latencies, errors) already returned by stats_delta
+
+    def check_health(self, timeout: float = 2.0) -> bool:
+        try:
+            self.healthy = requests.get(f"{self.url}/api/tags", timeout=timeout).ok
+        except requests.RequestException:
+            self.healthy = False
+        self.checked_at = time.monotonic()
+        return self.healthy
+
+
+class JudgePool(DeepEvalBaseLLM):
+    # One judge model served by several Ollama endpoints. Each call goes to the healthy
+    # endpoint with the fewest outstanding requests, below its concurrency cap. A call the
+    # endpoint failed (connection, timeout, 5xx) marks it unhealthy and is retried on a
+    # different endpoint; other errors are raised right away.
+    def __init__(self, endpoints: list[str], model: str | None = None, max_per_endpoint: int = 2,
+                 retries: int = 2, health_interval: float = 30.0):
+        self.endpoints = [JudgeEndpoint(url, model, max_per_endpoint) for url in endpoints]
+        self.retries = retries
+        self.health_interval = health_interval
+        self._available = threading.Condition()
+        for endpoint in self.endpoints:
+            endpoint.check_health()
+        super().__init__(self.endpoints[0].model.name)
+
+    def load_model(self):
+        return self
+
+    def get_model_name(self):
+        # Same name as a single Ollama judge, so judge cache entries stay valid
+        return self.endpoints[0].model.get_model_name()
+
+    def _recheck(self):
+        now = time.monotonic()
+        for endpoint in self.endpoints:
+            if not endpoint.healthy and now - endpoint.checked_at >= self.health_interval:
+                endpoint.check_health()
+
+    def _acquire(self, exclude) -> JudgeEndpoint:
+        with self._available:
+            while True:
+                self._recheck()
+                candidates = [e for e in self.endpoints if e.healthy and e not in exclude] or \
+                             [e for e in self.endpoints if e not in exclude] or self.endpoints
+                free = [e for e in candidates if e.outstanding < e.max_concurrency]
+                if free:
+                    endpoint = min(free, key=lambda e: e.outstanding)
+                    endpoint.outstanding += 1
+                    return endpoint
+                self._available.wait(timeout=1.0)
+
+    def _release(self, endpoint: JudgeEndpoint, elapsed: float, failed: bool):
+        with self._available:
+            endpoint.outstanding -= 1
+            endpoint.latencies.append(elapsed)
+            if failed:
+                endpoint.errors += 1
+                endpoint.healthy = False
+                endpoint.checked_at = time.monotonic()
+            self._available.notify()
+
+    def generate(self, prompt: str, schema=None):
+        tried = []
+        while True:
+            endpoint = self._acquire(tried)
+            start = time.perf_counter()
+            try:
+                # OllamaModel returns (result, cost); deepeval expects the bare result
+                # from a custom model
+                result, _ = endpoint.model.generate(prompt, schema=schema)
+            except Exception as error:
+                endpoint_failed = is_endpoint_error(error)
+                self._release(endpoint, time.perf_counter() - start, failed=endpoint_failed)
+                if not endpoint_failed:
+                    raise
+                tried.append(endpoint)
+                if len(tried) > self.retries:
+                    raise
+                continue
+            self._release(endpoint, time.perf_counter() - start, failed=False)
+            return result
+
+    async def a_generate(self, prompt: str, schema=None):
+        # Endpoint selection blocks on a threading.Condition, so keep it off the event loop
+        return await asyncio.to_thread(self.generate, prompt, schema)
+
+    def stats_delta(self) -> dict:
+        # Per-endpoint counters since the previous call, for aggregating across xdist workers
+        delta = {}
+        with self._available:
+            for endpoint in self.endpoints:
+                reported_latencies, reported_errors = endpoint._reported
+                latencies = endpoint.latencies[reported_latencies:]
+                if latencies:
+                    delta[endpoint.url] = {
+                        "requests": len(latencies),
+                        "errors": endpoint.errors - reported_errors,
+                        "latencies": latencies,
+                    }
+                endpoint._reported = (len(endpoint.latencies), endpoint.errors)
+        return delta
+
+
+def get_judge_model():
+    # None keeps deepeval's default judge (the model chosen with `deepeval set-ollama`)
+    global _pool
+    endpoints = get_judge_endpoints()
+    if not endpoints:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = JudgePool(
+                endpoints,
+                model=os.getenv("JUDGE_MODEL") or None,
+                max_per_endpoint=int(os.getenv("JUDGE_MAX_PER_ENDPOINT", "2")),
+                retries=int(os.getenv("JUDGE_RETRIES", "2")),
+                health_interval=float(os.getenv("JUDGE_HEALTH_INTERVAL_SEC", "30")),
+            )
+    return _pool
@@ -0,0 +1,113 @@
+import json
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# A minimal Ollama-compatible judge for offline runs and tests: /api/tags lists one model and
+# /api/chat answers every structured-output request with a canned value that fits the
+# requested JSON schema (numbers are the configured score, enums their first value and
+# strings a fixed reason).
+
+
+def schema_value(schema: dict, defs: dict, score: float):
+    if "$ref" in schema:
+        return schema_value(defs[schema["$ref"].rsplit("/", 1)[-1]], defs, score)
+    if "anyOf" in schema:
+        return schema_value(next((s for s in schema["anyOf"] if s.get("type") != "null"), {}), defs, score)
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: schema_value(prop, defs, score) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [schema_value(schema.get("items", {}), defs, score)]
+    if kind == "integer":
+        return int(score)
+    if kind == "number":
+        return score
+    if kind == "boolean":
+        return True
+    return "Stub judge verdict."
+
+
+class JudgeStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    model = "stub-judge"
+    score = 10
+    status = 200
+    requests = 0
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/api/tags":
+            return self._send_json(404, {"error": f"Unknown path {self.path}"})
+        self._send_json(self.status, {"models": [{"name": self.model, "model": self.model}]})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip("/") != "/api/chat":
+            return self._send_json(404, {"error": f"Unknown path {self.path}"})
+        type(self).requests += 1
+        if self.status != 200:
+            return self._send_json(self.status, {"error": "stub judge is failing"})
+
+        schema = request.get("format")
+        if isinstance(schema, dict):
+            content = json.dumps(schema_value(schema, schema.get("$defs", {}), self.score))
+        else:
+            content = "Stub judge verdict."
+        self._send_json(200, {
+            "model": request.get("model", self.model),
+            "created_at": "1970-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "done_reason": "stop",
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_judge_stub(score: float = 10, status: int = 200, model: str = "stub-judge",
+                     host: str = "127.0.0.1", port: int = 0):
+    # Serves the stub on a background thread; returns (server, base_url). The handler class
+    # is server.RequestHandlerClass, whose `requests` counts the /api/chat calls.
+    handler = type("BoundJudgeStubHandler", (JudgeStubHandler,), {
+        "score": score,
+        "status": status,
+        "model": model,
+        "requests": 0,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="judge-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a canned Ollama-compatible judge locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--score", type=float, default=10, help="Score returned for every verdict")
+    parser.add_argument("--model", default="stub-judge")
+    args = parser.parse_args()
+
+    server, url = start_judge_stub(args.score, model=args.model, host=args.host, port=args.port)
+    print(f"✓ Stub judge {args.model} at {url} (score: {args.score})")
+    print(f"  Use JUDGE_ENDPOINTS={url} JUDGE_MODEL={args.model}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
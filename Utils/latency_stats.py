@@ -0,0 +1,27 @@
+import math
+
+
+def percentile(values, pct: float) -> float | None:
+    # Linear interpolation between closest ranks, same as numpy's default
+    data = sorted(v for v in values if v is not None)
+    if not data:
+        return None
+    if len(data) == 1:
+        return data[0]
+    rank = (len(data) - 1) * pct / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return data[low] + (data[high] - data[low]) * (rank - low)
+
+def summarize_latencies(values, prefix: str, scale: float = 1.0, digits: int = 3) -> dict:
+    # e.g. prefix="latency" -> latency_p50, latency_p95, latency_p99, latency_mean, latency_max
+    data = [v * scale for v in values if v is not None]
+    if not data:
+        return {f"{prefix}_{name}": None for name in ("p50", "p95", "p99", "mean", "max")}
+    return {
+        f"{prefix}_p50": round(percentile(data, 50), digits),
+        f"{prefix}_p95": round(percentile(data, 95), digits),
+        f"{prefix}_p99": round(percentile(data, 99), digits),
+        f"{prefix}_mean": round(sum(data) / len(data), digits),
+        f"{prefix}_max": round(max(data), digits),
+    }
@@ -0,0 +1,245 @@
+import json
+import time
+import argparse
+import datetime
+import itertools
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from Utils.rag_respose import fetch_rag_answer, get_session, get_env_values
+from Utils.prompt_contexts import get_all_questions
+from Utils.latency_stats import percentile
+
+# A step is saturated when more load stops buying throughput or starts failing requests
+SATURATION_MIN_GAIN = 0.10
+SATURATION_MAX_ERROR_RATE = 0.05
+
+
+class QuestionCycle:
+    def __init__(self, questions):
+        self._cycle = itertools.cycle(questions)
+        self._lock = threading.Lock()
+
+    def next(self) -> str:
+        with self._lock:
+            return next(self._cycle)
+
+
+def bearer_token_refresher():
+    # rhdh-local tokens expire during long runs. The provider hands out the cached token and
+    # only opens a browser to fetch a new one shortly before it expires; other backends
+    # use BEARER_TOKEN as is
+    from Utils.auth_token import BearerTokenProvider, LOCAL_LIGHTSPEED_URL, open_browser_page
+
+    if get_env_values()["base_url"] != LOCAL_LIGHTSPEED_URL:
+        return lambda: None
+    provider = BearerTokenProvider()
+    return lambda: provider.get(open_browser_page)
+
+
+def _sample(question: str, scheduled_at: float | None = None, refresh_token=None) -> dict:
+    if refresh_token is not None:
+        refresh_token()
+    started = time.perf_counter()
+    # Bypasses the adaptive scheduler: the load test sets the concurrency itself
+    result = fetch_rag_answer(question, verbose=False, adaptive=False)
+    finished = time.perf_counter()
+    return {
+        "question": question,
+        "started": started,
+        "latency": finished - (scheduled_at if scheduled_at is not None else started),
+        "ttft": result.ttft,
+        "ok": result.ok,
+        "timed_out": result.timed_out,
+        "error": result.error,
+        "tokens_per_sec": result.tokens_per_sec
+    }
+
+
+def run_closed_loop(questions: QuestionCycle, concurrency: int, duration: float, refresh_token=None) -> list[dict]:
+    # `concurrency` virtual users, each sending its next request as soon as the last one finishes
+    deadline = time.perf_counter() + duration
+    samples = []
+    lock = threading.Lock()
+
+    def user():
+        while time.perf_counter() < deadline:
+            sample = _sample(questions.next(), refresh_token=refresh_token)
+            with lock:
+                samples.append(sample)
+
+    threads = [threading.Thread(target=user, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def run_open_loop(questions: QuestionCycle, qps: float, duration: float, max_in_flight: int,
+                  refresh_token=None) -> list[dict]:
+    # Requests are issued on a fixed schedule regardless of how fast earlier ones finish.
+    # Latency is measured from the scheduled time, so queueing behind max_in_flight counts.
+    interval = 1.0 / qps
+    start = time.perf_counter()
+    futures = []
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="load") as executor:
+        for index in itertools.count():
+            scheduled_at = start + index * interval
+            if scheduled_at - start >= duration:
+                break
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(executor.submit(_sample, questions.next(), scheduled_at, refresh_token))
+    return [future.result() for future in futures]
+
+
+def summarize_step(samples: list[dict], duration: float, **labels) -> dict:
+    ok = [s for s in samples if s["ok"]]
+    latencies = [s["latency"] for s in ok]
+    ttfts = [s["ttft"] for s in ok if s["ttft"] is not None]
+    throughputs = [s["tokens_per_sec"] for s in ok if s["tokens_per_sec"] is not None]
+    total = len(samples)
+
+    def pct(values, q):
+        value = percentile(values, q)
+        return round(value, 3) if value is not None else None
+
+    return {
+        **labels,
+        "duration_sec": round(duration, 2),
+        "requests": total,
+        "succeeded": len(ok),
+        "errors": total - len(ok),
+        "timeouts": sum(1 for s in samples if s["timed_out"]),
+        "error_rate": round((total - len(ok)) / total, 4) if total else 0.0,
+        "timeout_rate": round(sum(1 for s in samples if s["timed_out"]) / total, 4) if total else 0.0,
+        "throughput_rps": round(len(ok) / duration, 3) if duration else 0.0,
+        "latency_p50_sec": pct(latencies, 50),
+        "latency_p95_sec": pct(latencies, 95),
+        "latency_p99_sec": pct(latencies, 99),
+        "ttft_p50_sec": pct(ttfts, 50),
+        "ttft_p95_sec": pct(ttfts, 95),
+        "ttft_p99_sec": pct(ttfts, 99),
+        "tokens_per_sec_mean": round(sum(throughputs) / len(throughputs), 2) if throughputs else None
+    }
+
+
+def find_saturation(steps: list[dict], load_key: str) -> dict | None:
+    # Highest load level before throughput flattens out or the error rate climbs
+    for previous, current in zip(steps, steps[1:]):
+        if previous["error_rate"] > SATURATION_MAX_ERROR_RATE:
+            reason = "error rate exceeded at the lowest load level"
+        elif current["error_rate"] > SATURATION_MAX_ERROR_RATE:
+            reason = "error rate exceeded"
+        elif not previous["throughput_rps"] or (
+            current["throughput_rps"] - previous["throughput_rps"]
+        ) / previous["throughput_rps"] < SATURATION_MIN_GAIN:
+            reason = "throughput stopped increasing"
+        else:
+            continue
+        return {
+            load_key: previous[load_key],
+            "throughput_rps": previous["throughput_rps"],
+            "latency_p95_sec": previous["latency_p95_sec"],
+            "reason": reason
+        }
+    return None
+
+
+def run_load_test(concurrency: list[int] | None = None, qps: list[float] | None = None,
+                  duration: float = 60.0, max_in_flight: int = 64, questions=None) -> dict:
+    questions = QuestionCycle(questions or get_all_questions())
+    steps = []
+    load_key = "qps" if qps else "concurrency"
+
+    # Size the pooled session for the peak number of concurrent requests
+    get_session(pool_size=max_in_flight if qps else max(concurrency or [1]))
+    refresh_token = bearer_token_refresher()
+
+    for level in (qps or concurrency or [1]):
+        print(f"🚦 Load step: {load_key}={level} for {duration:.0f} sec")
+        step_start = time.perf_counter()
+        if qps:
+            samples = run_open_loop(questions, level, duration, max_in_flight, refresh_token)
+        else:
+            samples = run_closed_loop(questions, level, duration, refresh_token)
+        elapsed = time.perf_counter() - step_start
+        step = summarize_step(samples, elapsed, **{load_key: level})
+        steps.append(step)
+        print(f"   {step['throughput_rps']} req/s | p50 {step['latency_p50_sec']}s | "
+              f"p95 {step['latency_p95_sec']}s | p99 {step['latency_p99_sec']}s | "
+              f"TTFT p95 {step['ttft_p95_sec']}s | errors {step['error_rate']:.1%} | "
+              f"timeouts {step['timeout_rate']:.1%}")
+
+    return {
+        "generated_at": datetime.datetime.now().isoformat(),
+        "mode": "open-loop" if qps else "closed-loop",
+        "duration_per_step_sec": duration,
+        "steps": steps,
+        "saturation": find_saturation(steps, load_key) if len(steps) > 1 else None
+    }
+
+
+def load_test_summary_html(results: dict) -> str:
+    load_key = "qps" if results["mode"] == "open-loop" else "concurrency"
+    html = f'<h2>🚦 Load Test ({results["mode"]}, {results["generated_at"]})</h2>'
+    html += '<table border="1" style="border-collapse: collapse; font-size: 14px;">'
+    html += (
+        f'<tr><th>{"QPS" if load_key == "qps" else "Concurrency"}</th><th>Requests</th>'
+        '<th>Throughput (req/s)</th><th>p50 (s)</th><th>p95 (s)</th><th>p99 (s)</th>'
+        '<th>TTFT p50 (s)</th><th>TTFT p95 (s)</th><th>TTFT p99 (s)</th><th>Error Rate</th><th>Timeout Rate</th></tr>'
+    )
+    for step in results["steps"]:
+        color = "red" if step["error_rate"] > SATURATION_MAX_ERROR_RATE else "black"
+        html += (
+            f'<tr><td>{step[load_key]}</td><td>{step["requests"]}</td><td>{step["throughput_rps"]}</td>'
+            f'<td>{step["latency_p50_sec"]}</td><td>{step["latency_p95_sec"]}</td><td>{step["latency_p99_sec"]}</td>'
+            f'<td>{step["ttft_p50_sec"]}</td><td>{step["ttft_p95_sec"]}</td><td>{step["ttft_p99_sec"]}</td>'
+            f'<td style="color:{color}">{step["error_rate"]:.1%}</td><td>{step["timeout_rate"]:.1%}</td></tr>'
+        )
+    html += '</table>'
+    saturation = results.get("saturation")
+    if saturation:
+        html += (
+            f'<p>Saturation point: {load_key}={saturation[load_key]} '
+            f'({saturation["throughput_rps"]} req/s, p95 {saturation["latency_p95_sec"]}s) - {saturation["reason"]}</p>'
+        )
+    return html
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Lightspeed /v1/query endpoint")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", default="1",
+                      help="Concurrent users, or a comma-separated ramp such as 1,2,4,8")
+    load.add_argument("--qps", help="Target requests per second, or a comma-separated ramp such as 1,2,5")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds per load step")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="Request cap for --qps mode")
+    parser.add_argument("--output", default="reports/load_test.json")
+    parser.add_argument("--html", default="reports/load_test.html")
+    args = parser.parse_args()
+
+    results = run_load_test(
+        concurrency=None if args.qps else [int(v) for v in args.concurrency.split(",")],
+        qps=[float(v) for v in args.qps.split(",")] if args.qps else None,
+        duration=args.duration,
+        max_in_flight=args.max_in_flight
+    )
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"✓ Load test results written to {output}")
+    if args.html:
+        html_path = Path(args.html)
+        html_path.parent.mkdir(parents=True, exist_ok=True)
+        html_path.write_text(f"<html><body>{load_test_summary_html(results)}</body></html>")
+        print(f"✓ Load test report written to {html_path}")
+    if results["saturation"]:
+        print(f"📈 Saturation point: {results['saturation']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from Utils.judge_cache import get_judge_cache, metric_name
+from Utils.tracing import get_tracer
+from Utils.multi_criteria import group_criteria, is_single_call_enabled
+
+
+def get_metric_concurrency() -> int:
+    # 1 keeps the original one-after-another behaviour
+    try:
+        return max(1, int(os.getenv("METRIC_CONCURRENCY", "1")))
+    except ValueError:
+        return 1
+
+
+async def _measure_concurrently(metrics, test_case, limit: int, finished) -> None:
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(metric):
+        async with semaphore:
+            with get_tracer().span(f"metric.{metric_name(metric)}"):
+                if metric.async_mode:
+                    await metric.a_measure(test_case, _show_indicator=False)
+                else:
+                    await asyncio.to_thread(metric.measure, test_case)
+        finished(metric)
+
+    # Every unit finishes (and is persisted) before the first failure is raised
+    results = await asyncio.gather(*(run(metric) for metric in metrics), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+def _run_coroutine(coroutine) -> None:
+    # asyncio.run refuses to start inside a running loop (a sync Playwright session keeps one
+    # on this thread), so in that case the coroutine gets its own loop on a worker thread
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="metrics") as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+# Scores and reasons are left on the metric objects exactly as `.measure()` would.
+# Verdicts already in the run checkpoint or the judge cache are replayed instead of being
+# sent to the judge, and with GEVAL_SINGLE_CALL=yes the remaining GEval criteria share one
+# judge call. use_cache=False always asks the judge (repeated trials need independent verdicts).
+def measure_metrics(metrics, test_case, max_concurrency: int | None = None, use_cache: bool = True,
+                    checkpoint=None) -> None:
+    cache = get_judge_cache() if use_cache else None
+    tracer = get_tracer()
+    pending = list(metrics)
+    with tracer.span("judge_cache.load", metrics=len(metrics)):
+        if checkpoint is not None:
+            pending = [metric for metric in pending if not checkpoint.load(metric, test_case)]
+        if cache is not None:
+            cached = [metric for metric in pending if cache.load(metric, test_case)]
+            pending = [metric for metric in pending if metric not in cached]
+            for metric in cached:
+                if checkpoint is not None:
+                    checkpoint.store(metric, test_case)
+    units = group_criteria(pending) if is_single_call_enabled() else pending
+
+    def finished(unit):
+        # Verdicts are persisted as each unit completes, so an interrupted run keeps them
+        for metric in getattr(unit, "criteria", [unit]):
+            if cache is not None:
+                cache.store(metric, test_case)
+            if checkpoint is not None:
+                checkpoint.store(metric, test_case)
+
+    limit = max_concurrency or get_metric_concurrency()
+    if limit == 1 or len(units) <= 1:
+        for unit in units:
+            with tracer.span(f"metric.{metric_name(unit)}"):
+                unit.measure(test_case)
+            finished(unit)
+    else:
+        _run_coroutine(_measure_concurrently(units, test_case, limit, finished))
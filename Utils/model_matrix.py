@@ -0,0 +1,188 @@
+import os
+import statistics
+from dataclasses import dataclass
+from Utils.latency_stats import summarize_latencies
+from Utils.regression_gate import QUALITY_METRICS
+
+# Matrix runs evaluate the question set against several (provider, model) pairs in one
+# session. EVAL_MODELS lists them as comma-separated "provider/model" entries (the model
+# part may contain slashes itself). Every result is tagged with its provider and model,
+# and the report compares the models side by side.
+
+
+@dataclass(frozen=True)
+class ModelTarget:
+    provider: str
+    model: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+
+def parse_model_matrix(spec: str) -> list[ModelTarget]:
+    targets = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        provider, _, model = entry.partition("/")
+        if not provider.strip() or not model.strip():
+            raise ValueError(f"EVAL_MODELS entries must look like provider/model, got {entry!r}")
+        targets.append(ModelTarget(provider.strip(), model.strip()))
+    return list(dict.fromkeys(targets))
+
+
+def get_model_matrix() -> list[ModelTarget]:
+    # Empty when EVAL_MODELS is unset: a single run against Model/Provider from .env
+    return parse_model_matrix(os.getenv("EVAL_MODELS", ""))
+
+
+def model_label(provider: str | None, model: str | None) -> str | None:
+    return f"{provider or ''}/{model}" if model else None
+
+
+def result_key(question: str, target: ModelTarget | None):
+    # Results, prefetched answers and previous rows are keyed per question, and per
+    # question and model in a matrix run
+    return (question, target.label) if target else question
+
+
+def index_previous(rows) -> dict:
+    # Latest history rows by result_key(); untagged rows from older runs are found by question only
+    previous = {}
+    for row in rows:
+        previous[row["question"]] = row
+        label = model_label(row.get("provider"), row.get("model"))
+        if label:
+            previous[(row["question"], label)] = row
+    return previous
+
+
+def split_series_by_model(df):
+    # Once the history holds more than one model, each (question, model) pair is its own
+    # series for baselines and trends
+    if df.empty or "model" not in df:
+        return df
+    provider = df["provider"].fillna("").astype(str) if "provider" in df else ""
+    labels = provider + "/" + df["model"].astype(str)
+    tagged = df["model"].notna() & (df["model"] != "")
+    if labels[tagged].nunique() <= 1:
+        return df
+    df = df.copy()
+    df.loc[tagged, "question"] = df.loc[tagged, "question"] + " [" + labels[tagged] + "]"
+    return df
+
+
+def is_matrix_result(scores) -> bool:
+    return len({model_label(s.get("provider"), s.get("model")) for s in scores}) > 1
+
+
+def score_label(score: dict, matrix: bool) -> str:
+    # Chart label of one result: the question, plus the model in a matrix run
+    label = model_label(score.get("provider"), score.get("model"))
+    return f"{score['question']} [{label}]" if matrix and label else score["question"]
+
+
+def unscored_result(question: str, label: str | None, status: str) -> dict:
+    # Stands in for the score_data of a question that errored or was skipped, so
+    # compare_models counts it as a failure of its model
+    provider, _, model = (label or "").partition("/")
+    return {"question": question, "provider": provider or None, "model": model or None,
+            "status": status, "passed": False}
+
+
+def compare_models(scores, min_pass_rate: float | None = None) -> list[dict]:
+    # One row per model: mean quality per metric, the share of questions that passed their
+    # thresholds, latency percentiles and throughput. `scores` holds every evaluation of a
+    # model: errored and skipped ones (unscored_result) count against its pass rate. The
+    # fastest model (by median RAG time) with a pass rate of at least MATRIX_MIN_PASS_RATE
+    # is marked as recommended.
+    if min_pass_rate is None:
+        min_pass_rate = float(os.getenv("MATRIX_MIN_PASS_RATE", "1.0"))
+    by_model = {}
+    for score in scores:
+        by_model.setdefault(model_label(score.get("provider"), score.get("model")) or "default", []).append(score)
+
+    rows = []
+    for label, results in by_model.items():
+        row = {"model": label, "questions": len(results),
+               "unscored": sum(r.get("status") in ("error", "skipped") for r in results)}
+        for metric in QUALITY_METRICS:
+            values = [r[metric] for r in results if r.get(metric) is not None]
+            row[metric] = round(statistics.fmean(values), 3) if values else None
+        row["pass_rate"] = round(sum(bool(r.get("passed")) for r in results) / len(results), 3)
+        row.update(summarize_latencies([r.get("ttft_sec") for r in results], "ttft"))
+        row.update(summarize_latencies([r.get("rag_time_sec") for r in results], "rag_time"))
+        throughput = [r["tokens_per_sec"] for r in results if r.get("tokens_per_sec") is not None]
+        row["tokens_per_sec"] = round(statistics.fmean(throughput), 2) if throughput else None
+        row["recommended"] = False
+        rows.append(row)
+
+    eligible = [r for r in rows if r["pass_rate"] >= min_pass_rate and r["rag_time_p50"] is not None]
+    if eligible:
+        min(eligible, key=lambda r: r["rag_time_p50"])["recommended"] = True
+    return sorted(rows, key=lambda r: r["model"])
+
+
+def comparison_chart_specs(rows) -> dict:
+    from Utils.report_charts import bar_chart
+
+    labels = [row["model"] for row in rows]
+    metrics = [metric for metric in QUALITY_METRICS if any(row[metric] is not None for row in rows)]
+    width = 0.8 / max(len(metrics), 1)
+    return {
+        "models:quality": bar_chart(labels, [{
+            "title": "Mean Score per Metric by Model",
+            "ylabel": "Score",
+            "bar_width": width,
+            "series": [
+                {"label": metric.replace("_", " ").capitalize(), "values": [row[metric] or 0 for row in rows],
+                 "offset": index - (len(metrics) - 1) / 2}
+                for index, metric in enumerate(metrics)
+            ]
+        }]),
+        "models:latency": bar_chart(labels, [
+            {
+                "title": "Time to First Token vs Total Response (p50)",
+                "ylabel": "Seconds",
+                "bar_width": 0.4,
+                "series": [
+                    {"label": "TTFT p50", "values": [row["ttft_p50"] or 0 for row in rows],
+                     "color": "teal", "offset": -0.5},
+                    {"label": "RAG time p50", "values": [row["rag_time_p50"] or 0 for row in rows],
+                     "color": "orange", "offset": 0.5},
+                ]
+            },
+            {
+                "title": "Streaming Throughput",
+                "ylabel": "Tokens / sec",
+                "series": [{"values": [row["tokens_per_sec"] or 0 for row in rows], "color": "slateblue"}]
+            }
+        ], figsize=(14, 4)),
+    }
+
+
+def model_comparison_html(rows) -> str:
+    def cell(value):
+        return "" if value is None else value
+
+    html = (
+        '<table border="1" style="border-collapse: collapse; font-size: 14px;">'
+        '<tr><th>Model</th><th>Questions</th><th>Errored/Skipped</th><th>Pass Rate</th><th>Relevancy</th><th>Faithfulness</th>'
+        '<th>Bias</th><th>Hallucination</th><th>TTFT p50/p95 (s)</th><th>RAG Time p50/p95 (s)</th>'
+        '<th>Tokens/sec</th></tr>'
+    )
+    for row in rows:
+        model = f'<b>{row["model"]}</b> ⭐' if row["recommended"] else row["model"]
+        html += (
+            f'<tr><td>{model}</td><td>{row["questions"]}</td><td>{row["unscored"]}</td><td>{row["pass_rate"]:.0%}</td>'
+            + "".join(f'<td>{cell(row[metric])}</td>' for metric in ["relevancy", "faithfulness", "bias", "hallucination"])
+            + f'<td>{cell(row["ttft_p50"])} / {cell(row["ttft_p95"])}</td>'
+            f'<td>{cell(row["rag_time_p50"])} / {cell(row["rag_time_p95"])}</td>'
+            f'<td>{cell(row["tokens_per_sec"])}</td></tr>'
+        )
+    html += '</table>'
+    if any(row["recommended"] for row in rows):
+        html += '<p>⭐ Fastest model (median RAG time) whose pass rate meets MATRIX_MIN_PASS_RATE.</p>'
+    return html
@@ -0,0 +1,130 @@
+import os
+import asyncio
+
+# GEval metrics that read the same test case fields with the same judge are scored
+# together in one judge call. Criteria the judge leaves out, or scores out of range,
+# fall back to their own GEval call.
+
+PROMPT_TEMPLATE = """You are evaluating an LLM response against several independent criteria.
+Judge each criterion on its own by following its evaluation steps, then give it an integer
+score from 0 (does not meet the criterion at all) to 10 (fully meets it) and a concise reason.
+
+{fields}
+
+Criteria:
+{criteria}
+
+Return only JSON, with one entry per criterion, in exactly this form:
+{{"scores": [{{"name": "<criterion name>", "score": <0-10>, "reason": "<reason>"}}]}}
+"""
+
+
+def is_single_call_enabled() -> bool:
+    return os.getenv("GEVAL_SINGLE_CALL", "yes").lower() == "yes"
+
+
+def _param_name(param) -> str:
+    return getattr(param, "value", param)
+
+
+def is_combinable(metric) -> bool:
+    # Rubrics and strict mode change how GEval maps the raw score, so those keep their own call
+    from deepeval.metrics import GEval
+
+    return (
+        isinstance(metric, GEval)
+        and bool(metric.evaluation_steps)
+        and bool(metric.evaluation_params)
+        and not metric.rubric
+        and not metric.strict_mode
+    )
+
+
+def build_prompt(criteria, test_case) -> str:
+    fields = "\n\n".join(
+        f"{_param_name(param).replace('_', ' ').title()}:\n{getattr(test_case, _param_name(param))}"
+        for param in criteria[0].evaluation_params
+    )
+    listed = "\n".join(
+        f"{i}. {metric.name}\n" + "\n".join(f"   - {step}" for step in metric.evaluation_steps)
+        for i, metric in enumerate(criteria, start=1)
+    )
+    return PROMPT_TEMPLATE.format(fields=fields, criteria=listed)
+
+
+def parse_scores(output: str, criteria) -> dict:
+    # name -> (raw 0-10 score, reason); anything missing or malformed is left out
+    from deepeval.metrics.utils import trimAndLoadJson
+
+    try:
+        data = trimAndLoadJson(output)
+    except ValueError:
+        return {}
+    parsed = {}
+    by_name = {metric.name.lower(): metric.name for metric in criteria}
+    for entry in data.get("scores", []) if isinstance(data, dict) else []:
+        try:
+            name = by_name.get(str(entry["name"]).strip().lower())
+            score = float(entry["score"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if name and 0 <= score <= 10:
+            parsed[name] = (score, str(entry.get("reason", "")))
+    return parsed
+
+
+class CriteriaGroup:
+    # Looks like a metric to measure_metrics; scores are written to the member GEval metrics
+    async_mode = True
+
+    def __init__(self, criteria):
+        self.criteria = criteria
+        self.model = criteria[0].model
+        self.name = "GEval[" + ", ".join(metric.name for metric in criteria) + "]"
+
+    def _apply(self, output) -> list:
+        if isinstance(output, tuple):
+            output = output[0]
+        parsed = parse_scores(output, self.criteria)
+        unparsed = []
+        for metric in self.criteria:
+            if metric.name not in parsed:
+                unparsed.append(metric)
+                continue
+            score, reason = parsed[metric.name]
+            metric.score = score / 10
+            metric.reason = reason
+            metric.error = None
+            metric.success = metric.is_successful()
+        if unparsed:
+            print(f"⚠️ Combined GEval judge call did not score {', '.join(m.name for m in unparsed)}; "
+                  "falling back to individual calls")
+        return unparsed
+
+    def measure(self, test_case, *args, **kwargs):
+        for metric in self._apply(self.model.generate(build_prompt(self.criteria, test_case))):
+            metric.measure(test_case, _show_indicator=False)
+
+    async def a_measure(self, test_case, *args, **kwargs):
+        output = await self.model.a_generate(build_prompt(self.criteria, test_case))
+        await asyncio.gather(*(
+            metric.a_measure(test_case, _show_indicator=False) for metric in self._apply(output)
+        ))
+
+
+def group_criteria(metrics) -> list:
+    # Replaces combinable GEval metrics sharing fields and judge with one CriteriaGroup each
+    groups, units = {}, []
+    for metric in metrics:
+        if not is_combinable(metric):
+            units.append(metric)
+            continue
+        key = (tuple(_param_name(p) for p in metric.evaluation_params), metric.evaluation_model)
+        if key not in groups:
+            groups[key] = []
+            units.append(groups[key])
+        groups[key].append(metric)
+    return [
+        unit if not isinstance(unit, list) else CriteriaGroup(unit) if len(unit) > 1 else unit[0]
+        for unit in units
+    ]
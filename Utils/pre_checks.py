@@ -0,0 +1,159 @@
+import os
+import re
+import time
+from dataclasses import dataclass, field
+
+# Cheap local checks on the RAG answer that run before any judge call. Each check's
+# action is one of:
+#   fail              - fail the test immediately, no judge calls
+#   skip:<m1>,<m2>    - don't send these metrics (score_data keys, or "all") to the judge
+#   warn              - only report the finding
+# PRECHECK_ACTIONS overrides the defaults, e.g. "glitch=fail;repetition=skip:informativeness,clarity"
+
+DEFAULT_ACTIONS = {
+    "error_string": "fail",
+    "length": "fail",
+    "glitch": "warn",
+    "repetition": "warn",
+}
+
+# A letter repeated 4+ times regardless of case ("loooong", "cCCCCell"), or a word said 3+ times
+# in a row. Tokens with digits ("0.0.0.0"), hex values ("#FFFFFF", "deadbeef") and all-caps
+# acronyms ("AAAA record") are not glitches.
+ELONGATED_RE = re.compile(r"\b[A-Za-z0-9]*([A-Za-z])(?i:\1){3,}[A-Za-z0-9]*\b")
+REPEATED_WORD_RE = re.compile(r"\b([^\W\d_]+)(?:\W+\1\b){2,}", re.IGNORECASE)
+HEX_RE = re.compile(r"[0-9A-Fa-f]+")
+TAG_RE = re.compile(r"<[^>]+>")
+
+# Error responses returned in place of an answer. The anchored patterns must start the answer;
+# the others only count when the error text is at least half of the answer (HTML tags aside,
+# so proxy error pages are caught). Answers that explain a "503 Service Unavailable" or quote
+# a traceback while troubleshooting pass.
+ANCHORED_ERROR_PATTERNS = [
+    r"\A\s*(error|exception)\s*:",
+    r"\A\s*traceback \(most recent call last\)",
+    r"\A\s*(http/[\d.]+ )?[45]\d\d [a-z ]+\s*\Z",
+]
+ERROR_PATTERNS = [
+    r"traceback \(most recent call last\)",
+    r"internal server error",
+    r"\b(bad gateway|service unavailable|gateway time-?out)\b",
+    r"\brequest timed out\b",
+    r"\bconnection (refused|reset)\b",
+    r"\bunauthorized\b.{0,40}\btoken\b",
+]
+
+
+@dataclass
+class CheckResult:
+    name: str
+    passed: bool
+    score: float
+    reason: str
+
+
+@dataclass
+class PreCheckReport:
+    results: dict = field(default_factory=dict)     # name -> CheckResult
+    failures: list = field(default_factory=list)    # CheckResults whose action is "fail"
+    skipped_metrics: set = field(default_factory=set)
+    elapsed_ms: float = 0.0
+
+    def skips(self, metric: str) -> bool:
+        return metric in self.skipped_metrics or "all" in self.skipped_metrics
+
+    def summary(self) -> str:
+        return " | ".join(f"{r.name}: {'ok' if r.passed else r.reason}" for r in self.results.values())
+
+
+def check_length(answer: str) -> CheckResult:
+    min_chars = int(os.getenv("PRECHECK_MIN_CHARS", "1"))
+    max_chars = int(os.getenv("PRECHECK_MAX_CHARS", "20000"))
+    length = len(answer.strip())
+    passed = min_chars <= length <= max_chars
+    reason = f"{length} characters" + ("" if passed else f" (allowed {min_chars}-{max_chars})")
+    return CheckResult("length", passed, 1.0 if passed else 0.0, reason)
+
+
+def check_error_string(answer: str) -> CheckResult:
+    # Patterns from PRECHECK_ERROR_PATTERNS match anywhere, like the anchored ones
+    patterns = ANCHORED_ERROR_PATTERNS + [p for p in os.getenv("PRECHECK_ERROR_PATTERNS", "").split(";") if p]
+    for pattern in patterns:
+        match = re.search(pattern, answer, re.IGNORECASE | re.MULTILINE)
+        if match:
+            return CheckResult("error_string", False, 0.0, f"error text in answer: {match.group(0).strip()!r}")
+    text = " ".join(TAG_RE.sub(" ", answer).split())
+    matches = [m.group(0) for pattern in ERROR_PATTERNS for m in re.finditer(pattern, text, re.IGNORECASE)]
+    if matches and sum(map(len, matches)) * 2 >= len(text):
+        return CheckResult("error_string", False, 0.0, f"error text in answer: {matches[0].strip()!r}")
+    return CheckResult("error_string", True, 1.0, "no error text")
+
+
+def is_glitch_word(word: str) -> bool:
+    return not (any(c.isdigit() for c in word) or word.isupper() or HEX_RE.fullmatch(word))
+
+
+def check_glitches(answer: str) -> CheckResult:
+    findings = [m.group(0) for m in ELONGATED_RE.finditer(answer) if is_glitch_word(m.group(0))]
+    findings += [m.group(0) for m in REPEATED_WORD_RE.finditer(answer)]
+    if findings:
+        shown = ", ".join(repr(f[:30]) for f in findings[:5])
+        return CheckResult("glitch", False, 0.0, f"{len(findings)} glitch(es): {shown}")
+    return CheckResult("glitch", True, 1.0, "no repeated characters, random casing or stutters")
+
+
+def repetition_ratio(answer: str, n: int = 3) -> float:
+    # Share of word n-grams that repeat an earlier n-gram; looping generations score high
+    words = answer.lower().split()
+    ngrams = [tuple(words[i:i + n]) for i in range(len(words) - n + 1)]
+    if len(ngrams) < 10:
+        return 0.0
+    return 1 - len(set(ngrams)) / len(ngrams)
+
+
+def check_repetition(answer: str) -> CheckResult:
+    max_ratio = float(os.getenv("PRECHECK_MAX_REPETITION", "0.3"))
+    ratio = repetition_ratio(answer, int(os.getenv("PRECHECK_NGRAM", "3")))
+    passed = ratio <= max_ratio
+    reason = f"repeated n-gram ratio {ratio:.2f}" + ("" if passed else f" (max {max_ratio})")
+    return CheckResult("repetition", passed, round(1 - ratio, 3), reason)
+
+
+CHECKS = {
+    "error_string": check_error_string,
+    "length": check_length,
+    "glitch": check_glitches,
+    "repetition": check_repetition,
+}
+
+
+def get_actions() -> dict:
+    actions = dict(DEFAULT_ACTIONS)
+    for entry in os.getenv("PRECHECK_ACTIONS", "").split(";"):
+        if "=" not in entry:
+            continue
+        name, action = (part.strip() for part in entry.split("=", 1))
+        if name not in CHECKS:
+            raise ValueError(f"Unknown pre-check {name!r} in PRECHECK_ACTIONS; expected one of {sorted(CHECKS)}")
+        if action not in ("fail", "warn") and not action.startswith("skip:"):
+            raise ValueError(f"Invalid action {action!r} for pre-check {name!r}: use fail, warn or skip:<metrics>")
+        actions[name] = action
+    return actions
+
+
+def run_pre_checks(answer: str, actions: dict | None = None) -> PreCheckReport:
+    actions = actions or get_actions()
+    start = time.perf_counter()
+    report = PreCheckReport()
+    for name, check in CHECKS.items():
+        result = check(answer or "")
+        report.results[name] = result
+        if result.passed:
+            continue
+        action = actions.get(name, "warn")
+        if action == "fail":
+            report.failures.append(result)
+        elif action.startswith("skip:"):
+            report.skipped_metrics.update(m.strip() for m in action[len("skip:"):].split(",") if m.strip())
+    report.elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+    return report
@@ -1,3 +1,7 @@
+import os
+from functools import lru_cache
+from Utils.golden_dataset import GoldenDataset, select_from_env
+
 contexts = {
     "hi": [
         "OpenShift Lightspeed is an AI assistant designed to help developers with OpenShift-related queries.",
@@ -22,8 +26,32 @@ contexts = {
     "how can I cook food": []
 }
 
+@lru_cache(maxsize=1)
+def get_dataset() -> GoldenDataset:
+    # DATASET_PATH points at a JSONL/YAML/Parquet golden set; the dict above is the default
+    dataset_path = os.getenv("DATASET_PATH")
+    if dataset_path:
+        return GoldenDataset(dataset_path)
+    return GoldenDataset.from_dict(contexts)
+
 def get_context(question: str) -> list[str]:
-    return contexts.get(question, ["No context found for this question."])
+    # Curated contexts win; questions without any are answered from the CONTEXT_CORPUS
+    # BM25 index (CONTEXT_RETRIEVAL=always uses the index for every question)
+    dataset = get_dataset()
+    index = None
+    if os.getenv("CONTEXT_CORPUS"):
+        from Utils.context_index import get_context_index   # NumPy is only loaded when retrieval is on
+
+        index = get_context_index()
+    if index is not None and (question not in dataset or os.getenv("CONTEXT_RETRIEVAL", "fallback") == "always"):
+        hits = index.search(
+            question,
+            k=int(os.getenv("CONTEXT_TOP_K", "3")),
+            min_score=float(os.getenv("CONTEXT_MIN_SCORE", "0"))
+        )
+        return [passage for passage, _ in hits]
+    return dataset.get_contexts(question)
 
 def get_all_questions() -> list[str]:
-    return list(contexts.keys())
\ No newline at end of file
+    # Honours DATASET_TAGS, DATASET_SAMPLE/DATASET_SEED and DATASET_SHARD (or CI_NODE_INDEX/CI_NODE_TOTAL)
+    return select_from_env(get_dataset())
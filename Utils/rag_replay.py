@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+RECORDING_VERSION = 1
+
+
+def get_record_dir() -> str | None:
+    return os.getenv("RAG_RECORD_DIR") or None
+
+def get_replay_dir() -> str | None:
+    return os.getenv("RAG_REPLAY_DIR") or None
+
+def is_replay_mode() -> bool:
+    return get_replay_dir() is not None
+
+def recording_key(query: str, model: str | None, provider: str | None) -> str:
+    raw = json.dumps([query, model, provider], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class StreamRecorder:
+    # Captures every raw SSE line (blank separators included) with its offset from the request start
+    def __init__(self, query: str, model: str | None, provider: str | None):
+        self.query = query
+        self.model = model
+        self.provider = provider
+        self.start = time.perf_counter()
+        self.events = []
+
+    def add(self, line: str | bytes):
+        self.events.append({
+            "t": round(time.perf_counter() - self.start, 6),
+            "line": line if isinstance(line, str) else line.decode("utf-8", errors="replace")
+        })
+
+    def save(self, directory: str, status: int = 200, body: str | None = None) -> Path:
+        path = Path(directory) / f"{recording_key(self.query, self.model, self.provider)}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            "version": RECORDING_VERSION,
+            "query": self.query,
+            "model": self.model,
+            "provider": self.provider,
+            "status": status,
+            "body": body,
+            "recorded_at": time.time(),
+            "events": self.events
+        }, ensure_ascii=False, indent=1))
+        return path
+
+
+def load_recordings(directory: str) -> dict:
+    recordings = {}
+    for path in sorted(Path(directory).glob("*.json")):
+        try:
+            recording = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Skipping unreadable recording {path}: {e}")
+            continue
+        key = recording_key(recording["query"], recording.get("model"), recording.get("provider"))
+        recordings[key] = recording
+        # Fallback lookup by query alone for replays against a different model
+        recordings.setdefault(("query", recording["query"]), recording)
+    return recordings
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    recordings = {}
+    pace = "fast"
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/v1/query"):
+            return self._send_json(404, {"detail": f"Unknown path {self.path}"})
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send_json(400, {"detail": "Request body is not valid JSON"})
+
+        query = request.get("query", "")
+        recording = (
+            self.recordings.get(recording_key(query, request.get("model"), request.get("provider")))
+            or self.recordings.get(("query", query))
+        )
+        if recording is None:
+            return self._send_json(404, {"detail": f"No recording for query: {query}"})
+
+        if recording["status"] != 200:
+            body = (recording.get("body") or "").encode("utf-8")
+            self.send_response(recording["status"])
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        # Chunked like the real endpoint, so clients see each event as soon as it is written
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        start = time.perf_counter()
+        for event in recording["events"]:
+            if self.pace == "realtime":
+                delay = event["t"] - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            data = event["line"].encode("utf-8") + b"\n"
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            if self.pace == "realtime":
+                self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(recordings_dir: str, pace: str = "fast", host: str = "127.0.0.1", port: int = 0):
+    # Serves recorded streams on a background thread; returns (server, base_url)
+    handler = type("BoundReplayHandler", (ReplayHandler,), {
+        "recordings": load_recordings(recordings_dir),
+        "pace": pace
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="rag-replay-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded Lightspeed /v1/query streams locally")
+    parser.add_argument("--recordings", required=True, help="Directory written with RAG_RECORD_DIR")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pace", choices=["realtime", "fast"], default="realtime")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.recordings, args.pace, args.host, args.port)
+    count = sum(1 for key in server.RequestHandlerClass.recordings if isinstance(key, str))
+    print(f"✓ Replaying {count} recordings at {url} (pace: {args.pace})")
+    print(f"  Use Base_Url={url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
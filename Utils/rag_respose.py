@@ -1,65 +1,290 @@
 import os
-import json
 import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
 from dotenv import load_dotenv, find_dotenv
 import time
+from dataclasses import dataclass, field
+from Utils.rag_replay import StreamRecorder, get_record_dir
+from Utils.sse_parser import SSEParser, TokenStream
+from Utils.model_matrix import ModelTarget, result_key
+from Utils.rag_scheduler import get_max_in_flight, get_pool_size, get_scheduler, parse_retry_after
+from Utils.latency_stats import summarize_latencies
+from Utils.tracing import get_tracer, now
 
-def get_env_values():
-    # Reload .env file to get latest values
+_session = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _load_dotenv_once():
     dotenv_path = find_dotenv()
     load_dotenv(dotenv_path, override=True)
-    return {
-        "bearer_token": os.getenv("BEARER_TOKEN"),
-        "base_url": os.getenv("Base_Url"),
-        "model": os.getenv("Model"),
-        "provider": os.getenv("Provider")
-    }
 
-def get_rag_response(question: str) -> tuple[str, float]:
-    # Get latest environment values
+@lru_cache(maxsize=1)
+def get_env_values():
+    # The .env file is read once per process; after a new token is put in os.environ,
+    # refresh_env_values() picks it up
+    with get_tracer().span("env.load"):
+        _load_dotenv_once()
+        return {
+            "bearer_token": os.getenv("BEARER_TOKEN"),
+            # Set by the replay stub (RAG_REPLAY_DIR) so .env reloads cannot point back at the live backend
+            "base_url": os.getenv("RAG_REPLAY_URL") or os.getenv("Base_Url"),
+            "model": os.getenv("Model"),
+            "provider": os.getenv("Provider"),
+            "connect_timeout": float(os.getenv("RAG_CONNECT_TIMEOUT", "10")),
+            "read_timeout": float(os.getenv("RAG_TIMEOUT", "120")),
+            "total_timeout": float(os.getenv("RAG_TOTAL_TIMEOUT", "300")),
+            "max_answer_chars": int(os.getenv("RAG_MAX_ANSWER_CHARS", "0")),
+            "record_dir": get_record_dir()
+        }
+
+def refresh_env_values():
+    get_env_values.cache_clear()
+    return get_env_values()
+
+def get_session(pool_size: int | None = None) -> requests.Session:
+    # One pooled session per process so keep-alive connections are reused across questions.
+    # Callers that set their own concurrency, such as the load test, pass the pool_size they
+    # need; the pool is never smaller than get_pool_size() and only ever grows
+    global _session, _session_pool_size
+    with _session_lock:
+        if _session is None or (pool_size or 0) > _session_pool_size:
+            _session_pool_size = max(pool_size or 0, get_pool_size(), _session_pool_size)
+            adapter = HTTPAdapter(pool_connections=_session_pool_size, pool_maxsize=_session_pool_size)
+            session = _session or requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+    return _session
+
+@dataclass
+class RagResult:
+    answer: str
+    rag_time: float
+    error: str | None = None
+    timed_out: bool = False
+    # The stream was cut off at RAG_MAX_ANSWER_CHARS
+    truncated: bool = False
+    # Offsets from the start of the request, measured with a monotonic clock
+    ttfb: float | None = None
+    ttft: float | None = None
+    token_times: list[float] = field(default_factory=list)
+    # HTTP status (None when no response arrived), the server's Retry-After in seconds
+    # and the number of attempts the scheduler made
+    status: int | None = None
+    retry_after: float | None = None
+    attempts: int = 1
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def token_count(self) -> int:
+        return len(self.token_times)
+
+    @property
+    def inter_token_gaps(self) -> list[float]:
+        return [b - a for a, b in zip(self.token_times, self.token_times[1:])]
+
+    @property
+    def tokens_per_sec(self) -> float | None:
+        # Decode throughput: tokens streamed after the first one over the time they took
+        if self.token_count < 2:
+            return None
+        elapsed = self.token_times[-1] - self.token_times[0]
+        return (self.token_count - 1) / elapsed if elapsed > 0 else None
+
+    def latency_stats(self) -> dict:
+        gaps = summarize_latencies(self.inter_token_gaps, "itl", scale=1000, digits=1)
+        return {
+            "ttfb_sec": round(self.ttfb, 3) if self.ttfb is not None else None,
+            "ttft_sec": round(self.ttft, 3) if self.ttft is not None else None,
+            "itl_p50_ms": gaps["itl_p50"],
+            "itl_p95_ms": gaps["itl_p95"],
+            "itl_max_ms": gaps["itl_max"],
+            "token_count": self.token_count,
+            "tokens_per_sec": round(self.tokens_per_sec, 2) if self.tokens_per_sec is not None else None
+        }
+
+
+def _is_timeout(error: requests.exceptions.RequestException) -> bool:
+    # requests re-raises read timeouts hit mid-stream as ConnectionError(ReadTimeoutError)
+    if isinstance(error, requests.exceptions.Timeout):
+        return True
+    return any(isinstance(arg, ReadTimeoutError) for arg in error.args)
+
+def fetch_rag_answer(question: str, verbose: bool = True, target: ModelTarget | None = None,
+                     adaptive: bool = True) -> RagResult:
+    # target overrides Model/Provider from .env (matrix runs). Requests go through the
+    # adaptive scheduler (concurrency limit, retries with backoff); adaptive=False sends a
+    # single unthrottled request, as the load test needs to measure the raw endpoint.
+    with get_tracer().span("rag.request", question=question, model=target.label if target else None) as span:
+        if adaptive:
+            result = get_scheduler(target).run(lambda: _fetch_rag_answer(question, verbose, target),
+                                               log=print if verbose else None)
+        else:
+            result = _fetch_rag_answer(question, verbose, target)
+        span.update(ok=result.ok, timed_out=result.timed_out, tokens=result.token_count, attempts=result.attempts)
+        return result
+
+def _fetch_rag_answer(question: str, verbose: bool, target: ModelTarget | None) -> RagResult:
     env = get_env_values()
-    
+    tracer = get_tracer()
+    model = target.model if target else env['model']
+    provider = target.provider if target else env['provider']
+
     headers = {
         "Authorization": f"Bearer {env['bearer_token']}",
         "Content-Type": "application/json"
     }
 
-    start = time.time()
+    start = time.perf_counter()
+    started_at = now()
+    recorder = StreamRecorder(question, model, provider) if env['record_dir'] else None
     try:
-        response = requests.post(
+        response = get_session().post(
             url=f"{env['base_url']}/v1/query",
             headers=headers,
             json={
-                "model": env['model'],
-                "provider": env['provider'],
+                "model": model,
+                "provider": provider,
                 "query": question,
                 "attachments": []
             },
-            stream=True
+            stream=True,
+            timeout=(env['connect_timeout'], env['read_timeout'])
         )
+        ttfb = time.perf_counter() - start
+        tracer.add("rag.connect", started_at, started_at + ttfb)
+
+        with response:
+            # Check for non-2xx status codes
+            if not response.ok:
+                if recorder:
+                    recorder.save(env['record_dir'], response.status_code, response.text)
+                error = f"❌ RAG request failed with status code {response.status_code}: {response.text}"
+                return RagResult(
+                    error, 0.0, error=error, ttfb=ttfb, status=response.status_code,
+                    retry_after=parse_retry_after(response.headers.get("Retry-After"))
+                )
 
-        # Check for non-2xx status codes
-        if not response.ok:
-            return f"❌ RAG request failed with status code {response.status_code}: {response.text}", 0.0
-
-        answer_tokens = []
-        for line in response.iter_lines():
-            if line:
-                line_str = line.decode('utf-8').strip()
-                if line_str.startswith("data: "):
-                    try:
-                        data_obj = json.loads(line_str[6:])
-                        if data_obj.get("event") == "token":
-                            answer_tokens.append(data_obj["data"]["token"])
-                        elif data_obj.get("event") == "end":
-                            break
-                    except json.JSONDecodeError as e:
-                        print(f"⚠️ Error parsing JSON: {e} | Line: {line_str}")
-        rag_time = round(time.time() - start, 2)
-        print(f"⏱ RAG response time: {rag_time} sec")
-        return "".join(answer_tokens), rag_time
+            answer_tokens = []
+            token_times = []
+            # RAG_TIMEOUT bounds the wait for each chunk; the total deadline bounds the whole stream
+            parser = SSEParser(on_line=recorder.add if recorder else None)
+            stream = TokenStream(
+                response.iter_content(chunk_size=None),
+                parser,
+                total_timeout=env['total_timeout'] - ttfb if env['total_timeout'] > 0 else None,
+                max_chars=env['max_answer_chars'] or None
+            )
+            for token in stream:
+                token_times.append(time.perf_counter() - start)
+                answer_tokens.append(token)
+            stream_start = started_at + ttfb
+            tracer.add("rag.stream", stream_start, now(), tokens=len(answer_tokens), stop=stream.stop_reason)
+            # Parsing is interleaved with network reads; its summed CPU time is one span
+            tracer.add("rag.sse_parse", stream_start, stream_start + parser.parse_sec, cumulative=True)
+            if recorder:
+                recorder.save(env['record_dir'])
+            if parser.malformed and verbose:
+                print(f"⚠️ Skipped {parser.malformed} malformed SSE event(s), e.g.: {parser.malformed_sample}")
+        rag_time = round(time.perf_counter() - start, 2)
+
+        error = None
+        if stream.stop_reason == "deadline":
+            error = f"❌ RAG stream exceeded the total timeout of {env['total_timeout']} sec"
+        elif stream.stop_reason == "error":
+            error = f"❌ RAG stream returned an error event: {stream.error}"
+        if error:
+            if verbose:
+                print(error)
+            return RagResult(
+                error, rag_time, error=error, timed_out=stream.stop_reason == "deadline",
+                ttfb=ttfb, ttft=token_times[0] if token_times else None, token_times=token_times,
+                status=response.status_code
+            )
+        if stream.stop_reason == "max_chars" and verbose:
+            print(f"✂️ RAG answer truncated at {env['max_answer_chars']} characters")
+        if verbose:
+            print(f"⏱ RAG response time: {rag_time} sec")
+        return RagResult(
+            "".join(answer_tokens),
+            rag_time,
+            truncated=stream.stop_reason == "max_chars",
+            ttfb=ttfb,
+            ttft=token_times[0] if token_times else None,
+            token_times=token_times,
+            status=response.status_code
+        )
 
     except requests.exceptions.RequestException as e:
-        print(f"❌ Request error: {e}")
-        return "Error fetching response from RAG", 0.0
+        if verbose:
+            print(f"❌ Request error: {e}")
+        return RagResult(
+            "Error fetching response from RAG", 0.0, error=str(e),
+            timed_out=_is_timeout(e)
+        )
+
+class RagPrefetcher:
+    # Fetches answers for all questions in the background so the endpoint streams
+    # while the judge works. Nothing is sent until the first get()/start() call.
+    # With several targets (a matrix run) each model gets its own pool of max_in_flight
+    # workers, so the models stream concurrently and a slow one doesn't hold up the rest.
+    def __init__(self, questions, max_in_flight: int | None = None, enabled: bool = True,
+                 targets=None, exclude=None):
+        self.questions = list(dict.fromkeys(questions))
+        self.max_in_flight = max_in_flight or get_max_in_flight()
+        self.enabled = enabled
+        self.targets = list(targets) if targets else [None]
+        # result_key()s whose answers are already known, e.g. checkpointed by a resumed run
+        self.exclude = set(exclude or ())
+        self._executors = []
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if not self.enabled or self._executors:
+                return
+            for index, target in enumerate(self.targets):
+                executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix=f"rag-prefetch-{index}")
+                self._executors.append(executor)
+                for question in self.questions:
+                    if result_key(question, target) not in self.exclude:
+                        self._futures[(question, target)] = executor.submit(fetch_rag_answer, question, target=target)
+
+    def get(self, question: str, target: ModelTarget | None = None) -> RagResult:
+        self.start()
+        future = self._futures.get((question, target))
+        if future is None:
+            return fetch_rag_answer(question, target=target)
+        return future.result()
+
+    def iter_completed(self):
+        # Yields (question, target, RagResult) as answers complete, so a caller can judge
+        # whichever answer is ready instead of waiting on the next one in question order.
+        # Excluded (already answered) questions are left out.
+        self.start()
+        if not self.enabled:
+            for target in self.targets:
+                for question in self.questions:
+                    if result_key(question, target) not in self.exclude:
+                        yield question, target, fetch_rag_answer(question, target=target)
+            return
+        by_future = {future: key for key, future in self._futures.items()}
+        for future in as_completed(by_future):
+            question, target = by_future[future]
+            yield question, target, future.result()
 
+    def shutdown(self):
+        with self._lock:
+            for executor in self._executors:
+                executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,333 @@
+import os
+import math
+import time
+import random
+import datetime
+import threading
+import statistics
+from collections import deque
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from Utils.model_matrix import get_model_matrix
+
+# Client-side scheduling for /v1/query. An AIMD limiter adapts the number of requests in
+# flight to what the backend sustains: +1 slot per window of on-time answers, halved
+# when the backend throttles (429/503), errors, times out or its time to first token
+# grows well past its baseline (the median of recent answers). Every model of a matrix run
+# has its own limiter, as each is served with its own capacity and latency. Failed requests
+# are retried with jittered exponential backoff (or after Retry-After), bounded by a
+# session-wide retry budget.
+
+RETRY_STATUSES = {429, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+COUNTERS = ("requests", "attempts", "failed_attempts", "throttled", "retries", "failed",
+            "budget_exhausted", "backoff_sec")
+
+
+def get_max_in_flight() -> int:
+    return max(1, int(os.getenv("RAG_MAX_IN_FLIGHT", "4")))
+
+
+def get_pool_size() -> int:
+    # A matrix run streams from every model at once, each with up to RAG_MAX_IN_FLIGHT requests
+    return get_max_in_flight() * max(1, len(get_model_matrix()))
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    # Retry-After is either delay-seconds or an HTTP date
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+@dataclass
+class RetrySettings:
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    max_retry_after: float = 120.0
+    budget_ratio: float = 0.2
+    budget_min: int = 10
+
+    @classmethod
+    def from_env(cls) -> "RetrySettings":
+        return cls(
+            max_attempts=max(1, int(os.getenv("RAG_MAX_ATTEMPTS", "4"))),
+            base_delay=float(os.getenv("RAG_BACKOFF_BASE", "0.5")),
+            max_delay=float(os.getenv("RAG_BACKOFF_MAX", "30")),
+            max_retry_after=float(os.getenv("RAG_RETRY_AFTER_MAX", "120")),
+            budget_ratio=float(os.getenv("RAG_RETRY_BUDGET", "0.2")),
+            budget_min=int(os.getenv("RAG_RETRY_BUDGET_MIN", "10")),
+        )
+
+
+def backoff_delay(attempt: int, settings: RetrySettings, retry_after: float | None = None,
+                  rng=random) -> float | None:
+    # Seconds to wait before retrying after `attempt` failed attempts, or None when the
+    # server asks for a longer pause than RAG_RETRY_AFTER_MAX
+    if retry_after is not None:
+        if retry_after > settings.max_retry_after:
+            return None
+        # A little jitter on top, so throttled clients don't all come back at the same instant
+        return retry_after + rng.uniform(0, settings.base_delay)
+    # "Full jitter": uniform between 0 and the capped exponential step
+    return rng.uniform(0, min(settings.max_delay, settings.base_delay * 2 ** (attempt - 1)))
+
+
+def is_retryable(result) -> bool:
+    # Connection errors and timeouts before a response (status None) and overload statuses;
+    # other 4xx, errors inside a 200 stream and the total deadline are not retried
+    if result.ok:
+        return False
+    return result.status is None or result.status in RETRY_STATUSES
+
+
+class RetryBudget:
+    # Retries may add at most budget_ratio extra requests on top of budget_min, so a
+    # struggling backend isn't hit with a multiple of the normal load
+    def __init__(self, ratio: float, minimum: int):
+        self.ratio = ratio
+        self.tokens = float(minimum)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens += self.ratio
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class AdaptiveLimiter:
+    def __init__(self, max_limit: int, min_limit: int = 1, initial: int | None = None,
+                 latency_tolerance: float = 2.0, baseline_window: int = 50, min_samples: int = 5,
+                 clock=time.monotonic):
+        self.max_limit = max(max_limit, min_limit)
+        self.min_limit = min_limit
+        self.limit = float(initial or max(min_limit, math.ceil(self.max_limit / 2)))
+        self.latency_tolerance = latency_tolerance
+        self.min_samples = min_samples
+        self.clock = clock
+        # Times to first token of the latest answers; their median is the baseline, so a
+        # single unusually fast (or slow) answer doesn't move it
+        self.latencies = deque(maxlen=baseline_window)
+        self.in_flight = 0
+        self.decreases = 0
+        self._last_decrease = -math.inf
+        self._cond = threading.Condition()
+        # Time-weighted in-flight count, for the achieved concurrency
+        self.busy_sec = 0.0
+        self.active_sec = 0.0
+        self.peak_in_flight = 0
+        self.limit_min = self.limit_max = self.limit
+        self._last_change = clock()
+
+    @property
+    def baseline(self) -> float | None:
+        if len(self.latencies) < self.min_samples:
+            return None
+        return statistics.median(self.latencies)
+
+    def _account(self):
+        now = self.clock()
+        if self.in_flight:
+            self.busy_sec += self.in_flight * (now - self._last_change)
+            self.active_sec += now - self._last_change
+        self._last_change = now
+
+    def acquire(self) -> float:
+        # Blocks until a slot is free; returns the start time to pass to release()
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self._account()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return self.clock()
+
+    def release(self, started: float, congested: bool, latency: float | None = None):
+        with self._cond:
+            self._account()
+            self.in_flight -= 1
+            if latency is not None and not congested:
+                baseline = self.baseline
+                congested = baseline is not None and latency > baseline * (1 + self.latency_tolerance)
+                self.latencies.append(latency)
+            if congested:
+                # One decrease per congestion episode: requests already in flight when the
+                # limit was last cut report the same overload
+                if started >= self._last_decrease:
+                    self.limit = max(float(self.min_limit), self.limit / 2)
+                    self._last_decrease = self.clock()
+                    self.decreases += 1
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.limit_min = min(self.limit_min, self.limit)
+            self.limit_max = max(self.limit_max, self.limit)
+            self._cond.notify_all()
+
+
+class RequestScheduler:
+    def __init__(self, limiter: AdaptiveLimiter, settings: RetrySettings | None = None, sleep=time.sleep,
+                 budget: RetryBudget | None = None):
+        self.limiter = limiter
+        self.settings = settings or RetrySettings.from_env()
+        self.budget = budget or RetryBudget(self.settings.budget_ratio, self.settings.budget_min)
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._counts = {name: 0 for name in COUNTERS}
+        self._reported = {}
+
+    def _count(self, name: str, amount: float = 1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def run(self, send, log=None):
+        # send() performs one attempt and returns a RagResult; it is retried while the
+        # failure is retryable, attempts and budget remain and Retry-After is acceptable
+        self._count("requests")
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            attempt += 1
+            started = self.limiter.acquire()
+            try:
+                result = send()
+            except BaseException:
+                self.limiter.release(started, congested=True)
+                raise
+            congested = not result.ok and (result.status is None or result.status >= 500 or
+                                           result.status in THROTTLE_STATUSES or result.timed_out)
+            latency = result.ttft if result.ttft is not None else result.ttfb
+            self.limiter.release(started, congested, latency if result.ok else None)
+            self._count("attempts")
+            result.attempts = attempt
+            if result.ok:
+                return result
+            self._count("failed_attempts")
+            if result.status in THROTTLE_STATUSES:
+                self._count("throttled")
+            if not is_retryable(result):
+                self._count("failed")
+                return result
+            delay = backoff_delay(attempt, self.settings, result.retry_after)
+            if attempt >= self.settings.max_attempts or delay is None:
+                self._count("failed")
+                return result
+            if not self.budget.withdraw():
+                self._count("budget_exhausted")
+                self._count("failed")
+                return result
+            self._count("retries")
+            self._count("backoff_sec", delay)
+            if log:
+                log(f"🔁 Retrying in {delay:.1f} sec (attempt {attempt + 1}/{self.settings.max_attempts}): "
+                    f"{result.error}")
+            self.sleep(delay)
+
+    def stats_delta(self) -> dict:
+        # Counters since the previous call plus the limiter's current state; under xdist
+        # each worker ships its delta to the controller, which merges them with merge_stats
+        limiter = self.limiter
+        with limiter._cond:
+            limiter._account()
+            baseline = limiter.baseline
+            current = {
+                **self._counts,
+                "busy_sec": limiter.busy_sec,
+                "active_sec": limiter.active_sec,
+                "decreases": limiter.decreases,
+            }
+            state = {
+                "peak_in_flight": limiter.peak_in_flight,
+                "limit_min": round(limiter.limit_min, 2),
+                "limit_max": round(limiter.limit_max, 2),
+                "limit": round(limiter.limit, 2),
+                "baseline_sec": round(baseline, 3) if baseline is not None else None,
+            }
+        with self._lock:
+            delta = {name: value - self._reported.get(name, 0) for name, value in current.items()}
+            self._reported = current
+        return {**delta, **state}
+
+
+def merge_stats(total: dict, delta: dict) -> dict:
+    # Deltas without attempts are skipped: an idle limiter's state would skew the limits
+    if not delta.get("attempts"):
+        return total
+    for name, value in delta.items():
+        if name in ("peak_in_flight", "limit_max"):
+            total[name] = max(total.get(name, value), value)
+        elif name == "limit_min":
+            total[name] = min(total.get(name, value), value)
+        elif name in ("limit", "baseline_sec"):
+            total[name] = value
+        else:
+            total[name] = total.get(name, 0) + value
+    return total
+
+
+def merge_model_stats(totals: dict, deltas: dict) -> dict:
+    # Per-model totals from scheduler_stats_delta() deltas
+    for label, delta in deltas.items():
+        merge_stats(totals.setdefault(label, {}), delta)
+    return totals
+
+
+def achieved_concurrency(stats: dict) -> float | None:
+    # Mean number of requests in flight while any request was (per process under xdist)
+    return round(stats["busy_sec"] / stats["active_sec"], 2) if stats.get("active_sec") else None
+
+
+def format_stats(stats: dict) -> str:
+    return (
+        f"{stats.get('requests', 0)} requests, {stats.get('retries', 0)} retries "
+        f"({stats.get('throttled', 0)} throttled, {stats.get('budget_exhausted', 0)} out of budget), "
+        f"{stats.get('failed', 0)} failed | concurrency limit {stats.get('limit_min')}-{stats.get('limit_max')}, "
+        f"achieved mean {achieved_concurrency(stats)}, peak {stats.get('peak_in_flight', 0)}"
+        + (f" | TTFT baseline {stats['baseline_sec']} sec" if stats.get("baseline_sec") is not None else "")
+    )
+
+
+_schedulers = {}
+_budget = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(target=None) -> RequestScheduler:
+    # One scheduler per ModelTarget (None: Model/Provider from .env), so a slow model only
+    # lowers its own limit; the retry budget is shared by the whole session
+    global _budget
+    with _scheduler_lock:
+        scheduler = _schedulers.get(target)
+        if scheduler is None:
+            settings = RetrySettings.from_env()
+            if _budget is None:
+                _budget = RetryBudget(settings.budget_ratio, settings.budget_min)
+            limiter = AdaptiveLimiter(
+                max_limit=get_max_in_flight(),
+                min_limit=max(1, int(os.getenv("RAG_MIN_IN_FLIGHT", "1"))),
+                initial=int(os.getenv("RAG_INITIAL_IN_FLIGHT", "0")) or None,
+                latency_tolerance=float(os.getenv("RAG_LATENCY_TOLERANCE", "2.0")),
+                baseline_window=max(1, int(os.getenv("RAG_BASELINE_WINDOW", "50"))),
+            )
+            scheduler = _schedulers[target] = RequestScheduler(limiter, settings, budget=_budget)
+    return scheduler
+
+
+def scheduler_stats_delta() -> dict:
+    # stats_delta() of every scheduler used so far, by model label ("default" outside a matrix run)
+    with _scheduler_lock:
+        schedulers = list(_schedulers.items())
+    return {target.label if target else "default": scheduler.stats_delta() for target, scheduler in schedulers}
@@ -0,0 +1,150 @@
+import os
+import functools
+from dataclasses import dataclass
+
+# Regression checks for the current run against rolling per-question baselines from history.
+# Quality metrics use control limits (baseline mean +/- max(sigma * std, min_delta));
+# latency uses the baseline p95 plus a tolerance, per question and for the whole run.
+
+HIGHER_IS_BETTER = [
+    "relevancy", "faithfulness", "informativeness", "clarity",
+    "completeness", "tone_appropriateness", "glitch_check",
+]
+# deepeval 3 scored Bias and Hallucination as the share of violations (lower is better);
+# deepeval 4 flipped them to 1-is-a-pass like every other metric
+VIOLATION_METRICS = ["bias", "hallucination"]
+QUALITY_METRICS = HIGHER_IS_BETTER + VIOLATION_METRICS
+LATENCY_METRICS = ["rag_time_sec", "ttft_sec"]
+RUN_LEVEL = "(all questions)"
+GATE_MODES = ("off", "quality", "latency", "all")
+STATUS_ORDER = {"regressed": 0, "improved": 1, "insufficient history": 2, "ok": 3}
+
+
+@functools.cache
+def lower_is_better() -> tuple:
+    # Metrics whose score rises as they get worse, for the installed deepeval. Read from the
+    # package metadata, so deepeval itself isn't imported
+    from importlib import metadata
+
+    try:
+        major = int(metadata.version("deepeval").split(".")[0])
+    except (metadata.PackageNotFoundError, ValueError):
+        return tuple(VIOLATION_METRICS)
+    return tuple(VIOLATION_METRICS) if major < 4 else ()
+
+
+@dataclass
+class GateSettings:
+    window: int = 10
+    sigma: float = 3.0
+    min_delta: float = 0.1
+    latency_tolerance: float = 0.2
+    min_samples: int = 3
+    mode: str = "off"
+
+    @classmethod
+    def from_env(cls) -> "GateSettings":
+        mode = os.getenv("REGRESSION_GATE", "off").lower()
+        if mode not in GATE_MODES:
+            raise ValueError(f"REGRESSION_GATE must be one of {', '.join(GATE_MODES)}, got {mode!r}")
+        return cls(
+            window=int(os.getenv("REGRESSION_WINDOW", "10")),
+            sigma=float(os.getenv("REGRESSION_SIGMA", "3")),
+            min_delta=float(os.getenv("REGRESSION_MIN_DELTA", "0.1")),
+            latency_tolerance=float(os.getenv("REGRESSION_LATENCY_TOLERANCE", "0.2")),
+            min_samples=int(os.getenv("REGRESSION_MIN_SAMPLES", "3")),
+            mode=mode,
+        )
+
+
+def _long(df, metrics):
+    import pandas as pd
+
+    present = [metric for metric in metrics if metric in df]
+    if df.empty or not present:
+        return pd.DataFrame(columns=["question", "metric", "value"])
+    values = df[["question"] + present].melt(id_vars="question", var_name="metric", value_name="value")
+    values["value"] = pd.to_numeric(values["value"], errors="coerce")
+    return values.dropna(subset=["value"])
+
+
+def evaluate_regressions(df, run_id: str, settings: GateSettings, lower_better_metrics=None):
+    # One row per (question, metric) with the current value, its baseline and a status:
+    # "regressed", "improved", "ok" or "insufficient history". lower_better_metrics defaults
+    # to the direction of the installed deepeval (lower_is_better())
+    import numpy as np
+    import pandas as pd
+
+    columns = ["question", "metric", "kind", "current", "baseline", "limit", "samples", "status"]
+    if df.empty or "run_id" not in df:
+        return pd.DataFrame(columns=columns)
+    df = df.sort_values("timestamp")
+    current = df[df["run_id"] == run_id].groupby("question").tail(1)
+    baseline = df[df["run_id"] != run_id].groupby("question").tail(settings.window)
+    if current.empty:
+        return pd.DataFrame(columns=columns)
+
+    if lower_better_metrics is None:
+        lower_better_metrics = lower_is_better()
+    metrics = QUALITY_METRICS + LATENCY_METRICS
+    stats = (
+        _long(baseline, metrics)
+        .groupby(["question", "metric"])["value"]
+        .agg(mean="mean", std="std", samples="count", p95=lambda v: v.quantile(0.95))
+        .reset_index()
+    )
+    rows = _long(current, metrics).rename(columns={"value": "current"}).merge(
+        stats, on=["question", "metric"], how="left"
+    )
+
+    # Run-level latency: the current run's p50/p95 against the pooled baseline rows
+    run_rows = []
+    for metric in LATENCY_METRICS:
+        now_values = _long(current, [metric])["value"]
+        base_values = _long(baseline, [metric])["value"]
+        for pct in (50, 95):
+            if now_values.empty:
+                continue
+            run_rows.append({
+                "question": RUN_LEVEL, "metric": f"{metric} p{pct}",
+                "current": now_values.quantile(pct / 100), "mean": base_values.mean(),
+                "std": base_values.std(), "samples": len(base_values),
+                "p95": base_values.quantile(pct / 100) if len(base_values) else np.nan,
+            })
+    if run_rows:
+        rows = pd.concat([rows, pd.DataFrame(run_rows)], ignore_index=True)
+
+    base_metric = rows["metric"].str.split(" ").str[0]
+    is_latency = base_metric.isin(LATENCY_METRICS).to_numpy()
+    lower_better = base_metric.isin(list(lower_better_metrics)).to_numpy()
+    tolerance = np.maximum(settings.sigma * rows["std"].fillna(0).to_numpy(), settings.min_delta)
+    mean = rows["mean"].to_numpy(dtype=float)
+    current_values = rows["current"].to_numpy(dtype=float)
+
+    latency_limit = rows["p95"].to_numpy(dtype=float) * (1 + settings.latency_tolerance)
+    quality_limit = np.where(lower_better, mean + tolerance, mean - tolerance)
+    limit = np.where(is_latency, latency_limit, quality_limit)
+    regressed = np.where(
+        is_latency | lower_better, current_values > limit, current_values < limit
+    )
+    improved = np.where(lower_better, current_values < mean - tolerance, current_values > mean + tolerance)
+
+    rows["kind"] = np.where(is_latency, "latency", "quality")
+    rows["baseline"] = np.where(is_latency, rows["p95"], mean)
+    rows["limit"] = limit
+    rows["samples"] = rows["samples"].fillna(0).astype(int)
+    rows["status"] = np.select(
+        [rows["samples"].to_numpy() < settings.min_samples, regressed, improved & ~is_latency],
+        ["insufficient history", "regressed", "improved"],
+        default="ok",
+    )
+    rows["order"] = rows["status"].map(STATUS_ORDER)
+    return rows.sort_values(["order", "question", "metric"])[columns].reset_index(drop=True)
+
+
+def gate_failures(results, settings: GateSettings):
+    # Regressions that fail the session under the configured REGRESSION_GATE mode
+    if settings.mode == "off" or results.empty:
+        return results.iloc[0:0]
+    kinds = ["quality", "latency"] if settings.mode == "all" else [settings.mode]
+    return results[(results["status"] == "regressed") & results["kind"].isin(kinds)]
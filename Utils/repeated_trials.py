@@ -0,0 +1,99 @@
+import os
+import math
+import statistics
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from Utils.latency_stats import summarize_latencies
+
+# Repeated-trial mode: each question is answered and judged several times, in concurrent
+# batches, until every metric's 95% confidence interval half-width is below the target
+# (or EVAL_TRIALS is reached). Scores are reported as the mean over trials.
+
+# Two-sided 95% Student-t critical values for 1..30 degrees of freedom; 1.96 beyond that
+T_CRITICAL_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+
+@dataclass
+class TrialSettings:
+    max_trials: int = 1
+    min_trials: int = 3
+    ci_target: float = 0.05
+    concurrency: int = 3
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_trials > 1
+
+    @classmethod
+    def from_env(cls) -> "TrialSettings":
+        max_trials = max(1, int(os.getenv("EVAL_TRIALS", "1")))
+        return cls(
+            max_trials=max_trials,
+            min_trials=min(max(2, int(os.getenv("EVAL_MIN_TRIALS", "3"))), max_trials),
+            ci_target=float(os.getenv("EVAL_CI_TARGET", "0.05")),
+            concurrency=max(1, int(os.getenv("EVAL_TRIAL_CONCURRENCY", "3"))),
+        )
+
+
+def ci_half_width(values) -> float:
+    # Half-width of the 95% confidence interval of the mean (t-distribution)
+    data = [v for v in values if v is not None]
+    if len(data) < 2:
+        return math.inf
+    dof = len(data) - 1
+    t = T_CRITICAL_95[dof - 1] if dof <= len(T_CRITICAL_95) else 1.96
+    return t * statistics.stdev(data) / math.sqrt(len(data))
+
+
+def is_converged(trials, metric_keys, ci_target: float) -> bool:
+    # Metrics that were never scored (skipped, no context) don't hold up stopping
+    for key in metric_keys:
+        values = [trial[key] for trial in trials if trial.get(key) is not None]
+        if values and ci_half_width(values) > ci_target:
+            return False
+    return True
+
+
+def run_trials(run_trial, metric_keys, settings: TrialSettings, first: dict | None = None):
+    # run_trial() returns {metric key: score, "rag_time_sec": ..., "ttft_sec": ...} or None when
+    # the trial's RAG call or pre-checks failed. Returns (successful trials, failed count, converged).
+    trials = [first] if first else []
+    attempts, failed = len(trials), 0
+    with ThreadPoolExecutor(max_workers=settings.concurrency) as pool:
+        while attempts < settings.max_trials:
+            if attempts >= settings.min_trials and is_converged(trials, metric_keys, settings.ci_target):
+                return trials, failed, True
+            # The first batch goes straight to min_trials, later batches add `concurrency` trials
+            batch = max(settings.min_trials - attempts, settings.concurrency)
+            batch = min(batch, settings.max_trials - attempts)
+            for result in pool.map(lambda _: run_trial(), range(batch)):
+                if result is None:
+                    failed += 1
+                else:
+                    trials.append(result)
+            attempts += batch
+    return trials, failed, is_converged(trials, metric_keys, settings.ci_target)
+
+
+def summarize_trials(trials, metric_keys, failed: int = 0, converged: bool = True) -> dict:
+    # <metric> is the mean, with <metric>_std and <metric>_ci95 (half-width) alongside,
+    # plus latency percentiles across trials (rag_time_p50, rag_time_p95, ttft_p50, ...)
+    summary = {"trials": len(trials), "trials_failed": failed, "trials_converged": converged}
+    for key in metric_keys:
+        values = [trial[key] for trial in trials if trial.get(key) is not None]
+        if not values:
+            summary.update({key: None, f"{key}_std": None, f"{key}_ci95": None})
+            continue
+        half_width = ci_half_width(values)
+        summary.update({
+            key: round(statistics.fmean(values), 4),
+            f"{key}_std": round(statistics.stdev(values), 4) if len(values) > 1 else None,
+            f"{key}_ci95": round(half_width, 4) if math.isfinite(half_width) else None,
+        })
+    summary.update(summarize_latencies([trial.get("rag_time_sec") for trial in trials], "rag_time"))
+    summary.update(summarize_latencies([trial.get("ttft_sec") for trial in trials], "ttft"))
+    return summary
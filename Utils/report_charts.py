@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import base64
+import datetime
+import hashlib
+import textwrap
+import multiprocessing
+from io import BytesIO
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from Utils.tracing import get_tracer, now
+
+# Charts are described by plain, JSON-serialisable specs so they can be hashed for the
+# cache and shipped to worker processes.
+
+
+def wrap_labels(labels, width=15):
+    return ["\n".join(textwrap.wrap(label, width=width)) for label in labels]
+
+def bar_chart(labels, panels, figsize=(14, 6)) -> dict:
+    # panels: [{"title", "ylabel", "bar_width", "series": [{"label", "values", "color", "offset"}]}]
+    return {"kind": "bars", "labels": wrap_labels(labels), "panels": panels, "figsize": list(figsize)}
+
+def trend_chart(df, metric: str, title: str, ylabel: str, figsize=(12, 4)) -> dict:
+    import pandas as pd
+
+    series = {}
+    if not df.empty and metric in df:
+        for question, group in df.groupby("question"):
+            values = pd.to_numeric(group[metric], errors="coerce")
+            series[question] = {
+                "x": [ts.isoformat() for ts in group["timestamp"]],
+                "y": [None if pd.isna(value) else float(value) for value in values]
+            }
+    return {"kind": "trend", "title": title, "ylabel": ylabel, "series": series, "figsize": list(figsize)}
+
+def window_history(df, max_points: int):
+    # Bucket-average each question's series down to at most max_points points
+    import numpy as np
+    import pandas as pd
+
+    if df.empty or max_points <= 0:
+        return df
+    frames = []
+    for question, group in df.groupby("question", sort=False):
+        n = len(group)
+        if n <= max_points:
+            frames.append(group)
+            continue
+        buckets = np.arange(n) * max_points // n
+        numeric = group.select_dtypes("number").groupby(buckets).mean()
+        numeric["timestamp"] = group["timestamp"].groupby(buckets).last().values
+        numeric["question"] = question
+        frames.append(numeric)
+    return pd.concat(frames, ignore_index=True)
+
+
+def render_chart(spec: dict) -> str:
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    if spec["kind"] == "bars":
+        fig, axes = plt.subplots(1, len(spec["panels"]), figsize=spec["figsize"], squeeze=False)
+        x = range(len(spec["labels"]))
+        for ax, panel in zip(axes[0], spec["panels"]):
+            width = panel.get("bar_width", 0.8)
+            for series in panel["series"]:
+                ax.bar([i + series.get("offset", 0) * width for i in x], series["values"], width=width,
+                       label=series.get("label"), color=series.get("color"))
+            ax.set_xticks(list(x))
+            ax.set_xticklabels(spec["labels"], fontsize=9)
+            ax.set_ylabel(panel["ylabel"])
+            ax.set_title(panel["title"])
+            if any(series.get("label") for series in panel["series"]):
+                ax.legend()
+    else:
+        fig, ax = plt.subplots(figsize=spec["figsize"])
+        for question, series in spec["series"].items():
+            timestamps = [datetime.datetime.fromisoformat(ts) for ts in series["x"]]
+            values = [float("nan") if v is None else v for v in series["y"]]
+            ax.plot(timestamps, values, marker='o', label=question)
+        ax.set_ylabel(spec["ylabel"])
+        ax.set_title(spec["title"])
+        ax.set_xticks([])
+        ax.set_xticklabels([])
+        if spec["series"]:
+            ax.legend(loc='best', fontsize='small')
+
+    fig.tight_layout()
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png')
+    plt.close(fig)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def _timed_render(spec: dict) -> tuple:
+    # Runs in the worker process; timings come back so the parent can record the span
+    start = now()
+    image = render_chart(spec)
+    return image, start, now(), os.getpid()
+
+
+def spec_hash(spec: dict) -> str:
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ChartRenderer:
+    # Renders changed charts in a process pool; unchanged ones come from the on-disk cache
+    def __init__(self, cache_dir: str | None = None, workers: int | None = None,
+                 max_age_days: float | None = None, enabled: bool | None = None):
+        self.cache_dir = Path(cache_dir or os.getenv("REPORT_CACHE_DIR", ".report_cache"))
+        self.workers = workers or int(os.getenv("REPORT_RENDER_WORKERS", "0")) or min(os.cpu_count() or 1, 8)
+        self.max_age_sec = (max_age_days if max_age_days is not None
+                            else float(os.getenv("REPORT_CACHE_MAX_AGE_DAYS", "7"))) * 86400
+        self.enabled = enabled if enabled is not None else os.getenv("REPORT_CACHE", "yes").lower() == "yes"
+        self.stats = {"cached": 0, "rendered": 0}
+
+    def _cache_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.b64"
+
+    def render(self, specs: dict) -> dict:
+        images, pending = {}, {}
+        for name, spec in specs.items():
+            key = spec_hash(spec)
+            path = self._cache_path(key)
+            if self.enabled and path.exists():
+                images[name] = path.read_text()
+                os.utime(path)
+                self.stats["cached"] += 1
+            else:
+                pending[name] = (key, spec)
+
+        if len(pending) > 1 and self.workers > 1:
+            # spawn: forking a pytest process that has live threads can deadlock
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(pending)), mp_context=context) as executor:
+                futures = {name: executor.submit(_timed_render, spec) for name, (_, spec) in pending.items()}
+                timed = {name: future.result() for name, future in futures.items()}
+        else:
+            timed = {name: _timed_render(spec) for name, (_, spec) in pending.items()}
+        rendered = {}
+        for name, (image, start, end, pid) in timed.items():
+            get_tracer().add("chart.render", start, end, pid=pid, tid=pid, chart=name)
+            rendered[name] = image
+        self.stats["rendered"] += len(rendered)
+
+        if self.enabled:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for name, image in rendered.items():
+                self._cache_path(pending[name][0]).write_text(image)
+            self.prune()
+        images.update(rendered)
+        return {name: images[name] for name in specs}
+
+    def prune(self):
+        now = time.time()
+        for path in self.cache_dir.glob("*.b64"):
+            try:
+                if now - path.stat().st_mtime > self.max_age_sec:
+                    path.unlink()
+            except OSError:
+                pass
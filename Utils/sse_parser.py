@@ -0,0 +1,263 @@
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+
+loads = json.loads
+
+# Incremental parser for the /v1/query server-sent event stream. It works on raw byte
+# chunks as they arrive, and lines, events and UTF-8 sequences may be split anywhere.
+# Bytes are buffered until a newline arrives and then decoded in one go up to the last
+# newline, so a UTF-8 sequence is never cut and json.loads gets str (on bytes it would
+# re-detect the encoding for every event). A `data:` line
+# that is complete JSON is emitted straight away; otherwise data lines are joined until
+# the blank line that ends the event, so multi-line events work too. Comments (":") and
+# id/retry fields are ignored.
+
+STOP_REASONS = ("end", "eof", "error", "deadline", "max_chars")
+
+
+class SSEParser:
+    def __init__(self, on_line=None):
+        self.on_line = on_line          # called with every line, e.g. StreamRecorder.add
+        self.malformed = 0
+        self.malformed_sample = None
+        self.event_counts = {}
+        self.parse_sec = 0.0
+        self._buffer = b""
+        self._data = []
+        self._event = None
+
+    def feed(self, chunk: bytes, final: bool = False) -> list[dict]:
+        # Returns the payloads of the events completed by this chunk
+        if self._buffer:
+            chunk = self._buffer + chunk
+        end = len(chunk) if final else chunk.rfind(b"\n") + 1
+        if not end:
+            self._buffer = chunk     # still inside a line, nothing to parse yet
+            return []
+        start = time.perf_counter()
+        self._buffer = chunk[end:]
+        lines = (chunk[:end] if end < len(chunk) else chunk).decode("utf-8", "replace").split("\n")
+        if not final:
+            lines.pop()              # empty remainder after the last newline
+        payloads = []
+        on_line, data, counts = self.on_line, self._data, self.event_counts
+        for line in lines:
+            if line[-1:] == "\r":
+                line = line[:-1]
+            if on_line is not None:
+                on_line(line)
+            if line.startswith("data:"):
+                value = line[6:] if line[5:6] == " " else line[5:]
+                if not data:
+                    try:
+                        payload = loads(value)
+                    except ValueError:
+                        data.append(value)
+                        continue
+                    if type(payload) is dict and "event" in payload and self._event is None:
+                        # The common case: the backend names the event inside the JSON
+                        name = payload["event"]
+                        counts[name] = counts.get(name, 0) + 1
+                        payloads.append(payload)
+                    else:
+                        self._emit(payload, payloads)
+                    continue
+                data.append(value)
+            elif not line:
+                if data:
+                    self._dispatch(payloads)
+                    data = self._data
+                self._event = None
+            elif line.startswith("event:"):
+                self._event = line[6:].strip()
+        self.parse_sec += time.perf_counter() - start
+        return payloads
+
+    def close(self) -> list[dict]:
+        # Flushes a final line or event that the stream didn't terminate
+        payloads = self.feed(b"", final=True)
+        if self._data:
+            self._dispatch(payloads)
+        return payloads
+
+    def _dispatch(self, payloads: list):
+        raw = "\n".join(self._data)
+        self._data = []
+        try:
+            self._emit(loads(raw), payloads)
+        except ValueError:
+            self.malformed += 1
+            self.malformed_sample = self.malformed_sample or raw[:200]
+        self._event = None
+
+    def _emit(self, payload, payloads: list):
+        # The backend names the event inside the JSON; a plain SSE `event:` field works as well
+        if not isinstance(payload, dict) or "event" not in payload:
+            payload = {"event": self._event or "message", "data": payload}
+        self._event = None
+        name = payload["event"]
+        self.event_counts[name] = self.event_counts.get(name, 0) + 1
+        payloads.append(payload)
+
+
+class TokenStream:
+    # Generator over answer tokens with early termination; after iteration, stop_reason is one
+    # of STOP_REASONS and error holds the payload of an "error" event
+    def __init__(self, chunks, parser: SSEParser | None = None, total_timeout: float | None = None,
+                 max_chars: int | None = None, clock=time.perf_counter):
+        self.chunks = chunks
+        self.parser = parser or SSEParser()
+        self.total_timeout = total_timeout
+        self.max_chars = max_chars
+        self.clock = clock
+        self.chars = 0
+        self.stop_reason = None
+        self.error = None
+
+    def __iter__(self):
+        deadline = self.clock() + self.total_timeout if self.total_timeout else None
+        feed, max_chars = self.parser.feed, self.max_chars
+        for chunk in self.chunks:
+            for payload in feed(chunk):
+                event = payload["event"]
+                if event == "token":
+                    token = (payload.get("data") or {}).get("token", "")
+                    yield token
+                    self.chars += len(token)
+                    if max_chars and self.chars >= max_chars:
+                        self.stop_reason = "max_chars"
+                        return
+                elif event == "end" or event == "error":
+                    self.error = payload.get("data") if event == "error" else None
+                    self.stop_reason = event
+                    return
+            if deadline is not None and self.clock() > deadline:
+                self.stop_reason = "deadline"
+                return
+        if self.stop_reason is None:
+            # A stream cut off without an "end" event still yields what was completed
+            for payload in self.parser.close():
+                if payload["event"] == "token":
+                    yield (payload.get("data") or {}).get("token", "")
+            self.stop_reason = "eof"
+
+
+def legacy_tokens(chunks) -> tuple[list[str], float]:
+    # The previous loop, kept for the benchmark: requests' iter_lines() splitting, then
+    # decode, strip, prefix check and json.loads per line, timed per line for rag.sse_parse.
+    # Returns the tokens and the parse time, like SSEParser.parse_sec
+    tokens = []
+    parse_sec = 0.0
+    for line in _iter_lines(chunks):
+        parse_start = time.perf_counter()
+        if line:
+            line_str = line.decode("utf-8").strip()
+            if line_str.startswith("data: "):
+                try:
+                    data_obj = json.loads(line_str[6:])
+                    if data_obj.get("event") == "token":
+                        tokens.append(data_obj["data"]["token"])
+                    elif data_obj.get("event") == "end":
+                        return tokens, parse_sec + time.perf_counter() - parse_start
+                except json.JSONDecodeError:
+                    pass
+        parse_sec += time.perf_counter() - parse_start
+    return tokens, parse_sec
+
+
+def _iter_lines(chunks):
+    # Same splitting as requests.Response.iter_lines()
+    pending = None
+    for chunk in chunks:
+        if pending is not None:
+            chunk = pending + chunk
+        lines = chunk.splitlines()
+        if lines and lines[-1] and chunk and lines[-1][-1] == chunk[-1]:
+            pending = lines.pop()
+        else:
+            pending = None
+        yield from lines
+    if pending is not None:
+        yield pending
+
+
+def recording_bytes(recording: dict) -> bytes:
+    return b"".join(event["line"].encode("utf-8") + b"\n" for event in recording["events"])
+
+
+def synthetic_stream(tokens: int, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    words = ["OpenShift", "deploy", "the", "pod", "é", "Développeur", "namespace", "🚀", "config"]
+    lines = [b'data: {"event": "start", "data": {"conversation_id": "bench"}}', b""]
+    for i in range(tokens):
+        token = json.dumps({"event": "token", "data": {"id": i, "token": rng.choice(words) + " "}})
+        lines += [b"data: " + token.encode("utf-8"), b""]
+    lines += [b'data: {"event": "end", "data": {}}', b""]
+    return b"\n".join(lines) + b"\n"
+
+
+def split_chunks(stream: bytes, max_chunk: int, seed: int = 0) -> list[bytes]:
+    # Random chunk boundaries, so lines, events and UTF-8 sequences are split mid-way
+    rng = random.Random(seed)
+    chunks, position = [], 0
+    while position < len(stream):
+        size = rng.randint(1, max_chunk)
+        chunks.append(stream[position:position + size])
+        position += size
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark the SSE parser on recorded or synthetic streams")
+    parser.add_argument("recordings", nargs="?", help="RAG_RECORD_DIR with recorded streams (default: synthetic)")
+    parser.add_argument("--tokens", type=int, default=2000, help="Tokens per synthetic stream")
+    parser.add_argument("--chunk", type=int, default=512, help="Maximum chunk size in bytes")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.recordings:
+        streams = [
+            recording_bytes(json.loads(path.read_text()))
+            for path in sorted(Path(args.recordings).glob("*.json"))
+        ]
+        streams = [stream for stream in streams if stream]
+    else:
+        streams = [synthetic_stream(args.tokens, seed) for seed in range(5)]
+    if not streams:
+        print(f"No recorded streams in {args.recordings}")
+        return 1
+    chunked = [split_chunks(stream, args.chunk) for stream in streams]
+    total_bytes = sum(len(stream) for stream in streams)
+
+    def run_new():
+        return ["".join(TokenStream(chunks)) for chunks in chunked]
+
+    def run_legacy():
+        return ["".join(legacy_tokens(chunks)[0]) for chunks in chunked]
+
+    if run_new() != run_legacy():
+        print("❌ Parsers disagree on the token text")
+        return 1
+
+    # Interleaved, best of --repeats, so a busy machine skews both parsers alike
+    runs = {"incremental": run_new, "line-based": run_legacy}
+    samples = {name: [] for name in runs}
+    for _ in range(args.repeats):
+        for name, run in runs.items():
+            start = time.perf_counter()
+            run()
+            samples[name].append(time.perf_counter() - start)
+    results = {name: min(values) for name, values in samples.items()}
+    for name, best in results.items():
+        print(f"{name:12} {best * 1000:8.2f} ms  {total_bytes / best / 1e6:7.1f} MB/s")
+    print(f"\n{len(streams)} stream(s), {total_bytes / 1024:.0f} KiB, chunks up to {args.chunk} bytes: "
+          f"{results['line-based'] / results['incremental']:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+import sys
+import argparse
+import statistics
+import subprocess
+import time
+from pathlib import Path
+from Utils.latency_stats import percentile
+
+# Measures how long the evaluation entry points take to start, in fresh interpreters, and
+# which heavy dependencies they pull in. Exits 1 when an entry point imports one of
+# HEAVY_MODULES at startup or its median start time is over budget, so CI catches an
+# eager import before it slows down every smoke run.
+
+HEAVY_MODULES = ("deepeval", "matplotlib", "pandas", "numpy", "playwright", "openai")
+ENTRY_POINTS = {
+    "import Utils.engine": ["-c", "import Utils.engine"],
+    "engine --help": ["-m", "Utils.engine", "--help"],
+    "import test module": ["-c", "import test_lightspeedEvaludation"],
+}
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def time_startup(args, repeats: int) -> list[float]:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, check=True, capture_output=True)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def import_profile(args) -> dict:
+    # Top-level package -> cumulative import time in ms, from `python -X importtime`
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT, check=True,
+                            capture_output=True, text=True)
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not cumulative.isdigit():
+            continue   # header line
+        package = name.strip().split(".")[0]
+        # Nested imports are indented; the top-level entry of a package has the largest total
+        packages[package] = max(packages.get(package, 0.0), int(cumulative) / 1000)
+    return packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark start-up time of the evaluation entry points")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=400.0, help="Maximum median start time")
+    parser.add_argument("--top", type=int, default=8, help="Slowest imported packages to list")
+    args = parser.parse_args()
+
+    ok = True
+    for name, entry in ENTRY_POINTS.items():
+        samples = [s * 1000 for s in time_startup(entry, args.repeats)]
+        median = statistics.median(samples)
+        packages = import_profile(entry)
+        heavy = sorted(p for p in packages if p in HEAVY_MODULES)
+        over_budget = median > args.budget_ms
+        ok = ok and not heavy and not over_budget
+
+        print(f"\n{'✅' if not heavy and not over_budget else '❌'} {name}: median {median:.0f} ms, "
+              f"p95 {percentile(samples, 95):.0f} ms (budget {args.budget_ms:.0f} ms)")
+        if heavy:
+            print(f"   heavy imports at startup: {', '.join(heavy)}")
+        slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        print("   slowest imports: " + ", ".join(f"{package} {ms:.0f} ms" for package, ms in slowest))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from Utils.latency_stats import percentile
+
+# Lightweight spans for every stage of an evaluation run. Spans are plain dicts
+# ({"name", "start", "dur", "pid", "tid", "args"}, times in epoch seconds) so xdist
+# workers can ship them to the controller through report.user_properties.
+
+# perf_counter for durations, anchored to the wall clock so spans from different processes line up
+_ANCHOR = time.time() - time.perf_counter()
+
+
+def now() -> float:
+    return _ANCHOR + time.perf_counter()
+
+
+def is_tracing_enabled() -> bool:
+    return os.getenv("TRACING", "yes").lower() == "yes"
+
+
+class Tracer:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._spans = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, end: float, pid: int | None = None, tid: int | None = None, **args):
+        if not self.enabled:
+            return
+        span = {
+            "name": name,
+            "start": start,
+            "dur": max(end - start, 0.0),
+            "pid": pid or os.getpid(),
+            "tid": tid or threading.get_ident(),
+            "args": args,
+        }
+        with self._lock:
+            self._spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, **args):
+        start = now()
+        try:
+            yield args   # callers may add attributes while the span is open
+        finally:
+            self.add(name, start, now(), **args)
+
+    def drain(self) -> list:
+        with self._lock:
+            spans, self._spans = self._spans, []
+        return spans
+
+
+_tracer = None
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(enabled=is_tracing_enabled())
+    return _tracer
+
+
+def stage_breakdown(spans) -> list[dict]:
+    # One row per span name, slowest stage first
+    durations = {}
+    for span in spans:
+        durations.setdefault(span["name"], []).append(span["dur"])
+    rows = [
+        {
+            "stage": name,
+            "count": len(values),
+            "total_sec": round(sum(values), 3),
+            "mean_ms": round(sum(values) / len(values) * 1000, 1),
+            "p95_ms": round(percentile(values, 95) * 1000, 1),
+            "max_ms": round(max(values) * 1000, 1),
+        }
+        for name, values in durations.items()
+    ]
+    return sorted(rows, key=lambda row: row["total_sec"], reverse=True)
+
+
+def write_chrome_trace(spans, path) -> Path:
+    # Complete ("X") events in microseconds; open in chrome://tracing or https://ui.perfetto.dev
+    events = [
+        {
+            "name": span["name"],
+            "cat": span["name"].split(".")[0],
+            "ph": "X",
+            "ts": round(span["start"] * 1e6),
+            "dur": round(span["dur"] * 1e6),
+            "pid": span["pid"],
+            "tid": span["tid"],
+            "args": span["args"],
+        }
+        for span in spans
+    ]
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+    return path
+
+
+def export_otel(spans, service_name: str = "rhdh-lightspeed-evaluation"):
+    # Uses the application's tracer provider if one is configured, otherwise an SDK provider
+    # with the OTLP/HTTP exporter (configured through the standard OTEL_EXPORTER_OTLP_* variables)
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        print("⚠️ Skipping the OpenTelemetry export: TRACE_OTEL=yes needs opentelemetry-api")
+        return
+
+    provider = trace.get_tracer_provider()
+    if not hasattr(provider, "force_flush"):
+        try:
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            print("⚠️ Skipping the OpenTelemetry export: TRACE_OTEL=yes needs opentelemetry-sdk "
+                  "and opentelemetry-exporter-otlp-proto-http")
+            return
+        provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+
+    tracer = provider.get_tracer(service_name)
+    for span in spans:
+        attributes = {
+            key: value if isinstance(value, (str, bool, int, float)) else str(value)
+            for key, value in span["args"].items() if value is not None
+        }
+        attributes.update({"process.pid": span["pid"], "thread.id": span["tid"]})
+        otel_span = tracer.start_span(span["name"], start_time=int(span["start"] * 1e9), attributes=attributes)
+        otel_span.end(end_time=int((span["start"] + span["dur"]) * 1e9))
+    provider.force_flush()
@@ -1,220 +1,414 @@
-import base64
-import matplotlib.pyplot as plt
-import pandas as pd
-from io import BytesIO
 import json
+import math
 import datetime
 from pathlib import Path
 import textwrap
-
+import os
+import pytest
+from contextlib import contextmanager
+from Utils.rag_respose import RagPrefetcher, get_env_values
+from Utils.auth_token import BearerTokenProvider, LOCAL_LIGHTSPEED_URL
+from Utils.judge_cache import get_judge_cache, hit_rate
+from Utils.incremental import is_incremental_mode
+from Utils.latency_stats import summarize_latencies
+from Utils.tracing import get_tracer, stage_breakdown, write_chrome_trace, export_otel
+from Utils.regression_gate import GateSettings, evaluate_regressions, gate_failures
+from Utils.rag_replay import get_replay_dir, start_stub_server
+from Utils.load_test import load_test_summary_html
+from Utils.history_store import HistoryStore, new_run_id
+from Utils.checkpoint_store import CheckpointStore, is_checkpointing_enabled
+from Utils.report_charts import ChartRenderer, bar_chart, trend_chart, window_history
+from Utils.rag_scheduler import scheduler_stats_delta, merge_model_stats, achieved_concurrency, format_stats
+from Utils.model_matrix import (get_model_matrix, result_key, index_previous, split_series_by_model,
+                                is_matrix_result, score_label, compare_models, comparison_chart_specs,
+                                model_comparison_html)
+
+# Filled on the controller only; under xdist, workers ship their results through report.user_properties
 test_scores = []
+unscored_results = []      # errored and skipped questions of a matrix run, for the model comparison
+judge_cache_stats = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0}
+judge_pool_stats = {}
+rag_scheduler_stats = {}    # model label -> merged scheduler stats
+trace_spans = []
+_config = None
 
-def wrap_labels(labels, width=15):
-    return ["\n".join(textwrap.wrap(label, width=width)) for label in labels]
+def is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
 
 def format_percent_change(current, previous):
-    if previous == 0:
+    # Metrics skipped by a pre-check or without context are None (NaN once in a DataFrame)
+    if is_missing(current) or is_missing(previous) or previous == 0:
         return "N/A", "gray"
     delta = ((current - previous) / previous) * 100
     color = "green" if delta > 0 else "red" if delta < 0 else "gray"
     symbol = "+" if delta > 0 else ""
     return f"{symbol}{delta:.1f}%", color
 
+def get_history_store(config) -> HistoryStore:
+    if getattr(config, "_history_store", None) is None:
+        config._history_store = HistoryStore()
+    return config._history_store
+
+def get_checkpoint_store(config) -> CheckpointStore | None:
+    if not is_checkpointing_enabled():
+        return None
+    if getattr(config, "_checkpoint_store", None) is None:
+        config._checkpoint_store = CheckpointStore(config._history_run_id)
+    return config._checkpoint_store
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--resume", action="store", default=None, metavar="RUN_ID",
+        help="Continue an interrupted run from its checkpoints, under the same run ID"
+    )
+
+def pytest_generate_tests(metafunc):
+    # EVAL_MODELS runs every question once per model; otherwise model_target is None
+    targets = get_model_matrix()
+    if targets and "model_target" in metafunc.fixturenames:
+        metafunc.parametrize("model_target", targets, ids=[target.label for target in targets])
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    # xdist workers record their rows under the controller's run ID
+    node.workerinput["history_run_id"] = node.config._history_run_id
+
+def is_xdist_worker(config) -> bool:
+    return hasattr(config, "workerinput")
+
+def pytest_configure(config):
+    global _config
+    _config = config
+    config._session_started = datetime.datetime.now()
+    if is_xdist_worker(config):
+        config._history_run_id = config.workerinput["history_run_id"]
+    else:
+        resume = config.getoption("resume")
+        config._history_run_id = resume or os.getenv("EVAL_RUN_ID") or new_run_id()
+        if not config.option.collectonly:
+            # --collect-only evaluates nothing, so it neither records a run nor opens,
+            # prunes or checks the checkpoints
+            checkpoints = get_checkpoint_store(config)
+            if resume:
+                if checkpoints is None or not checkpoints.has_run():
+                    raise pytest.UsageError(f"--resume {resume}: no checkpoints for this run (CHECKPOINTS=yes, CHECKPOINT_DB)")
+                print(f"✓ Resuming run {resume} from {checkpoints.path}")
+            elif checkpoints is not None:
+                checkpoints.prune(int(os.getenv("CHECKPOINT_KEEP_RUNS", "5")))
+            get_history_store(config).start_run(config._history_run_id)
+
+    # RAG_REPLAY_DIR serves recorded streams from a local stub instead of the live backend
+    replay_dir = get_replay_dir()
+    if replay_dir:
+        pace = os.getenv("RAG_REPLAY_PACE", "fast")
+        config._rag_replay_server, url = start_stub_server(replay_dir, pace)
+        os.environ["RAG_REPLAY_URL"] = url
+        print(f"✓ Replaying recorded RAG streams from {replay_dir} at {url} (pace: {pace})")
+
+def collect_trace_spans():
+    # Worker spans arrive through logreport; the controller's own spans are drained here
+    trace_spans.extend(get_tracer().drain())
+    return trace_spans
+
+def pytest_unconfigure(config):
+    if not is_xdist_worker(config) and get_tracer().enabled:
+        spans = collect_trace_spans()
+        if spans:
+            path = write_chrome_trace(spans, os.getenv("TRACE_OUTPUT", "reports/trace.json"))
+            print(f"\n✓ Wrote {len(spans)} trace spans to {path} (open in https://ui.perfetto.dev)")
+            if os.getenv("TRACE_OTEL", "no").lower() == "yes":
+                export_otel(spans)
+    server = getattr(config, "_rag_replay_server", None)
+    if server is not None:
+        server.shutdown()
+    for name in ("_history_store", "_checkpoint_store"):
+        store = getattr(config, name, None)
+        if store is not None:
+            store.close()
+
+@pytest.fixture(scope="session")
+def bearer_token_provider():
+    return BearerTokenProvider()
+
+@pytest.fixture
+def bearer_token(request, bearer_token_provider):
+    # Only rhdh-local needs a browser-extracted token (replays point Base_Url at the stub)
+    env = get_env_values()
+    if env["base_url"] != LOCAL_LIGHTSPEED_URL:
+        return env["bearer_token"]
+
+    @contextmanager
+    def open_page():
+        # The browser is only launched when no cached token is still valid
+        context = request.getfixturevalue("browser").new_context()
+        try:
+            yield context.new_page()
+        finally:
+            context.close()
+
+    with get_tracer().span("auth.token"):
+        return bearer_token_provider.get(open_page)
+
+@pytest.fixture
+def model_target():
+    # Parametrized with the EVAL_MODELS targets in a matrix run (pytest_generate_tests)
+    return None
+
+@pytest.fixture(scope="session")
+def rag_prefetcher(request):
+    # RAG_PREFETCH=yes streams every collected question's answer in the background; in a
+    # matrix run (EVAL_MODELS) it is on by default, with the models streaming concurrently
+    targets = get_model_matrix()
+    enabled = os.getenv("RAG_PREFETCH", "yes" if targets else "no").lower() == "yes"
+    if is_xdist_worker(request.config):
+        # Under xdist each worker only runs part of the collection, so fetch on demand
+        enabled = False
+    questions = [
+        item.callspec.params["question"]
+        for item in request.session.items
+        if hasattr(item, "callspec") and "question" in item.callspec.params
+    ]
+    done = set()
+    checkpoints = get_checkpoint_store(request.config)
+    if checkpoints is not None:
+        # Answers checkpointed by the run being resumed are not fetched again
+        for target in targets or [None]:
+            scoped = checkpoints.scoped(target.label) if target else checkpoints
+            done |= {result_key(question, target) for question in scoped.questions_with("rag")}
+    prefetcher = RagPrefetcher(questions, enabled=enabled, targets=targets, exclude=done)
+    yield prefetcher
+    prefetcher.shutdown()
+
+@pytest.fixture(scope="session")
+def checkpoints(request):
+    # None with CHECKPOINTS=no; otherwise completed stages of this run are written as they finish
+    return get_checkpoint_store(request.config)
+
+@pytest.fixture(scope="session")
+def previous_results(request):
+    # INCREMENTAL_EVAL=yes: the latest history row per question, whose verdicts are
+    # carried over when the answer, context, metrics and judge are unchanged
+    if not is_incremental_mode():
+        return {}
+    rows = get_history_store(request.config).query(last_n=1)
+    return index_previous(rows)
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    with get_tracer().span("test.call", test=item.nodeid):
+        yield
+
+@pytest.hookimpl(hookwrapper=True)
 def pytest_runtest_makereport(item, call):
-    if call.when == "call":
-        score_data = getattr(item, 'score_data', None)
-        if score_data:
-            test_scores.append(score_data)
-            score_data["timestamp"] = datetime.datetime.now().isoformat()
-            history_file = Path("test_history.jsonl")
-            with history_file.open("a") as f:
-                f.write(json.dumps(score_data) + "\n")
-
-def pytest_html_results_summary(prefix, summary, postfix):
+    outcome = yield
+    if call.when != "call":
+        return
+    report = outcome.get_result()
+    score_data = getattr(item, 'score_data', None)
+    if score_data:
+        score_data["timestamp"] = datetime.datetime.now().isoformat()
+        score_data["run_id"] = item.config._history_run_id
+        report.user_properties.append(("score_data", score_data))
+    unscored = getattr(item, 'unscored_result', None)
+    if unscored:
+        report.user_properties.append(("unscored_result", unscored))
+    report.user_properties.append(("judge_cache_stats", get_judge_cache().stats_delta()))
+    report.user_properties.append(("rag_scheduler_stats", scheduler_stats_delta()))
+    if os.getenv("JUDGE_ENDPOINTS"):
+        # deepeval is only imported here when a judge pool is configured
+        from Utils.judge_pool import get_judge_model
+
+        judge_pool = get_judge_model()
+        if judge_pool is not None:
+            report.user_properties.append(("judge_pool_stats", judge_pool.stats_delta()))
+    report.user_properties.append(("trace_spans", get_tracer().drain()))
+
+def pytest_runtest_logreport(report):
+    # Runs in the controller for reports from every xdist worker, so history is written once
+    if report.when != "call" or _config is None or is_xdist_worker(_config):
+        return
+    for name, value in report.user_properties:
+        if name == "score_data":
+            test_scores.append(value)
+            # A resumed run re-reports every question, replacing the interrupted session's rows
+            resumed = _config.getoption("resume") is not None
+            get_history_store(_config).append(value, value["run_id"], replace=resumed)
+        elif name == "unscored_result":
+            unscored_results.append(value)
+        elif name == "judge_cache_stats":
+            for key, count in value.items():
+                judge_cache_stats[key] += count
+        elif name == "judge_pool_stats":
+            for url, delta in value.items():
+                totals = judge_pool_stats.setdefault(url, {"requests": 0, "errors": 0, "latencies": []})
+                totals["requests"] += delta["requests"]
+                totals["errors"] += delta["errors"]
+                totals["latencies"].extend(delta["latencies"])
+        elif name == "rag_scheduler_stats":
+            merge_model_stats(rag_scheduler_stats, value)
+        elif name == "trace_spans":
+            trace_spans.extend(value)
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_sessionfinish(session, exitstatus):
+    # Runs before pytest-html builds the report, so the summary can show the gate result
+    config = session.config
+    if is_xdist_worker(config):
+        return
+    # Requests still finishing after the last test (e.g. prefetches) are counted too
+    merge_model_stats(rag_scheduler_stats, scheduler_stats_delta())
+    reporter = config.pluginmanager.get_plugin("terminalreporter")
+    write = reporter.write_line if reporter else print
+    for label, stats in sorted(rag_scheduler_stats.items()):
+        if stats.get("requests"):
+            write(f"\n🚦 RAG scheduler{'' if label == 'default' else f' [{label}]'}: {format_stats(stats)}")
     if not test_scores:
         return
-
-    questions = [t["question"] for t in test_scores]
-    relevancy = [t["relevancy"] for t in test_scores]
-    faithfulness = [t["faithfulness"] if t["faithfulness"] is not None else 0 for t in test_scores]
-    bias = [t["bias"] for t in test_scores]
-    hallucination = [t["hallucination"] if t["hallucination"] is not None else 0 for t in test_scores]
-    rag_times = [t["rag_time_sec"] for t in test_scores]
-
-    x = range(len(questions))
-    bar_width = 0.15
-    wrapped_questions = wrap_labels(questions)
-
-    plt.figure(figsize=(14, 6))
-    plt.bar([i - 1.5 * bar_width for i in x], relevancy, width=bar_width, label='Relevancy', color='skyblue')
-    plt.bar([i - 0.5 * bar_width for i in x], faithfulness, width=bar_width, label='Faithfulness', color='lightgreen')
-    plt.bar([i + 0.5 * bar_width for i in x], bias, width=bar_width, label='Bias', color='orange')
-    plt.bar([i + 1.5 * bar_width for i in x], hallucination, width=bar_width, label='Hallucination', color='violet')
-    plt.xticks(ticks=x, labels=wrapped_questions, fontsize=9)
-    plt.ylabel('Score')
-    plt.title('RAG Evaluation: Relevancy, Faithfulness, Bias & Hallucination')
-    plt.legend()
-    plt.tight_layout()
-
-    buffer1 = BytesIO()
-    plt.savefig(buffer1, format='png')
-    buffer1.seek(0)
-    encoded1 = base64.b64encode(buffer1.read()).decode('utf-8')
-    summary.append(f'<h2>📊 RAG Evaluation: Relevancy, Faithfulness, Bias & Hallucination</h2><img src="data:image/png;base64,{encoded1}" width="900"/>')
-    plt.close()
-
-    plt.figure(figsize=(12, 4))
-    plt.bar(x, rag_times, color='orange')
-    plt.xticks(ticks=x, labels=wrapped_questions, fontsize=9)
-    plt.ylabel('Seconds')
-    plt.title('RAG Response Time per Question')
-    plt.tight_layout()
-
-    buffer2 = BytesIO()
-    plt.savefig(buffer2, format='png')
-    buffer2.seek(0)
-    encoded2 = base64.b64encode(buffer2.read()).decode('utf-8')
-    summary.append(f'<h2>⏱️ RAG Response Time</h2><img src="data:image/png;base64,{encoded2}" width="900"/>')
-    plt.close()
-
-    history_file = Path("test_history.jsonl")
-    if history_file.exists():
-        records = [json.loads(line) for line in history_file.read_text().splitlines()]
-        df = pd.DataFrame(records)
-
-        if not df.empty:
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            df.sort_values("timestamp", inplace=True)
-
-            chart_html = '''
-            <style>
-                details.custom-dropdown summary {
-                    font-size: 18px;
-                    font-weight: bold;
-                    background-color: #f0f0f0;
-                    padding: 12px;
-                    border-radius: 6px;
-                    cursor: pointer;
-                    margin-top: 20px;
-                    outline: none;
-                }
-                details.custom-dropdown summary:hover {
-                    background-color: #e0e0e0;
-                }
-            </style>
-            <details class="custom-dropdown">
-                <summary> Click here to view Trend Over Time Charts</summary>
-            '''
-
-            for metric in ["relevancy", "faithfulness", "bias", "hallucination", "rag_time_sec"]:
-                plt.figure(figsize=(12, 4))
-                for question, group in df.groupby("question"):
-                    if metric in group:
-                        plt.plot(group["timestamp"], group[metric], marker='o', label=question)
-
-                if metric == "rag_time_sec":
-                    plt.ylabel("RAG Response (sec)")
-                    plt.title("RAG Response Trend Over Time")
-                else:
-                    plt.ylabel(metric.capitalize())
-                    plt.title(f'{metric.capitalize()} Trend Over Time')
-
-                ax = plt.gca()
-                ax.set_xticks([])
-                ax.set_xticklabels([])
-                plt.tight_layout()
-                plt.legend(loc='best', fontsize='small')
-
-                buffer = BytesIO()
-                plt.savefig(buffer, format='png')
-                plt.close()
-                buffer.seek(0)
-                encoded = base64.b64encode(buffer.read()).decode('utf-8')
-                chart_html += f'<img src="data:image/png;base64,{encoded}" width="900"/>'
-
-            chart_html += '</details>'
-            summary.append(chart_html)
-
-    if history_file.exists():
-        df = pd.read_json(history_file, lines=True)
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        df.sort_values("timestamp", inplace=True)
-
-        trend_rows = []
-        for question, group in df.groupby("question"):
-            recent = group.tail(3)
-            if len(recent) >= 2:
-                latest = recent.iloc[-1]
-                previous = recent.iloc[-2]
-
-                rel_delta, rel_color = format_percent_change(latest["relevancy"], previous["relevancy"])
-                faith_delta, faith_color = format_percent_change(latest["faithfulness"], previous["faithfulness"])
-                bias_delta, bias_color = format_percent_change(latest["bias"], previous["bias"])
-                hall_delta, hall_color = format_percent_change(
-                    latest["hallucination"] if latest["hallucination"] is not None else 0,
-                    previous["hallucination"] if previous["hallucination"] is not None else 0
-                )
-                rag_delta = format_percent_change(latest["rag_time_sec"], previous["rag_time_sec"])[0]
-
-                trend_rows.append({
-                    "question": question,
-                    "rel_delta": rel_delta,
-                    "rel_color": rel_color,
-                    "faith_delta": faith_delta,
-                    "faith_color": faith_color,
-                    "bias_delta": bias_delta,
-                    "bias_color": bias_color,
-                    "hall_delta": hall_delta,
-                    "hall_color": hall_color,
-                    "rag_delta": rag_delta
-                })
-
-        if trend_rows:
-            html = '<h2>📈 Metric Trends (Last 3 Runs)</h2>'
-            html += '<table border="1" style="border-collapse: collapse; font-size: 14px;">'
-            html += '<tr><th>Question</th><th>Relevancy Δ</th><th>Faithfulness Δ</th><th>Bias Δ</th><th>Hallucination Δ</th><th>RAG Time Δ</th></tr>'
-            for row in trend_rows:
-                q = textwrap.shorten(row["question"], width=40, placeholder="...")
-                html += (
-                    f'<tr>'
-                    f'<td>{q}</td>'
-                    f'<td style="color:{row["rel_color"]}">{row["rel_delta"]}</td>'
-                    f'<td style="color:{row["faith_color"]}">{row["faith_delta"]}</td>'
-                    f'<td style="color:{row["bias_color"]}">{row["bias_delta"]}</td>'
-                    f'<td style="color:{row["hall_color"]}">{row["hall_delta"]}</td>'
-                    f'<td>{row["rag_delta"]}</td>'
-                    f'</tr>'
-                )
-            html += '</table>'
-            summary.append(html)
-
-    # === New section for GEval metrics ===
-    # Extract GEval metric lists (fallback 0 if None)
-    informativeness = [t["informativeness"] if t["informativeness"] is not None else 0 for t in test_scores]
-    clarity = [t["clarity"] if t["clarity"] is not None else 0 for t in test_scores]
-    completeness = [t["completeness"] if t["completeness"] is not None else 0 for t in test_scores]
-    tone_appropriateness = [t["tone_appropriateness"] if t["tone_appropriateness"] is not None else 0 for t in test_scores]
-    glitch_check = [t["glitch_check"] if t["glitch_check"] is not None else 0 for t in test_scores]
-
-    plt.figure(figsize=(14, 6))
-    plt.bar([i - 2*bar_width for i in x], informativeness, width=bar_width, label='Informativeness', color='cyan')
-    plt.bar([i - bar_width for i in x], clarity, width=bar_width, label='Clarity', color='magenta')
-    plt.bar(x, completeness, width=bar_width, label='Completeness', color='yellowgreen')
-    plt.bar([i + bar_width for i in x], tone_appropriateness, width=bar_width, label='Tone Appropriateness', color='coral')
-    plt.bar([i + 2*bar_width for i in x], glitch_check, width=bar_width, label='Glitch Check', color='lightgray')
-    plt.xticks(ticks=x, labels=wrapped_questions, fontsize=9)
-    plt.ylabel('Score')
-    plt.title('GEval Metrics: Informativeness, Clarity, Completeness, Tone & Glitch Check')
-    plt.legend()
-    plt.tight_layout()
-
-    buffer = BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    encoded_img = base64.b64encode(buffer.read()).decode('utf-8')
-    plt.close()
-
-    gevall_html = '''
+    settings = GateSettings.from_env()
+    df = split_series_by_model(get_history_store(config).to_dataframe(
+        questions={t["question"] for t in test_scores}, last_n=settings.window + 5
+    ))
+    results = evaluate_regressions(df, config._history_run_id, settings)
+    failures = gate_failures(results, settings)
+    config._regression = (results, settings, failures)
+    if len(failures):
+        write(f"\n🚦 Regression gate ({settings.mode}) failed: {len(failures)} regression(s)")
+        for row in failures.itertuples():
+            write(f"   {row.question} | {row.metric}: {row.current:.3f} beyond limit {row.limit:.3f} "
+                  f"(baseline {row.baseline:.3f}, n={row.samples})")
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+def regression_summary_html(config):
+    regression = getattr(config, "_regression", None)
+    if regression is None:
+        return ""
+    results, settings, failures = regression
+    counts = results["status"].value_counts()
+    if settings.mode == "off":
+        verdict = "Gate off (REGRESSION_GATE=off): regressions are reported only"
+    else:
+        verdict = f"Gate ({settings.mode}): " + (
+            f'<b style="color:red">FAILED</b> with {len(failures)} regression(s)' if len(failures)
+            else '<b style="color:green">PASSED</b>'
+        )
+    html = (
+        '<h2>🚦 Regression Gate</h2>'
+        f'<p>{verdict}. Baseline: last {settings.window} runs per question; quality limits at '
+        f'mean ± max({settings.sigma}σ, {settings.min_delta}); latency limits at baseline p95 + '
+        f'{settings.latency_tolerance:.0%}.</p>'
+        '<p>' + ", ".join(f"{status}: {count}" for status, count in counts.items()) + '</p>'
+    )
+    flagged = results[results["status"].isin(["regressed", "improved"])]
+    if not flagged.empty:
+        colors = {"regressed": "red", "improved": "green"}
+        html += (
+            '<table border="1" style="border-collapse: collapse; font-size: 14px;">'
+            '<tr><th>Question</th><th>Metric</th><th>Current</th><th>Baseline</th><th>Limit</th>'
+            '<th>Samples</th><th>Status</th></tr>'
+        )
+        for row in flagged.itertuples():
+            q = textwrap.shorten(row.question, width=40, placeholder="...")
+            html += (
+                f'<tr><td>{q}</td><td>{row.metric}</td><td>{row.current:.3f}</td><td>{row.baseline:.3f}</td>'
+                f'<td>{row.limit:.3f}</td><td>{row.samples}</td>'
+                f'<td style="color:{colors[row.status]}">{row.status}</td></tr>'
+            )
+        html += '</table>'
+    return html
+
+def judge_cache_summary_html():
+    if os.getenv("JUDGE_CACHE", "yes").lower() != "yes":
+        return '<h2>🗄️ Judge Cache</h2><p>Disabled (JUDGE_CACHE=no)</p>'
+    stats = judge_cache_stats
+    return (
+        '<h2>🗄️ Judge Cache</h2>'
+        '<table border="1" style="border-collapse: collapse; font-size: 14px;">'
+        '<tr><th>Hits</th><th>Misses</th><th>Hit Rate</th><th>New Entries</th><th>Evicted</th></tr>'
+        f'<tr><td>{stats["hits"]}</td><td>{stats["misses"]}</td><td>{hit_rate(stats):.0%}</td>'
+        f'<td>{stats["writes"]}</td><td>{stats["evicted"]}</td></tr>'
+        '</table>'
+    )
+
+def judge_pool_summary_html(config):
+    if not judge_pool_stats:
+        return ""
+    elapsed_min = max((datetime.datetime.now() - config._session_started).total_seconds() / 60, 1e-9)
+    html = (
+        '<h2>⚖️ Judge Endpoints</h2>'
+        '<table border="1" style="border-collapse: collapse; font-size: 14px;">'
+        '<tr><th>Endpoint</th><th>Requests</th><th>Errors</th><th>Throughput (req/min)</th>'
+        '<th>Latency p50 (s)</th><th>Latency p95 (s)</th><th>Latency max (s)</th></tr>'
+    )
+    for url, stats in sorted(judge_pool_stats.items()):
+        latency = summarize_latencies(stats["latencies"], "latency", digits=2)
+        html += (
+            f'<tr><td>{url}</td><td>{stats["requests"]}</td><td>{stats["errors"]}</td>'
+            f'<td>{stats["requests"] / elapsed_min:.1f}</td><td>{latency["latency_p50"]}</td>'
+            f'<td>{latency["latency_p95"]}</td><td>{latency["latency_max"]}</td></tr>'
+        )
+    return html + '</table>'
+
+def rag_scheduler_summary_html():
+    rows = {label: stats for label, stats in sorted(rag_scheduler_stats.items()) if stats.get("requests")}
+    if not rows:
+        return ""
+    html = (
+        '<h2>🚦 RAG Request Scheduling</h2>'
+        '<p>Adaptive (AIMD) concurrency limit with jittered exponential backoff and a retry budget. '
+        'Every model has its own limit and TTFT baseline (the median of recent answers), and under '
+        'pytest-xdist so does every worker; achieved concurrency is the mean number of requests in '
+        'flight while any was.</p>'
+        '<table border="1" style="border-collapse: collapse; font-size: 14px;">'
+        '<tr><th>Model</th><th>Requests</th><th>Attempts</th><th>Retries</th><th>Throttled (429/503)</th>'
+        '<th>Out of Retry Budget</th><th>Failed</th><th>Backoff (s)</th><th>Limit min/max</th>'
+        '<th>Limit Decreases</th><th>Achieved Concurrency</th><th>Peak In Flight</th>'
+        '<th>TTFT Baseline (s)</th></tr>'
+    )
+    for label, stats in rows.items():
+        html += (
+            f'<tr><td>{label}</td><td>{stats["requests"]}</td><td>{stats["attempts"]}</td><td>{stats["retries"]}</td>'
+            f'<td>{stats["throttled"]}</td><td>{stats["budget_exhausted"]}</td><td>{stats["failed"]}</td>'
+            f'<td>{stats["backoff_sec"]:.1f}</td><td>{stats["limit_min"]} / {stats["limit_max"]}</td>'
+            f'<td>{stats["decreases"]}</td><td>{achieved_concurrency(stats)}</td><td>{stats["peak_in_flight"]}</td>'
+            f'<td>{"" if stats.get("baseline_sec") is None else stats["baseline_sec"]}</td></tr>'
+        )
+    return html + '</table>'
+
+def stage_breakdown_html():
+    rows = stage_breakdown(collect_trace_spans())
+    if not rows:
+        return ""
+    html = (
+        '<h2>🔬 Time by Stage</h2>'
+        '<p>Summed span durations; concurrent spans overlap, so totals can exceed wall-clock time.</p>'
+        '<table border="1" style="border-collapse: collapse; font-size: 14px;">'
+        '<tr><th>Stage</th><th>Count</th><th>Total (s)</th><th>Mean (ms)</th><th>p95 (ms)</th><th>Max (ms)</th></tr>'
+    )
+    for row in rows:
+        html += (
+            f'<tr><td>{row["stage"]}</td><td>{row["count"]}</td><td>{row["total_sec"]}</td>'
+            f'<td>{row["mean_ms"]}</td><td>{row["p95_ms"]}</td><td>{row["max_ms"]}</td></tr>'
+        )
+    return html + '</table>'
+
+def incremental_summary_html():
+    if not is_incremental_mode():
+        return ""
+    carried = [t["question"] for t in test_scores if t.get("carried_over")]
+    html = (
+        '<h2>🔁 Incremental Evaluation</h2>'
+        '<table border="1" style="border-collapse: collapse; font-size: 14px;">'
+        '<tr><th>Carried Over</th><th>Re-judged</th></tr>'
+        f'<tr><td>{len(carried)}</td><td>{len(test_scores) - len(carried)}</td></tr>'
+        '</table>'
+    )
+    if carried:
+        html += '<p>Unchanged answers with scores and reasons reused from the previous run:</p><ul>'
+        html += "".join(f'<li>{textwrap.shorten(q, width=80, placeholder="...")}</li>' for q in carried)
+        html += '</ul>'
+    return html
+
+DROPDOWN_STYLE = '''
     <style>
         details.custom-dropdown summary {
             font-size: 18px;
@@ -230,41 +424,176 @@ def pytest_html_results_summary(prefix, summary, postfix):
             background-color: #e0e0e0;
         }
     </style>
-    <details class="custom-dropdown">
-        <summary> Click here to view GEval Metrics Charts and Trends</summary>
-        <img src="data:image/png;base64,''' + encoded_img + '''" width="900"/>
-    '''
-
-    if history_file.exists():
-        records = [json.loads(line) for line in history_file.read_text().splitlines()]
-        df = pd.DataFrame(records)
+'''
+
+CORE_TRENDS = {
+    "relevancy": ("Relevancy Trend Over Time", "Relevancy"),
+    "faithfulness": ("Faithfulness Trend Over Time", "Faithfulness"),
+    "bias": ("Bias Trend Over Time", "Bias"),
+    "hallucination": ("Hallucination Trend Over Time", "Hallucination"),
+    "rag_time_sec": ("RAG Response Trend Over Time", "RAG Response (sec)"),
+    "ttft_sec": ("Time to First Token Trend Over Time", "Time to First Token (sec)"),
+}
+GEVAL_TRENDS = {
+    metric: (f'{metric.replace("_", " ").capitalize()} Trend Over Time', metric.replace("_", " ").capitalize())
+    for metric in ["informativeness", "clarity", "completeness", "tone_appropriateness", "glitch_check"]
+}
+
+def img_html(encoded):
+    return f'<img src="data:image/png;base64,{encoded}" width="900"/>'
+
+def load_trend_history(history_store):
+    # Trend charts only read REPORT_TREND_DAYS of history and plot at most
+    # REPORT_TREND_MAX_POINTS points per question
+    days = float(os.getenv("REPORT_TREND_DAYS", "90"))
+    since = (datetime.datetime.now() - datetime.timedelta(days=days)).isoformat() if days > 0 else None
+    df = split_series_by_model(history_store.to_dataframe(since=since))
+    return window_history(df, int(os.getenv("REPORT_TREND_MAX_POINTS", "200")))
+
+def values_or_zero(metric):
+    return [t.get(metric) if t.get(metric) is not None else 0 for t in test_scores]
+
+def trend_table_html(history_store):
+    # Only the last 3 rows per question are read; latest vs previous row, without a per-group loop
+    df = split_series_by_model(history_store.to_dataframe(last_n=3))
+    if df.empty:
+        return ""
+    grouped = df.groupby("question")
+    latest = grouped.nth(-1).set_index("question")
+    previous = grouped.nth(-2).set_index("question")
+    questions = previous.index
+    if questions.empty:
+        return ""
+    latest = latest.loc[questions]
+
+    columns = [("relevancy", True), ("faithfulness", True), ("bias", True), ("hallucination", True), ("rag_time_sec", False)]
+    html = '<h2>📈 Metric Trends (Last 3 Runs)</h2>'
+    html += '<table border="1" style="border-collapse: collapse; font-size: 14px;">'
+    html += '<tr><th>Question</th><th>Relevancy Δ</th><th>Faithfulness Δ</th><th>Bias Δ</th><th>Hallucination Δ</th><th>RAG Time Δ</th></tr>'
+    for question in sorted(questions):
+        q = textwrap.shorten(question, width=40, placeholder="...")
+        html += f'<tr><td>{q}</td>'
+        for metric, colored in columns:
+            current = latest.at[question, metric] if metric in latest else None
+            before = previous.at[question, metric] if metric in previous else None
+            if metric == "hallucination":
+                current, before = (0 if is_missing(v) else v for v in (current, before))
+            delta, color = format_percent_change(current, before)
+            html += f'<td style="color:{color}">{delta}</td>' if colored else f'<td>{delta}</td>'
+        html += '</tr>'
+    html += '</table>'
+    return html
+
+def pytest_html_results_summary(prefix, summary, postfix, session):
+    if not test_scores:
+        return
 
-        if not df.empty:
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            df.sort_values("timestamp", inplace=True)
+    summary.append(regression_summary_html(session.config))
+    summary.append(judge_cache_summary_html())
+    summary.append(judge_pool_summary_html(session.config))
+    summary.append(rag_scheduler_summary_html())
+    summary.append(incremental_summary_html())
 
-            for metric in ["informativeness", "clarity", "completeness", "tone_appropriateness", "glitch_check"]:
-                plt.figure(figsize=(12, 4))
-                for question, group in df.groupby("question"):
-                    if metric in group:
-                        plt.plot(group["timestamp"], group[metric], marker='o', label=question)
+    # Attach the results of a separate `python -m Utils.load_test` run when requested
+    load_test_results = os.getenv("LOAD_TEST_RESULTS")
+    if load_test_results and Path(load_test_results).exists():
+        summary.append(load_test_summary_html(json.loads(Path(load_test_results).read_text())))
 
-                plt.ylabel(metric.replace("_", " ").capitalize())
-                plt.title(f'{metric.replace("_", " ").capitalize()} Trend Over Time')
+    matrix = is_matrix_result(test_scores)
+    questions = [score_label(t, matrix) for t in test_scores]
+    rag_times = values_or_zero("rag_time_sec")
+    bar_width = 0.15
 
-                ax = plt.gca()
-                ax.set_xticks([])
-                ax.set_xticklabels([])
-                plt.tight_layout()
-                plt.legend(loc='best', fontsize='small')
+    history_store = get_history_store(session.config)
+    trend_df = load_trend_history(history_store)
+
+    specs = {
+        "scores": bar_chart(questions, [{
+            "title": 'RAG Evaluation: Relevancy, Faithfulness, Bias & Hallucination',
+            "ylabel": 'Score',
+            "bar_width": bar_width,
+            "series": [
+                {"label": 'Relevancy', "values": values_or_zero("relevancy"), "color": 'skyblue', "offset": -1.5},
+                {"label": 'Faithfulness', "values": values_or_zero("faithfulness"), "color": 'lightgreen', "offset": -0.5},
+                {"label": 'Bias', "values": values_or_zero("bias"), "color": 'orange', "offset": 0.5},
+                {"label": 'Hallucination', "values": values_or_zero("hallucination"), "color": 'violet', "offset": 1.5},
+            ]
+        }]),
+        "rag_time": bar_chart(questions, [{
+            "title": 'RAG Response Time per Question',
+            "ylabel": 'Seconds',
+            "series": [{"values": rag_times, "color": 'orange'}]
+        }], figsize=(12, 4)),
+        "streaming": bar_chart(questions, [
+            {
+                "title": 'Time to First Token vs Total Response Time',
+                "ylabel": 'Seconds',
+                "bar_width": 0.4,
+                "series": [
+                    {"label": 'Time to First Token', "values": values_or_zero("ttft_sec"), "color": 'teal', "offset": -0.5},
+                    {"label": 'Total Response', "values": rag_times, "color": 'orange', "offset": 0.5},
+                ]
+            },
+            {
+                "title": 'Streaming Throughput',
+                "ylabel": 'Tokens / sec',
+                "series": [{"values": values_or_zero("tokens_per_sec"), "color": 'slateblue'}]
+            }
+        ], figsize=(14, 4)),
+        "geval": bar_chart(questions, [{
+            "title": 'GEval Metrics: Informativeness, Clarity, Completeness, Tone & Glitch Check',
+            "ylabel": 'Score',
+            "bar_width": bar_width,
+            "series": [
+                {"label": 'Informativeness', "values": values_or_zero("informativeness"), "color": 'cyan', "offset": -2},
+                {"label": 'Clarity', "values": values_or_zero("clarity"), "color": 'magenta', "offset": -1},
+                {"label": 'Completeness', "values": values_or_zero("completeness"), "color": 'yellowgreen', "offset": 0},
+                {"label": 'Tone Appropriateness', "values": values_or_zero("tone_appropriateness"), "color": 'coral', "offset": 1},
+                {"label": 'Glitch Check', "values": values_or_zero("glitch_check"), "color": 'lightgray', "offset": 2},
+            ]
+        }]),
+    }
+    if not trend_df.empty:
+        for metric, (title, ylabel) in {**CORE_TRENDS, **GEVAL_TRENDS}.items():
+            specs[f"trend:{metric}"] = trend_chart(trend_df, metric, title, ylabel)
+    # Errored and skipped questions count against their model's pass rate
+    matrix_results = test_scores + unscored_results
+    comparison = compare_models(matrix_results) if is_matrix_result(matrix_results) else []
+    if comparison:
+        specs.update(comparison_chart_specs(comparison))
+
+    # Only charts whose input data changed since the last report are rendered
+    images = ChartRenderer().render(specs)
+
+    if comparison:
+        summary.append(
+            f'<h2>🆚 Model Comparison</h2>{model_comparison_html(comparison)}'
+            f'{img_html(images["models:quality"])}{img_html(images["models:latency"])}'
+        )
+    summary.append(f'<h2>📊 RAG Evaluation: Relevancy, Faithfulness, Bias & Hallucination</h2>{img_html(images["scores"])}')
+    summary.append(f'<h2>⏱️ RAG Response Time</h2>{img_html(images["rag_time"])}')
+    summary.append(f'<h2>⚡ Streaming Latency</h2>{img_html(images["streaming"])}')
+
+    if not trend_df.empty:
+        chart_html = DROPDOWN_STYLE + '''
+    <details class="custom-dropdown">
+        <summary> Click here to view Trend Over Time Charts</summary>
+    '''
+        chart_html += "".join(img_html(images[f"trend:{metric}"]) for metric in CORE_TRENDS)
+        chart_html += '</details>'
+        summary.append(chart_html)
 
-                buffer = BytesIO()
-                plt.savefig(buffer, format='png')
-                plt.close()
-                buffer.seek(0)
-                encoded = base64.b64encode(buffer.read()).decode('utf-8')
-                gevall_html += f'<img src="data:image/png;base64,{encoded}" width="900"/>'
+    trend_table = trend_table_html(history_store)
+    if trend_table:
+        summary.append(trend_table)
 
+    gevall_html = DROPDOWN_STYLE + '''
+    <details class="custom-dropdown">
+        <summary> Click here to view GEval Metrics Charts and Trends</summary>
+    ''' + img_html(images["geval"])
+    if not trend_df.empty:
+        gevall_html += "".join(img_html(images[f"trend:{metric}"]) for metric in GEVAL_TRENDS)
     gevall_html += '</details>'
 
     summary.append(gevall_html)
+    summary.append(stage_breakdown_html())
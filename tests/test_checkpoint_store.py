@@ -0,0 +1,48 @@
+import time
+import pytest
+from Utils.checkpoint_store import CheckpointStore
+from Utils.rag_respose import RagResult
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "checkpoints.db")
+
+
+def test_answers_are_fetched_once_per_run(path):
+    calls = []
+
+    def fetch(question):
+        calls.append(question)
+        return RagResult(answer=f"answer to {question}", rag_time=1.5, status=200, ttft=0.2)
+
+    store = CheckpointStore("run-1", path)
+    first = store.fetch_rag("q1", fetch)
+    resumed = CheckpointStore("run-1", path).fetch_rag("q1", fetch)
+    assert calls == ["q1"]
+    assert resumed == first
+    assert store.questions_with("rag") == {"q1"}
+
+
+def test_failed_answers_are_not_checkpointed(path):
+    store = CheckpointStore("run-1", path)
+    store.fetch_rag("q1", lambda question: RagResult(answer="", rag_time=0.0, error="HTTP 503", status=503))
+    assert not store.has_run()
+
+
+def test_scoped_views_keep_models_apart(path):
+    store = CheckpointStore("run-1", path)
+    store.scoped("vllm/granite").save("q1", "rag", {"answer": "granite"})
+    store.scoped("vllm/llama").save("q1", "rag", {"answer": "llama"})
+    assert store.scoped("vllm/granite").load_stage("q1", "rag") == {"answer": "granite"}
+    assert store.load_stage("q1", "rag") is None
+
+
+def test_prune_keeps_the_latest_runs(path):
+    for run in ("run-1", "run-2", "run-3"):
+        CheckpointStore(run, path).save("q1", "rag", {"answer": run})
+        time.sleep(0.01)
+    current = CheckpointStore("run-4", path)
+    assert current.prune(keep_runs=2) == 1
+    assert not CheckpointStore("run-1", path).has_run()
+    assert CheckpointStore("run-2", path).has_run()
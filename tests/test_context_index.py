@@ -0,0 +1,94 @@
+import json
+import math
+import pytest
+from collections import Counter
+from Utils import context_index
+from Utils.context_index import ContextIndex, tokenize, read_corpus, get_context_index
+
+PASSAGES = [
+    "Backstage plugins extend the developer portal with frontend and backend features.",
+    "Dynamic plugins are enabled in the dynamic-plugins ConfigMap without rebuilding Developer Hub.",
+    "TechDocs renders Markdown documentation next to the catalog entity.",
+    "The software catalog tracks components, APIs and their owners. Café ☕ docs too.",
+]
+
+
+def bm25_reference(passages, query, k1=1.5, b=0.75):
+    # Straightforward BM25 over every passage, to check the inverted index against
+    docs = [Counter(tokenize(p)) for p in passages]
+    avg_length = sum(sum(d.values()) for d in docs) / len(docs)
+    scores = []
+    for doc in docs:
+        length, score = sum(doc.values()), 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in d for d in docs)
+            if not doc[term]:
+                continue
+            idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+            score += idf * doc[term] * (k1 + 1) / (doc[term] + k1 * (1 - b + b * length / avg_length))
+        scores.append(score)
+    return scores
+
+
+@pytest.fixture
+def index(tmp_path):
+    return ContextIndex.build(PASSAGES, tmp_path / "index")
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("How do I enable the Dynamic-Plugins ConfigMap?") == ["enable", "dynamic", "plugins", "configmap"]
+
+
+def test_scores_match_plain_bm25(index):
+    query = "enable dynamic plugins in developer hub"
+    reference = bm25_reference(PASSAGES, query)
+    hits = index.search(query, k=len(PASSAGES))
+    expected = sorted((s, i) for i, s in enumerate(reference) if s > 0)[::-1]
+    assert [passage for passage, _ in hits] == [PASSAGES[i] for _, i in expected]
+    assert [score for _, score in hits] == pytest.approx([s for s, _ in expected], rel=1e-5)
+
+
+def test_search_limits(index):
+    assert len(index.search("plugins", k=1)) == 1
+    assert len(index.search("plugins", k=10)) == 2
+    assert index.search("kubernetes operator") == []
+    assert index.search("plugins", k=0) == []
+    assert index.search("plugins", min_score=100) == []
+
+
+def test_reopened_index_reads_utf8_passages(index):
+    reopened = ContextIndex(index.directory)
+    assert reopened.n_docs == len(PASSAGES)
+    assert reopened.search("café catalog")[0][0] == PASSAGES[3]
+
+
+def test_empty_corpus(tmp_path):
+    index = ContextIndex.build([], tmp_path / "empty")
+    assert index.n_docs == 0 and index.search("plugins") == []
+
+
+def test_read_corpus_formats(tmp_path):
+    corpus = tmp_path / "corpus"
+    (corpus / "nested").mkdir(parents=True)
+    (corpus / "a.md").write_text("First   passage\nwraps.\n\nSecond passage.\n")
+    (corpus / "nested" / "b.jsonl").write_text(json.dumps({"text": "From JSONL."}) + "\n\n")
+    (corpus / "ignored.pdf").write_text("not a passage")
+    assert read_corpus(corpus) == ["First passage wraps.", "Second passage.", "From JSONL."]
+
+
+def test_index_is_rebuilt_when_the_corpus_changes(tmp_path, monkeypatch):
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text("Backstage plugins.\n\nTechDocs renders Markdown.\n")
+    monkeypatch.setenv("CONTEXT_CORPUS", str(corpus))
+    monkeypatch.setenv("CONTEXT_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(context_index, "_index_cache", {})
+    assert get_context_index().n_docs == 2
+
+    corpus.write_text("Only one passage about the catalog, a bit longer now.\n")
+    monkeypatch.setattr(context_index, "_index_cache", {})
+    index = get_context_index()
+    assert index.n_docs == 1
+    assert index is get_context_index()
+
+    monkeypatch.delenv("CONTEXT_CORPUS")
+    assert get_context_index() is None
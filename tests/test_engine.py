@@ -0,0 +1,87 @@
+import pytest
+from Utils import judge_cache, judge_pool
+from Utils.engine import ASSERT_ORDER, SCORE_KEYS, evaluate_question
+from Utils.judge_stub import start_judge_stub
+from Utils.model_matrix import ModelTarget
+from Utils.rag_respose import RagResult
+
+QUESTION = "How do I enable the Tekton plugin?"
+ANSWER = ("Enable the Tekton plugin by adding its package to the dynamic plugins configuration "
+          "and restarting Developer Hub so the plugin is loaded.")
+
+
+@pytest.fixture
+def stub_judge(request, monkeypatch, tmp_path):
+    # Judges every metric with the stub; the default score of 0 fails all GEval criteria,
+    # @pytest.mark.judge_score(10) passes them
+    marker = request.node.get_closest_marker("judge_score")
+    server, url = start_judge_stub(score=marker.args[0] if marker else 0)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("JUDGE_ENDPOINTS", url)
+    monkeypatch.setenv("JUDGE_MODEL", "stub-judge")
+    monkeypatch.setenv("JUDGE_CACHE", "no")
+    monkeypatch.setenv("ENABLE_GENERAL_EVAL_METRICS", "yes")
+    monkeypatch.setattr(judge_pool, "_pool", None)
+    monkeypatch.setattr(judge_cache, "_cache", None)
+    yield
+    server.shutdown()
+
+
+def fetch(question, target=None):
+    return RagResult(answer=ANSWER, rag_time=0.1, status=200)
+
+
+def test_failed_thresholds_keep_the_model_label(stub_judge):
+    target = ModelTarget("vllm", "granite-8b")
+
+    evaluation = evaluate_question(QUESTION, fetch=fetch, target=target, log=lambda *args: None)
+
+    assert evaluation.status == "failed"
+    assert any(failure.startswith("Clarity Test Failed") for failure in evaluation.failures)
+    assert evaluation.model == "vllm/granite-8b"
+    assert evaluation.score_data["model"] == "granite-8b"
+    assert evaluation.score_data["passed"] is False
+
+
+def test_rag_failure_is_an_error(stub_judge):
+    def failing_fetch(question, target=None):
+        return RagResult(answer="", rag_time=0.0, error="HTTP 500", status=500, attempts=4)
+
+    evaluation = evaluate_question(QUESTION, fetch=failing_fetch, target=ModelTarget("vllm", "granite-8b"),
+                                   log=lambda *args: None)
+
+    assert evaluation.status == "error"
+    assert "after 4 attempt(s)" in evaluation.message
+    assert evaluation.model == "vllm/granite-8b"
+
+
+GLITCHY_ANSWER = ("Enable the Tekton plugin by adding its package to the dynamic plugins configuration "
+                  "and restarting Developer Hub so the pluginnnnnn is loaded.")
+
+
+@pytest.mark.judge_score(10)
+@pytest.mark.parametrize("geval", ["yes", "no"])
+def test_glitchy_answer_fails_with_the_geval_metrics(stub_judge, monkeypatch, geval):
+    monkeypatch.setenv("ENABLE_GENERAL_EVAL_METRICS", geval)
+
+    def glitchy_fetch(question, target=None):
+        return RagResult(answer=GLITCHY_ANSWER, rag_time=0.1, status=200)
+
+    clean = evaluate_question(QUESTION, fetch=fetch, log=lambda *args: None)
+    glitchy = evaluate_question(QUESTION, fetch=glitchy_fetch, log=lambda *args: None)
+
+    # The stub judge gives both answers the same verdicts; only the glitch check tells them apart
+    added = [failure for failure in glitchy.failures if failure not in clean.failures]
+    if geval == "yes":
+        # glitch_check is asserted like the Output Glitch Check GEval it replaced
+        assert glitchy.status == "failed"
+        assert len(added) == 1 and added[0].startswith("Output Glitch Check Test Failed: 0.0")
+        assert glitchy.score_data["glitch_check"] == 0.0
+    else:
+        assert added == []
+        assert glitchy.score_data["glitch_check"] is None
+
+
+def test_every_scored_metric_has_its_threshold_asserted():
+    # score_data keys with a threshold in the original test, glitch_check included
+    assert set(ASSERT_ORDER) == {*SCORE_KEYS, "glitch_check"}
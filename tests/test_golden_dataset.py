@@ -0,0 +1,108 @@
+import sys
+import json
+import pytest
+from Utils.golden_dataset import GoldenDataset, NO_CONTEXT, parse_shard, select_from_env
+
+RECORDS = [
+    {"question": "What is RHDH?", "contexts": ["RHDH is built on Backstage."], "tags": ["smoke"]},
+    {"question": "How do I add a plugin?", "contexts": ["Use dynamic plugins.", "Restart the pod."], "tags": ["plugins"]},
+    {"question": "What is TechDocs?", "contexts": ["Docs as code."], "tags": ["plugins", "docs"]},
+] + [{"question": f"Generated question {i}", "contexts": [], "tags": []} for i in range(20)]
+
+
+@pytest.fixture
+def jsonl(tmp_path):
+    path = tmp_path / "golden.jsonl"
+    path.write_text("\n".join(json.dumps(record) for record in RECORDS) + "\n\n")
+    return path
+
+
+def test_jsonl_contexts_are_read_on_demand(jsonl):
+    dataset = GoldenDataset(str(jsonl))
+    assert len(dataset) == len(RECORDS)
+    assert "What is RHDH?" in dataset
+    assert dataset.get_contexts("How do I add a plugin?") == ["Use dynamic plugins.", "Restart the pod."]
+    assert dataset.get_contexts("Unknown question") == NO_CONTEXT
+
+
+def test_jsonl_index_is_cached_until_the_file_changes(jsonl):
+    GoldenDataset(str(jsonl))
+    index_path = jsonl.with_name(jsonl.name + ".index.json")
+    assert index_path.exists()
+    assert GoldenDataset(str(jsonl)).get_contexts("What is TechDocs?") == ["Docs as code."]
+
+    jsonl.write_text(json.dumps({"question": "Only question", "contexts": ["c"]}) + "\n")
+    dataset = GoldenDataset(str(jsonl))
+    assert len(dataset) == 1 and dataset.get_contexts("Only question") == ["c"]
+
+
+def test_select_by_tag_sample_and_shard(jsonl):
+    dataset = GoldenDataset(str(jsonl))
+    assert dataset.select(tags=["plugins"]) == ["How do I add a plugin?", "What is TechDocs?"]
+
+    sample = dataset.select(sample=5, seed=7)
+    assert len(sample) == 5 and sample == dataset.select(sample=5, seed=7)
+    assert sample == [q for q in dataset.select() if q in sample]     # file order is kept
+
+    shards = [dataset.select(shard=(index, 3)) for index in range(3)]
+    assert sorted(sum(shards, [])) == sorted(dataset.select())
+
+
+def test_select_from_env(jsonl, monkeypatch):
+    dataset = GoldenDataset(str(jsonl))
+    monkeypatch.setenv("DATASET_TAGS", "smoke, docs")
+    assert select_from_env(dataset) == ["What is RHDH?", "What is TechDocs?"]
+    monkeypatch.delenv("DATASET_TAGS")
+    monkeypatch.setenv("CI_NODE_INDEX", "1")
+    monkeypatch.setenv("CI_NODE_TOTAL", "2")
+    assert select_from_env(dataset) == dataset.select(shard=(0, 2))
+
+
+def test_parse_shard():
+    assert parse_shard("2/4") == (1, 4)
+    assert parse_shard(None) is None
+    with pytest.raises(ValueError):
+        parse_shard("5/4")
+
+
+def test_from_dict():
+    dataset = GoldenDataset.from_dict({"hi": ["greeting"], "bye": []})
+    assert dataset.select() == ["hi", "bye"]
+    assert dataset.get_contexts("hi") == ["greeting"]
+
+
+def test_yaml(tmp_path):
+    yaml = pytest.importorskip("yaml")
+    path = tmp_path / "golden.yaml"
+    path.write_text(yaml.safe_dump(RECORDS[:3]))
+    dataset = GoldenDataset(str(path))
+    assert dataset.select(tags=["docs"]) == ["What is TechDocs?"]
+    assert dataset.get_contexts("What is RHDH?") == ["RHDH is built on Backstage."]
+
+
+def test_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pandas as pd
+
+    path = tmp_path / "golden.parquet"
+    pd.DataFrame(RECORDS[:3]).to_parquet(path)
+    dataset = GoldenDataset(str(path))
+    assert dataset.select(tags=["plugins"]) == ["How do I add a plugin?", "What is TechDocs?"]
+    assert dataset.get_contexts("How do I add a plugin?") == ["Use dynamic plugins.", "Restart the pod."]
+
+
+@pytest.mark.parametrize("suffix, module, package", [
+    ("yaml", "yaml", "pyyaml"),
+    ("parquet", "pyarrow.parquet", "pyarrow"),
+])
+def test_missing_optional_package_is_named(tmp_path, monkeypatch, suffix, module, package):
+    monkeypatch.setitem(sys.modules, module, None)      # makes the import fail
+    path = tmp_path / f"golden.{suffix}"
+    path.write_text("")
+    with pytest.raises(ImportError, match=f"pip install {package}"):
+        GoldenDataset(str(path))
+
+
+def test_unsupported_format(tmp_path):
+    with pytest.raises(ValueError):
+        GoldenDataset(str(tmp_path / "golden.csv"))
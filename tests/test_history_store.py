@@ -0,0 +1,89 @@
+import json
+import sqlite3
+import pytest
+from Utils.history_store import HistoryStore
+
+
+def row(question, timestamp, model=None, relevancy=0.9):
+    return {"question": question, "timestamp": timestamp, "provider": "vllm" if model else None,
+            "model": model, "relevancy": relevancy}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    yield store
+    store.close()
+
+
+def test_append_and_query_in_timestamp_order(store):
+    run_id = store.start_run("run-1")
+    store.append(row("q2", "2026-01-01T10:00:02"), run_id)
+    store.append(row("q1", "2026-01-01T10:00:01"), run_id)
+    rows = store.query()
+    assert [r["question"] for r in rows] == ["q1", "q2"]
+    assert all(r["run_id"] == "run-1" for r in rows)
+    assert store.query(questions={"q2"})[0]["question"] == "q2"
+    assert store.query(since="2026-01-01T10:00:02")[0]["question"] == "q2"
+
+
+def test_last_n_is_per_question_and_model(store):
+    for day in range(1, 5):
+        for model in ("granite", "llama"):
+            store.append(row("q1", f"2026-01-0{day}T10:00:00", model), f"run-{day}")
+    rows = store.query(last_n=2)
+    assert len(rows) == 4
+    assert {(r["model"], r["timestamp"][:10]) for r in rows} == {
+        (model, day) for model in ("granite", "llama") for day in ("2026-01-03", "2026-01-04")
+    }
+
+
+def test_replace_drops_the_rows_of_a_resumed_question(store):
+    store.append(row("q1", "2026-01-01T10:00:00", "granite", relevancy=0.1), "run-1")
+    store.append(row("q1", "2026-01-01T10:00:00", "llama", relevancy=0.2), "run-1")
+    store.append(row("q1", "2026-01-01T11:00:00", "granite", relevancy=0.8), "run-1", replace=True)
+    rows = store.query(run_id="run-1")
+    assert sorted((r["model"], r["relevancy"]) for r in rows) == [("granite", 0.8), ("llama", 0.2)]
+
+
+def test_start_run_is_idempotent(store):
+    assert store.start_run("run-1") == store.start_run("run-1") == "run-1"
+    assert store.start_run().count("-") == 2
+
+
+def test_databases_without_the_model_column_are_migrated(tmp_path):
+    path = tmp_path / "old.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE runs (run_id TEXT PRIMARY KEY, started_at TEXT NOT NULL, metadata TEXT);
+        CREATE TABLE results (id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT NOT NULL,
+                              question TEXT NOT NULL, timestamp TEXT NOT NULL, data TEXT NOT NULL);
+        CREATE UNIQUE INDEX idx_results_run_question_ts ON results(run_id, question, timestamp);
+    """)
+    conn.execute("INSERT INTO results (run_id, question, timestamp, data) VALUES (?, ?, ?, ?)",
+                 ("old", "q1", "2025-12-01T10:00:00", json.dumps(row("q1", "2025-12-01T10:00:00"))))
+    conn.commit()
+    conn.close()
+
+    store = HistoryStore(str(path))
+    # The same question and timestamp for two models no longer collide
+    store.append(row("q1", "2026-01-01T10:00:00", "granite"), "new")
+    store.append(row("q1", "2026-01-01T10:00:00", "llama"), "new")
+    assert len(store.query()) == 3
+    store.close()
+
+
+def test_legacy_jsonl_is_imported_into_a_new_database(tmp_path):
+    lines = [row("q1", "2025-11-01T10:00:00"), row("q1", "2025-11-02T10:00:00")]
+    (tmp_path / "test_history.jsonl").write_text("\n".join(json.dumps(line) for line in lines) + "\n")
+    store = HistoryStore(str(tmp_path / "history.db"))
+    rows = store.query()
+    assert [r["run_id"] for r in rows] == ["imported-2025-11-01", "imported-2025-11-02"]
+    store.close()
+
+
+def test_to_dataframe_parses_timestamps(store):
+    store.append(row("q1", "2026-01-01T10:00:00"), "run-1")
+    df = store.to_dataframe(last_n=5)
+    assert str(df["timestamp"].dtype).startswith("datetime64")
+    assert store.to_dataframe(questions={"missing"}).empty
@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import pytest
+from types import SimpleNamespace
+from Utils.judge_cache import JudgeCache, hit_rate
+
+
+class FakeMetric:
+    def __init__(self, threshold=0.5, evaluation_model="mistral:7b (Ollama)"):
+        self.name = "Answer Relevancy"
+        self.threshold = threshold
+        self.include_reason = True
+        self.evaluation_model = evaluation_model
+        self.score = self.reason = self.success = self.error = None
+
+
+def judged(score=0.9, **kwargs):
+    metric = FakeMetric(**kwargs)
+    metric.score, metric.reason, metric.success = score, "Relevant.", score >= metric.threshold
+    return metric
+
+
+TEST_CASE = SimpleNamespace(input="What is RHDH?", actual_output="A developer portal.", expected_output=None,
+                            context=["RHDH is built on Backstage."], retrieval_context=None)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return JudgeCache(str(tmp_path / "cache"), max_bytes=1024 * 1024, max_age_sec=3600)
+
+
+def test_hit_applies_the_stored_verdict(cache):
+    cache.store(judged(), TEST_CASE)
+    metric = FakeMetric()
+    assert cache.load(metric, TEST_CASE)
+    assert (metric.score, metric.reason, metric.success, metric.error) == (0.9, "Relevant.", True, None)
+    assert cache.stats_delta() == {"hits": 1, "misses": 0, "writes": 1, "evicted": 0}
+
+
+def test_key_covers_metric_config_judge_and_test_case(cache):
+    cache.store(judged(), TEST_CASE)
+    assert not cache.load(FakeMetric(threshold=0.7), TEST_CASE)
+    assert not cache.load(FakeMetric(evaluation_model="llama3 (Ollama)"), TEST_CASE)
+    other_answer = SimpleNamespace(**{**vars(TEST_CASE), "actual_output": "A portal."})
+    assert not cache.load(FakeMetric(), other_answer)
+    assert cache.stats["misses"] == 3
+
+
+def test_failed_measurements_are_not_stored(cache):
+    metric = judged()
+    metric.error = "judge timed out"
+    cache.store(metric, TEST_CASE)
+    assert not cache.load(FakeMetric(), TEST_CASE)
+
+
+def test_expired_entries_are_misses(cache):
+    cache.store(judged(), TEST_CASE)
+    cache.max_age_sec = -1
+    assert not cache.load(FakeMetric(), TEST_CASE)
+    assert not list(cache.directory.glob("*/*.json"))
+
+
+@pytest.mark.parametrize("content", [
+    "not json",
+    json.dumps({"score": 0.9, "reason": "r", "success": True}),                        # no "created"
+    json.dumps({"created": time.time(), "score": 0.9}),                                 # no reason/success
+    json.dumps({"created": "yesterday", "score": 0.9, "reason": "r", "success": True}),
+    json.dumps([0.9, "r", True]),
+])
+def test_malformed_entries_are_misses(cache, content):
+    key = cache.key_for(FakeMetric(), TEST_CASE)
+    path = cache._path(key)
+    path.parent.mkdir(parents=True)
+    path.write_text(content)
+
+    metric = FakeMetric()
+    assert not cache.load(metric, TEST_CASE)
+    assert metric.score is None
+    assert cache.stats["misses"] == 1
+
+    # The next measurement replaces the broken entry
+    cache.store(judged(), TEST_CASE)
+    assert cache.load(FakeMetric(), TEST_CASE)
+
+
+def test_prune_evicts_least_recently_used(cache):
+    old, new = judged(0.6), judged(0.8)
+    cache.store(old, TEST_CASE)
+    other = SimpleNamespace(**{**vars(TEST_CASE), "input": "What is Backstage?"})
+    cache.store(new, other)
+    old_path = cache._path(cache.key_for(old, TEST_CASE))
+    new_path = cache._path(cache.key_for(new, other))
+    os.utime(old_path, (time.time() - 60, time.time() - 60))
+    # One byte short of both entries (whose sizes differ), so exactly one has to go
+    cache.max_bytes = old_path.stat().st_size + new_path.stat().st_size - 1
+
+    cache.prune()
+    assert not cache.load(FakeMetric(), TEST_CASE)
+    assert cache.load(FakeMetric(), other)
+    assert cache.stats["evicted"] == 1
+
+
+def test_disabled_cache_never_hits(tmp_path):
+    cache = JudgeCache(str(tmp_path), max_bytes=1024, max_age_sec=3600, enabled=False)
+    cache.store(judged(), TEST_CASE)
+    assert not cache.load(FakeMetric(), TEST_CASE)
+    assert hit_rate(cache.stats) == 0.0
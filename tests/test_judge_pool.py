@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from ollama import ResponseError
+from deepeval.metrics import GEval
+from deepeval.test_case import LLMTestCase, LLMTestCaseParams
+from Utils.judge_pool import JudgePool
+from Utils.judge_stub import start_judge_stub
+
+
+@pytest.fixture
+def stub():
+    server, url = start_judge_stub(score=8)
+    yield server, url
+    server.shutdown()
+
+
+def make_geval(judge):
+    return GEval(
+        name="Clarity",
+        evaluation_steps=["Is the response written in a clear and understandable manner?"],
+        evaluation_params=[LLMTestCaseParams.ACTUAL_OUTPUT],
+        model=judge,
+        async_mode=False,
+    )
+
+
+def test_generate_returns_bare_result(stub):
+    _, url = stub
+    pool = JudgePool([url], model="stub-judge")
+    assert pool.generate("Say hi") == "Stub judge verdict."
+
+
+def test_geval_through_pool(stub):
+    server, url = stub
+    pool = JudgePool([url], model="stub-judge")
+    metric = make_geval(pool)
+    test_case = LLMTestCase(input="How do I install a plugin?", actual_output="Use the dynamic plugins config.")
+
+    metric.measure(test_case)
+
+    assert metric.score == pytest.approx(0.8)
+    assert metric.reason == "Stub judge verdict."
+    assert server.RequestHandlerClass.requests == 1     # steps are given, so only the verdict is asked for
+    assert pool.stats_delta()[url]["errors"] == 0
+
+
+def test_geval_async_through_pool(stub):
+    _, url = stub
+    pool = JudgePool([url], model="stub-judge")
+    metric = make_geval(pool)
+    test_case = LLMTestCase(input="How do I install a plugin?", actual_output="Use the dynamic plugins config.")
+
+    asyncio.run(metric.a_measure(test_case, _show_indicator=False))
+
+    assert metric.score == pytest.approx(0.8)
+
+
+def test_failed_endpoint_is_retried_on_another(stub):
+    _, good_url = stub
+    bad, bad_url = start_judge_stub(status=500)
+    try:
+        pool = JudgePool([bad_url, good_url], model="stub-judge", retries=1)
+        pool.endpoints[0].healthy = True      # force the first pick onto the failing endpoint
+        pool.endpoints[1].outstanding = 1
+        pool.endpoints[1].max_concurrency = 2
+        assert pool.generate("Say hi") == "Stub judge verdict."
+        stats = pool.stats_delta()
+        assert stats[bad_url]["errors"] == 1
+        assert stats[good_url]["errors"] == 0
+        assert not pool.endpoints[0].healthy
+    finally:
+        bad.shutdown()
+
+
+def test_unreachable_endpoint_is_ejected(stub):
+    _, good_url = stub
+    pool = JudgePool(["http://127.0.0.1:9", good_url], model="stub-judge", retries=1)
+    pool.endpoints[0].healthy = True      # as if it went down after the last health check
+    pool.endpoints[1].outstanding = 1
+    pool.endpoints[1].max_concurrency = 2
+    assert pool.generate("Say hi") == "Stub judge verdict."
+    assert not pool.endpoints[0].healthy and pool.endpoints[1].healthy
+
+
+@pytest.mark.parametrize("failure, error", [("bad request", ResponseError), ("unparseable output", ValueError)])
+def test_model_output_errors_leave_the_endpoint_healthy(stub, failure, error):
+    _, url = stub
+    bad, bad_url = start_judge_stub(status=400)
+    try:
+        pool = JudgePool([bad_url if failure == "bad request" else url], model="stub-judge")
+        endpoint = pool.endpoints[0]
+        endpoint.healthy = True
+        calls = []
+        if failure == "unparseable output":
+            def generate(prompt, schema=None):
+                calls.append(prompt)
+                raise ValueError("Evaluation LLM outputted an invalid JSON")
+            endpoint.model.generate = generate
+
+        with pytest.raises(error):
+            pool.generate("Say hi")
+
+        # Raised on the first attempt: another endpoint would fail the same way
+        assert (bad.RequestHandlerClass.requests if failure == "bad request" else len(calls)) == 1
+        assert endpoint.healthy and endpoint.outstanding == 0
+        assert pool.stats_delta()[endpoint.url]["errors"] == 0
+    finally:
+        bad.shutdown()
@@ -0,0 +1,45 @@
+import os
+from Utils import load_test, rag_respose
+from Utils.auth_token import BearerTokenProvider, LOCAL_LIGHTSPEED_URL
+from Utils.load_test import find_saturation, run_load_test
+from Utils.rag_respose import RagResult
+
+
+def fake_fetch(question, verbose=True, target=None, adaptive=True):
+    return RagResult(answer="answer", rag_time=0.01, ttft=0.005)
+
+
+def test_pool_is_sized_without_touching_the_environment(monkeypatch):
+    monkeypatch.setattr(load_test, "fetch_rag_answer", fake_fetch)
+    monkeypatch.setattr(rag_respose, "_session", None)
+    monkeypatch.setattr(rag_respose, "_session_pool_size", 0)
+    monkeypatch.delenv("RAG_MAX_IN_FLIGHT", raising=False)
+
+    results = run_load_test(concurrency=[3], duration=0.05, questions=["hi"])
+
+    assert results["steps"][0]["errors"] == 0 and results["steps"][0]["requests"] > 0
+    assert "RAG_MAX_IN_FLIGHT" not in os.environ
+    assert rag_respose._session_pool_size == 4     # the default pool was already big enough
+    assert rag_respose.get_session(pool_size=16).get_adapter("http://localhost")._pool_maxsize == 16
+    assert rag_respose._session_pool_size == 16
+
+
+def test_rhdh_local_token_is_refreshed_before_each_request(monkeypatch):
+    monkeypatch.setattr(load_test, "fetch_rag_answer", fake_fetch)
+    monkeypatch.setattr(load_test, "get_env_values", lambda: {"base_url": LOCAL_LIGHTSPEED_URL})
+    calls = []
+    monkeypatch.setattr(BearerTokenProvider, "get", lambda self, page_factory: calls.append(page_factory) or "token")
+
+    results = run_load_test(qps=[50], duration=0.1, max_in_flight=2, questions=["hi"])
+
+    assert len(calls) == results["steps"][0]["requests"] > 0
+
+
+def test_saturation_point():
+    steps = [
+        {"concurrency": 1, "throughput_rps": 1.0, "error_rate": 0.0, "latency_p95_sec": 1.0},
+        {"concurrency": 2, "throughput_rps": 1.9, "error_rate": 0.0, "latency_p95_sec": 1.1},
+        {"concurrency": 4, "throughput_rps": 2.0, "error_rate": 0.0, "latency_p95_sec": 2.0},
+    ]
+    assert find_saturation(steps, "concurrency") == {
+        "concurrency": 2, "throughput_rps": 1.9, "latency_p95_sec": 1.1, "reason": "throughput stopped increasing"}
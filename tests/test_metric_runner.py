@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import pytest
+from Utils.metric_runner import measure_metrics
+
+
+class FakeMetric:
+    # Records which thread measured it; async_mode metrics go through a_measure
+    def __init__(self, name, async_mode=True, error=None):
+        self.name = name
+        self.async_mode = async_mode
+        self.error = error
+        self.score = None
+        self.thread = None
+
+    def measure(self, test_case):
+        self.thread = threading.get_ident()
+        if self.error:
+            raise self.error
+        self.score = 1.0
+
+    async def a_measure(self, test_case, _show_indicator=True):
+        await asyncio.sleep(0)
+        self.measure(test_case)
+
+
+def test_concurrent_metrics_without_a_running_loop():
+    metrics = [FakeMetric("a"), FakeMetric("b", async_mode=False)]
+    measure_metrics(metrics, test_case=None, max_concurrency=2, use_cache=False)
+    assert [metric.score for metric in metrics] == [1.0, 1.0]
+
+
+def test_concurrent_metrics_inside_a_running_loop():
+    # A sync Playwright session keeps an event loop running on the test's thread
+    metrics = [FakeMetric("a"), FakeMetric("b"), FakeMetric("c", async_mode=False)]
+
+    async def session():
+        measure_metrics(metrics, test_case=None, max_concurrency=2, use_cache=False)
+
+    asyncio.run(session())
+    assert [metric.score for metric in metrics] == [1.0, 1.0, 1.0]
+    assert all(metric.thread != threading.get_ident() for metric in metrics)
+
+
+def test_failures_are_raised_after_every_metric_finishes():
+    metrics = [FakeMetric("a", error=ValueError("judge failed")), FakeMetric("b")]
+
+    async def session():
+        measure_metrics(metrics, test_case=None, max_concurrency=2, use_cache=False)
+
+    with pytest.raises(ValueError, match="judge failed"):
+        asyncio.run(session())
+    assert metrics[1].score == 1.0
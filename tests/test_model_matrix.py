@@ -0,0 +1,53 @@
+import pytest
+from Utils.engine import Evaluation, model_results
+from Utils.model_matrix import ModelTarget, compare_models, model_comparison_html, parse_model_matrix, unscored_result
+
+
+def scored(question, model, passed=True, rag_time=1.0, relevancy=0.9):
+    return {"question": question, "provider": "vllm", "model": model, "passed": passed,
+            "relevancy": relevancy, "rag_time_sec": rag_time, "ttft_sec": rag_time / 4, "tokens_per_sec": 50.0}
+
+
+def test_parse_model_matrix():
+    assert parse_model_matrix("vllm/granite-8b, openai/org/gpt-4o,vllm/granite-8b,") == [
+        ModelTarget("vllm", "granite-8b"), ModelTarget("openai", "org/gpt-4o")]
+    with pytest.raises(ValueError):
+        parse_model_matrix("granite-8b")
+
+
+def test_rag_errors_count_against_the_pass_rate():
+    # The fast model answered one question of four; the rest errored or had no recording
+    results = [
+        scored("q1", "fast", rag_time=0.5),
+        unscored_result("q2", "vllm/fast", "error"),
+        unscored_result("q3", "vllm/fast", "error"),
+        unscored_result("q4", "vllm/fast", "skipped"),
+        *(scored(f"q{i}", "slow", rag_time=2.0) for i in range(1, 5)),
+    ]
+    rows = {row["model"]: row for row in compare_models(results, min_pass_rate=1.0)}
+
+    assert (rows["vllm/fast"]["questions"], rows["vllm/fast"]["unscored"]) == (4, 3)
+    assert rows["vllm/fast"]["pass_rate"] == 0.25
+    assert rows["vllm/fast"]["relevancy"] == 0.9
+    assert rows["vllm/slow"]["pass_rate"] == 1.0
+    assert not rows["vllm/fast"]["recommended"] and rows["vllm/slow"]["recommended"]
+    assert "<td>3</td><td>25%</td>" in model_comparison_html(list(rows.values()))
+
+
+def test_a_model_that_only_errored_is_never_recommended():
+    results = [unscored_result("q1", "vllm/broken", "error"), scored("q1", "ok", passed=False)]
+    rows = {row["model"]: row for row in compare_models(results, min_pass_rate=0.0)}
+    assert rows["vllm/broken"]["pass_rate"] == 0.0
+    assert rows["vllm/broken"]["rag_time_p50"] is None and not rows["vllm/broken"]["recommended"]
+    assert rows["vllm/ok"]["recommended"]
+
+
+def test_engine_passes_every_matrix_evaluation():
+    evaluations = [
+        Evaluation("q1", score_data=scored("q1", "fast"), model="vllm/fast"),
+        Evaluation("q2", "error", "RAG response failed", model="vllm/fast"),
+        Evaluation("q3", "error", "RAG response failed"),     # single-model run: no model to charge
+    ]
+    results = model_results(evaluations)
+    assert [(r["question"], r["passed"]) for r in results] == [("q1", True), ("q2", False)]
+    assert compare_models(results)[0]["pass_rate"] == 0.5
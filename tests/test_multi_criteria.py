@@ -0,0 +1,104 @@
+import json
+import asyncio
+import pytest
+from deepeval.models import DeepEvalBaseLLM
+from deepeval.metrics import GEval, AnswerRelevancyMetric
+from deepeval.test_case import LLMTestCase, LLMTestCaseParams
+from Utils.multi_criteria import CriteriaGroup, build_prompt, group_criteria, parse_scores
+
+TEST_CASE = LLMTestCase(input="How do I add a plugin?", actual_output="Add it to the dynamic plugins ConfigMap.")
+
+
+class FakeJudge(DeepEvalBaseLLM):
+    # Answers the combined prompt with `combined`; individual GEval calls (with a schema) get 7/10
+    def __init__(self, combined: dict | str, name: str = "fake-judge"):
+        self.combined = combined if isinstance(combined, str) else json.dumps(combined)
+        self.prompts = []
+        super().__init__(name)
+
+    def load_model(self):
+        return self
+
+    def get_model_name(self):
+        return self.name
+
+    def generate(self, prompt, schema=None):
+        self.prompts.append(prompt)
+        if schema is None:
+            return self.combined
+        return schema.model_validate({"score": 7, "reason": "Individual verdict."})
+
+    async def a_generate(self, prompt, schema=None):
+        return self.generate(prompt, schema)
+
+
+def geval(name, judge, params=(LLMTestCaseParams.ACTUAL_OUTPUT,), **kwargs):
+    return GEval(name=name, evaluation_steps=[f"Is the response {name.lower()}?"],
+                 evaluation_params=list(params), model=judge, async_mode=False, **kwargs)
+
+
+def test_parse_scores():
+    criteria = [geval("Clarity", FakeJudge("")), geval("Completeness", FakeJudge(""))]
+    output = json.dumps({"scores": [
+        {"name": " clarity ", "score": 8, "reason": "Clear."},
+        {"name": "Completeness", "score": 14, "reason": "Out of range."},
+        {"name": "Unknown", "score": 5},
+        {"score": 5},
+    ]})
+    assert parse_scores(output, criteria) == {"Clarity": (8.0, "Clear.")}
+    assert parse_scores("no json here", criteria) == {}
+    assert parse_scores("[1, 2]", criteria) == {}
+
+
+def test_prompt_lists_fields_and_steps():
+    criteria = [geval("Clarity", FakeJudge("")), geval("Completeness", FakeJudge(""))]
+    prompt = build_prompt(criteria, TEST_CASE)
+    assert "Actual Output:\nAdd it to the dynamic plugins ConfigMap." in prompt
+    assert "1. Clarity\n   - Is the response clarity?" in prompt
+    assert "2. Completeness" in prompt
+
+
+def test_grouping_by_fields_and_judge():
+    judge, other_judge = FakeJudge(""), FakeJudge("", name="other-judge")
+    clarity, completeness = geval("Clarity", judge), geval("Completeness", judge)
+    with_input = geval("Relevance", judge, params=(LLMTestCaseParams.INPUT, LLMTestCaseParams.ACTUAL_OUTPUT))
+    other = geval("Tone", other_judge)
+    strict = geval("Strict", judge, strict_mode=True)
+    relevancy = AnswerRelevancyMetric(model=judge)
+
+    units = group_criteria([clarity, relevancy, with_input, completeness, other, strict])
+    assert isinstance(units[0], CriteriaGroup) and units[0].criteria == [clarity, completeness]
+    assert units[1:] == [relevancy, with_input, other, strict]
+
+
+def test_one_call_scores_every_criterion():
+    judge = FakeJudge({"scores": [{"name": "Clarity", "score": 9, "reason": "Clear."},
+                                  {"name": "Completeness", "score": 3, "reason": "Misses steps."}]})
+    clarity, completeness = geval("Clarity", judge), geval("Completeness", judge)
+    CriteriaGroup([clarity, completeness]).measure(TEST_CASE)
+    assert len(judge.prompts) == 1
+    assert (clarity.score, clarity.reason, clarity.success) == (0.9, "Clear.", True)
+    assert (completeness.score, completeness.success) == (0.3, False)
+
+
+def test_each_criterion_keeps_its_own_threshold():
+    judge = FakeJudge({"scores": [{"name": "Clarity", "score": 6, "reason": "Mostly clear."},
+                                  {"name": "Completeness", "score": 6, "reason": "Mostly complete."}]})
+    clarity, completeness = geval("Clarity", judge), geval("Completeness", judge, threshold=0.8)
+    CriteriaGroup([clarity, completeness]).measure(TEST_CASE)
+    assert (clarity.success, clarity.is_successful()) == (True, True)
+    assert (completeness.success, completeness.is_successful()) == (False, False)
+
+
+@pytest.mark.parametrize("run", ["sync", "async"])
+def test_unscored_criteria_fall_back_to_their_own_call(run):
+    judge = FakeJudge({"scores": [{"name": "Clarity", "score": 9, "reason": "Clear."}]})
+    clarity, completeness = geval("Clarity", judge), geval("Completeness", judge)
+    group = CriteriaGroup([clarity, completeness])
+    if run == "sync":
+        group.measure(TEST_CASE)
+    else:
+        asyncio.run(group.a_measure(TEST_CASE))
+    assert clarity.score == 0.9
+    assert (completeness.score, completeness.reason) == (0.7, "Individual verdict.")
+    assert len(judge.prompts) == 2
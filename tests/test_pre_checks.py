@@ -0,0 +1,84 @@
+import pytest
+from Utils.pre_checks import check_error_string, check_glitches, check_length, check_repetition, get_actions, run_pre_checks
+
+NGINX_502 = ("<html><head><title>502 Bad Gateway</title></head><body><center><h1>502 Bad Gateway</h1>"
+             "</center><hr><center>nginx</center></body></html>")
+
+
+@pytest.mark.parametrize("answer", [
+    "Error: upstream model is not available",
+    "Traceback (most recent call last):\n  File \"app.py\", line 3, in <module>\nKeyError: 'query'",
+    "503 Service Unavailable",
+    "HTTP/1.1 504 Gateway Timeout",
+    "Internal Server Error",
+    "Request timed out.",
+    NGINX_502,
+])
+def test_error_responses_are_caught(answer):
+    assert not check_error_string(answer).passed
+
+
+@pytest.mark.parametrize("answer", [
+    "If you see an internal server error, check the backend pod logs first.",
+    "A 503 Service Unavailable from the route means no backend pod is ready. Check the readiness probe.",
+    "To debug it, look for the line:\nError: ImagePullBackOff\nin the pod events.",
+    "The traceback (most recent call last) shows the failing call at the bottom, so read it upwards.",
+])
+def test_answers_about_errors_pass(answer):
+    assert check_error_string(answer).passed
+
+
+def test_custom_error_patterns_match_anywhere(monkeypatch):
+    monkeypatch.setenv("PRECHECK_ERROR_PATTERNS", r"quota exceeded;rate limit")
+    assert not check_error_string("Sorry, the model quota exceeded its daily limit, try again later.").passed
+
+
+@pytest.mark.parametrize("answer", ["Tell me moooore", "The cCCCCell is empty", "it is is is broken"])
+def test_glitches_are_found(answer):
+    assert not check_glitches(answer).passed
+
+
+@pytest.mark.parametrize("answer", [
+    "Bind the service to 0.0.0.0 so it listens on every interface.",
+    "Add an AAAA record for the IPv6 address.",
+    "Use #FFFFFF or #ffffff for the background.",
+    "The commit deadbeef fixed it, see release 1.1.1.",
+])
+def test_numbers_hex_and_acronyms_are_not_glitches(answer):
+    assert check_glitches(answer).passed
+
+
+def test_length_bounds(monkeypatch):
+    monkeypatch.setenv("PRECHECK_MIN_CHARS", "5")
+    monkeypatch.setenv("PRECHECK_MAX_CHARS", "10")
+    assert not check_length("hey").passed
+    assert check_length("  hello  ").passed
+    assert not check_length("hello world!").passed
+
+
+def test_repetition_flags_looping_answers():
+    looping = "install the operator and " * 10
+    assert not check_repetition(looping).passed
+    assert check_repetition("Install the operator from OperatorHub, then create a Backstage instance "
+                            "in its namespace and open the route it exposes in a browser.").passed
+
+
+def test_actions_decide_the_outcome(monkeypatch):
+    report = run_pre_checks("The cCCCCell is empty")
+    assert not report.results["glitch"].passed
+    assert report.failures == [] and not report.skipped_metrics
+
+    monkeypatch.setenv("PRECHECK_ACTIONS", "glitch=skip:clarity,completeness")
+    report = run_pre_checks("The cCCCCell is empty")
+    assert report.skips("clarity") and not report.skips("relevancy")
+
+    assert [r.name for r in run_pre_checks("Internal Server Error").failures] == ["error_string"]
+
+
+def test_invalid_actions_are_rejected(monkeypatch):
+    monkeypatch.setenv("PRECHECK_ACTIONS", "glitch=ignore")
+    with pytest.raises(ValueError):
+        get_actions()
+    monkeypatch.setenv("PRECHECK_ACTIONS", "typos=warn")
+    with pytest.raises(ValueError):
+        get_actions()
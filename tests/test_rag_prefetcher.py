@@ -0,0 +1,38 @@
+import time
+from Utils import rag_respose
+from Utils.model_matrix import ModelTarget
+from Utils.rag_respose import RagPrefetcher, RagResult
+
+DELAYS = {"slow question": 0.3, "fast question": 0.0, "medium question": 0.1}
+
+
+def fake_fetch(question, target=None, verbose=True):
+    time.sleep(DELAYS[question])
+    return RagResult(answer=f"{question} [{target.label if target else 'default'}]", rag_time=DELAYS[question])
+
+
+def test_answers_are_yielded_as_they_complete(monkeypatch):
+    monkeypatch.setattr(rag_respose, "fetch_rag_answer", fake_fetch)
+    prefetcher = RagPrefetcher(list(DELAYS), max_in_flight=3)
+    try:
+        completed = [(question, target, result.answer) for question, target, result in prefetcher.iter_completed()]
+    finally:
+        prefetcher.shutdown()
+    assert completed == [
+        ("fast question", None, "fast question [default]"),
+        ("medium question", None, "medium question [default]"),
+        ("slow question", None, "slow question [default]"),
+    ]
+
+
+def test_excluded_answers_are_left_out(monkeypatch):
+    monkeypatch.setattr(rag_respose, "fetch_rag_answer", fake_fetch)
+    targets = [ModelTarget("vllm", "a"), ModelTarget("vllm", "b")]
+    for enabled in (True, False):
+        prefetcher = RagPrefetcher(["fast question", "medium question"], targets=targets, enabled=enabled,
+                                   exclude={("fast question", "vllm/a")})
+        try:
+            completed = {(question, target.label) for question, target, _ in prefetcher.iter_completed()}
+        finally:
+            prefetcher.shutdown()
+        assert completed == {("fast question", "vllm/b"), ("medium question", "vllm/a"), ("medium question", "vllm/b")}
@@ -0,0 +1,188 @@
+import random
+import pytest
+from Utils import rag_scheduler
+from Utils.model_matrix import ModelTarget
+from Utils.rag_respose import RagResult
+from Utils.rag_scheduler import (AdaptiveLimiter, RequestScheduler, RetrySettings, RetryBudget, backoff_delay,
+                                 parse_retry_after, merge_stats, merge_model_stats, get_scheduler,
+                                 scheduler_stats_delta, format_stats)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def ok(ttft=0.5):
+    return RagResult(answer="answer", rag_time=1.0, status=200, ttft=ttft)
+
+
+def failed(status, retry_after=None):
+    return RagResult(answer="", rag_time=0.0, error=f"HTTP {status}", status=status, retry_after=retry_after)
+
+
+def make_scheduler(responses, **settings):
+    # Replays `responses` as the outcomes of consecutive attempts; sleeps are recorded, not taken
+    sleeps = []
+    limiter = AdaptiveLimiter(max_limit=4, clock=FakeClock())
+    scheduler = RequestScheduler(limiter, RetrySettings(**settings), sleep=sleeps.append)
+    outcomes = iter(responses)
+    return scheduler, (lambda: next(outcomes)), sleeps
+
+
+def run_once(limiter, latency=None, congested=False):
+    limiter.release(limiter.acquire(), congested, latency)
+
+
+def test_limit_grows_additively_and_halves_once_per_episode():
+    clock = FakeClock()
+    limiter = AdaptiveLimiter(max_limit=8, initial=4, clock=clock)
+    for _ in range(4):
+        run_once(limiter)
+    assert 4.9 < limiter.limit < 5.0
+
+    # Three requests in flight when the backend throttles report one congestion episode
+    starts = [limiter.acquire() for _ in range(3)]
+    clock.now = 1.0
+    for started in starts:
+        limiter.release(started, congested=True)
+    assert limiter.limit == pytest.approx(4.95 / 2, abs=0.05)
+    assert limiter.decreases == 1
+
+    clock.now = 2.0
+    run_once(limiter, congested=True)
+    assert limiter.decreases == 2
+
+
+def test_limit_stays_within_bounds():
+    limiter = AdaptiveLimiter(max_limit=2, min_limit=1, clock=FakeClock())
+    for _ in range(20):
+        run_once(limiter)
+    assert limiter.limit == 2
+    for step in range(5):
+        limiter.clock.now = step + 1
+        run_once(limiter, congested=True)
+    assert limiter.limit == 1
+
+
+def test_baseline_is_the_median_of_recent_answers():
+    limiter = AdaptiveLimiter(max_limit=4, baseline_window=5, min_samples=3, clock=FakeClock())
+    run_once(limiter, latency=0.05)
+    assert limiter.baseline is None
+    for latency in (1.0, 1.1, 0.9):
+        run_once(limiter, latency=latency)
+    # One unusually fast answer doesn't make every normal one look congested
+    assert limiter.baseline == pytest.approx(0.95)
+    for latency in (2.0, 2.0, 2.1):
+        run_once(limiter, latency=latency)
+    # The window moves on with a backend that is now consistently slower
+    assert limiter.baseline == pytest.approx(2.0)
+    assert limiter.decreases == 0
+
+
+def test_latency_well_above_the_baseline_is_congestion():
+    clock = FakeClock()
+    limiter = AdaptiveLimiter(max_limit=8, initial=4, latency_tolerance=2.0, min_samples=3, clock=clock)
+    for _ in range(3):
+        run_once(limiter, latency=1.0)
+    limit = limiter.limit
+    clock.now = 1.0
+    run_once(limiter, latency=2.9)
+    assert limiter.decreases == 0
+    clock.now = 2.0
+    run_once(limiter, latency=3.5)
+    assert limiter.decreases == 1
+    assert limiter.limit < limit
+
+
+def test_retries_overload_with_backoff():
+    scheduler, send, sleeps = make_scheduler([failed(503), failed(502), ok()], max_attempts=4, base_delay=1.0)
+    result = scheduler.run(send)
+    assert result.ok and result.attempts == 3
+    assert len(sleeps) == 2 and all(0 <= delay <= 2.0 for delay in sleeps)
+    stats = scheduler.stats_delta()
+    assert (stats["requests"], stats["attempts"], stats["retries"], stats["throttled"], stats["failed"]) == (1, 3, 2, 1, 0)
+    assert scheduler.stats_delta()["attempts"] == 0
+
+
+def test_gives_up_after_max_attempts():
+    scheduler, send, sleeps = make_scheduler([failed(503)] * 3, max_attempts=3)
+    result = scheduler.run(send)
+    assert not result.ok and result.attempts == 3
+    assert len(sleeps) == 2
+    assert scheduler.stats_delta()["failed"] == 1
+
+
+def test_client_errors_are_not_retried():
+    scheduler, send, sleeps = make_scheduler([failed(400)])
+    assert scheduler.run(send).attempts == 1
+    assert sleeps == []
+
+
+def test_honours_retry_after_up_to_the_limit():
+    scheduler, send, sleeps = make_scheduler([failed(429, retry_after=5), ok()], base_delay=0.5)
+    assert scheduler.run(send).ok
+    assert 5 <= sleeps[0] <= 5.5
+
+    scheduler, send, sleeps = make_scheduler([failed(429, retry_after=600)], max_retry_after=120)
+    assert not scheduler.run(send).ok
+    assert sleeps == []
+
+
+def test_retry_budget_caps_retries():
+    scheduler, send, sleeps = make_scheduler([failed(503), failed(503)], max_attempts=4)
+    scheduler.budget = RetryBudget(ratio=0.0, minimum=1)
+    assert not scheduler.run(send).ok
+    assert len(sleeps) == 1
+    assert scheduler.stats_delta()["budget_exhausted"] == 1
+
+
+def test_backoff_delay():
+    settings = RetrySettings(base_delay=0.5, max_delay=4.0, max_retry_after=60)
+    rng = random.Random(1)
+    assert all(0 <= backoff_delay(10, settings, rng=rng) <= 4.0 for _ in range(50))
+    assert backoff_delay(1, settings, retry_after=90) is None
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_merge_stats_skips_idle_deltas():
+    total = merge_stats({}, {"attempts": 2, "requests": 2, "limit_min": 2.0, "limit_max": 3.0, "limit": 3.0})
+    merge_stats(total, {"attempts": 0, "requests": 0, "limit_min": 1.0, "limit_max": 1.0, "limit": 1.0})
+    merge_stats(total, {"attempts": 1, "requests": 1, "limit_min": 1.5, "limit_max": 2.0, "limit": 2.0})
+    assert total == {"attempts": 3, "requests": 3, "limit_min": 1.5, "limit_max": 3.0, "limit": 2.0}
+
+
+def test_one_scheduler_per_model(monkeypatch):
+    monkeypatch.setattr(rag_scheduler, "_schedulers", {})
+    monkeypatch.setattr(rag_scheduler, "_budget", None)
+    fast, slow = ModelTarget("vllm", "granite-8b"), ModelTarget("vllm", "llama-70b")
+    assert get_scheduler(fast) is get_scheduler(fast)
+    assert get_scheduler(fast) is not get_scheduler(slow)
+    assert get_scheduler(fast).budget is get_scheduler(slow).budget
+
+    # The slow model's congestion lowers only its own limit
+    limit = get_scheduler(fast).limiter.limit
+    get_scheduler(slow).run(lambda: failed(400))
+    get_scheduler(slow).limiter.release(get_scheduler(slow).limiter.acquire(), congested=True)
+    assert get_scheduler(fast).limiter.limit == limit
+    assert get_scheduler(slow).limiter.limit < limit
+
+    totals = merge_model_stats({}, scheduler_stats_delta())
+    assert totals["vllm/llama-70b"]["requests"] == 1
+    assert totals["vllm/granite-8b"] == {}
+
+
+def test_format_stats_shows_the_baseline_once_known():
+    stats = {"requests": 3, "limit_min": 1.0, "limit_max": 2.0, "busy_sec": 3.0, "active_sec": 2.0, "baseline_sec": None}
+    assert "baseline" not in format_stats(stats)
+    assert format_stats({**stats, "baseline_sec": 0.42}).endswith("| TTFT baseline 0.42 sec")
+    assert "achieved mean 1.5" in format_stats(stats)
@@ -0,0 +1,116 @@
+import pytest
+from importlib import metadata
+import pandas as pd
+from Utils.regression_gate import GateSettings, RUN_LEVEL, evaluate_regressions, gate_failures, lower_is_better
+
+BASELINE = {"relevancy": 0.9, "bias": 0.1, "rag_time_sec": 2.0}
+
+
+def history(current: dict, runs: int = 5, question: str = "q1"):
+    # `runs` stable earlier runs of one question, then the current run "now"
+    rows = [
+        {"run_id": f"run-{i}", "question": question, "timestamp": pd.Timestamp("2026-01-01") + pd.Timedelta(days=i),
+         **{metric: value + (0.01 if metric != "rag_time_sec" else 0.05) * (i % 2) for metric, value in BASELINE.items()}}
+        for i in range(runs)
+    ]
+    rows.append({"run_id": "now", "question": question, "timestamp": pd.Timestamp("2026-02-01"),
+                 **{**BASELINE, **current}})
+    return pd.DataFrame(rows)
+
+
+def status(results, metric, question="q1"):
+    return results[(results["question"] == question) & (results["metric"] == metric)]["status"].item()
+
+
+def test_stable_run_is_ok():
+    results = evaluate_regressions(history({}), "now", GateSettings())
+    assert set(results["status"]) == {"ok"}
+    assert gate_failures(results, GateSettings(mode="all")).empty
+
+
+def test_violation_scores_regress_upwards_under_deepeval_3():
+    lower_better = ["bias", "hallucination"]
+    results = evaluate_regressions(history({"relevancy": 0.5, "bias": 0.5}), "now", GateSettings(), lower_better)
+    assert status(results, "relevancy") == "regressed"
+    assert status(results, "bias") == "regressed"
+
+    results = evaluate_regressions(history({"relevancy": 1.0, "bias": 0.0}), "now", GateSettings(min_delta=0.05),
+                                   lower_better)
+    assert status(results, "relevancy") == "improved"
+    assert status(results, "bias") == "improved"
+
+
+def test_every_score_regresses_downwards_under_deepeval_4():
+    # BASELINE's bias of 0.1 reads as a failing score here
+    results = evaluate_regressions(history({"bias": 0.0}), "now", GateSettings(min_delta=0.05), [])
+    assert status(results, "bias") == "regressed"
+    results = evaluate_regressions(history({"bias": 0.5}), "now", GateSettings(), [])
+    assert status(results, "bias") == "improved"
+
+
+@pytest.mark.parametrize("version, expected", [
+    ("3.3.3", ("bias", "hallucination")),
+    ("4.2.8", ()),
+    (None, ("bias", "hallucination")),
+])
+def test_direction_follows_the_installed_deepeval(monkeypatch, version, expected):
+    def fake_version(name):
+        if version is None:
+            raise metadata.PackageNotFoundError(name)
+        return version
+
+    monkeypatch.setattr(metadata, "version", fake_version)
+    lower_is_better.cache_clear()
+    try:
+        assert lower_is_better() == expected
+        results = evaluate_regressions(history({"bias": 0.5}), "now", GateSettings())
+        assert status(results, "bias") == ("regressed" if expected else "improved")
+    finally:
+        lower_is_better.cache_clear()
+
+
+def test_min_delta_absorbs_small_changes():
+    results = evaluate_regressions(history({"relevancy": 0.82}), "now", GateSettings(min_delta=0.1))
+    assert status(results, "relevancy") == "ok"
+
+
+def test_latency_against_baseline_p95():
+    results = evaluate_regressions(history({"rag_time_sec": 3.0}), "now", GateSettings(latency_tolerance=0.2))
+    assert status(results, "rag_time_sec") == "regressed"
+    assert status(results, "rag_time_sec p95", RUN_LEVEL) == "regressed"
+    row = results[results["metric"] == "rag_time_sec"].iloc[0]
+    assert row["kind"] == "latency"
+    assert row["limit"] == pytest.approx(row["baseline"] * 1.2)
+
+    results = evaluate_regressions(history({"rag_time_sec": 2.2}), "now", GateSettings(latency_tolerance=0.2))
+    assert status(results, "rag_time_sec") == "ok"
+
+
+def test_insufficient_history():
+    results = evaluate_regressions(history({"relevancy": 0.1}, runs=2), "now", GateSettings(min_samples=3))
+    assert status(results, "relevancy") == "insufficient history"
+
+
+def test_gate_modes_select_the_kind():
+    results = evaluate_regressions(history({"relevancy": 0.5, "rag_time_sec": 5.0}), "now", GateSettings())
+    assert gate_failures(results, GateSettings(mode="off")).empty
+    assert set(gate_failures(results, GateSettings(mode="quality"))["kind"]) == {"quality"}
+    assert set(gate_failures(results, GateSettings(mode="latency"))["kind"]) == {"latency"}
+    assert set(gate_failures(results, GateSettings(mode="all"))["kind"]) == {"quality", "latency"}
+    # Regressions sort first
+    assert results["status"].iloc[0] == "regressed"
+
+
+def test_no_current_rows():
+    assert evaluate_regressions(history({}), "other-run", GateSettings()).empty
+    assert evaluate_regressions(pd.DataFrame(), "now", GateSettings()).empty
+
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("REGRESSION_GATE", "Quality")
+    monkeypatch.setenv("REGRESSION_WINDOW", "4")
+    settings = GateSettings.from_env()
+    assert (settings.mode, settings.window) == ("quality", 4)
+    monkeypatch.setenv("REGRESSION_GATE", "strict")
+    with pytest.raises(ValueError):
+        GateSettings.from_env()
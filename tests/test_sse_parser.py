@@ -0,0 +1,84 @@
+import json
+from Utils.sse_parser import SSEParser, TokenStream, legacy_tokens, split_chunks, synthetic_stream
+
+
+def sse(*events) -> bytes:
+    return b"".join(b"data: " + json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n\n" for event in events)
+
+
+def token(text):
+    return {"event": "token", "data": {"token": text}}
+
+
+END = {"event": "end", "data": {}}
+
+
+def test_chunks_split_anywhere_give_the_same_tokens():
+    stream = synthetic_stream(300, seed=3)
+    expected = "".join(TokenStream([stream]))
+    for max_chunk in (1, 7, 64):
+        assert "".join(TokenStream(split_chunks(stream, max_chunk, seed=max_chunk))) == expected
+    assert "".join(legacy_tokens(split_chunks(stream, 64))[0]) == expected
+
+
+def test_utf8_sequences_split_across_chunks():
+    stream = sse(token("Développeur "), token("🚀"), END)
+    cut = stream.index("🚀".encode("utf-8")) + 2
+    assert "".join(TokenStream([stream[:cut], stream[cut:]])) == "Développeur 🚀"
+
+
+def test_multi_line_data_and_event_field():
+    parser = SSEParser()
+    payloads = parser.feed(b'event: token\ndata: {"token":\ndata:  "hi"}\n\n: comment\nid: 7\n'
+                           b'data: {"event": "end", "data": {}}\n\n')
+    assert payloads == [{"event": "token", "data": {"token": "hi"}}, END]
+    assert parser.event_counts == {"token": 1, "end": 1}
+
+
+def test_malformed_events_are_counted_not_raised():
+    parser = SSEParser()
+    assert parser.feed(b"data: {not json\n\n" + sse(token("ok"))) == [token("ok")]
+    assert parser.malformed == 1
+    assert parser.malformed_sample == "{not json"
+
+
+def test_every_line_reaches_on_line():
+    lines = []
+    parser = SSEParser(on_line=lines.append)
+    parser.feed(b'data: {"event": "start"}\r\n\r\n')
+    parser.feed(b'data: {"event": "end"}')
+    parser.close()
+    assert lines == ['data: {"event": "start"}', "", 'data: {"event": "end"}']
+
+
+def test_stops_at_end_and_error_events():
+    tokens = TokenStream([sse(token("a"), END, token("after end"))])
+    assert list(tokens) == ["a"] and tokens.stop_reason == "end"
+
+    tokens = TokenStream([sse(token("a"), {"event": "error", "data": {"response": "backend failed"}})])
+    assert list(tokens) == ["a"]
+    assert tokens.stop_reason == "error" and tokens.error == {"response": "backend failed"}
+
+
+def test_unterminated_stream_flushes_the_last_event():
+    tokens = TokenStream([sse(token("a")) + b'data: {"event": "token", "data": {"token": "b"}}'])
+    assert list(tokens) == ["a", "b"] and tokens.stop_reason == "eof"
+
+
+def test_answer_length_cap():
+    tokens = TokenStream([sse(*(token("word ") for _ in range(10)), END)], max_chars=12)
+    assert "".join(tokens) == "word word word "
+    assert tokens.stop_reason == "max_chars"
+
+
+def test_total_deadline_with_a_fake_clock():
+    now = [0.0]
+
+    def chunks():
+        for _ in range(5):
+            now[0] += 4.0
+            yield sse(token("slow "))
+
+    tokens = TokenStream(chunks(), total_timeout=10, clock=lambda: now[0])
+    assert list(tokens) == ["slow ", "slow ", "slow "]
+    assert tokens.stop_reason == "deadline"
@@ -0,0 +1,33 @@
+import sys
+import json
+from Utils.tracing import Tracer, export_otel, stage_breakdown, write_chrome_trace
+
+
+def test_spans_and_stage_breakdown():
+    tracer = Tracer()
+    tracer.add("rag.get", 0.0, 2.0)
+    tracer.add("rag.get", 2.0, 3.0, question="hi")
+    tracer.add("pre_checks", 3.0, 3.001)
+    with tracer.span("judge", metric="relevancy") as args:
+        args["cached"] = True
+    spans = tracer.drain()
+    assert tracer.drain() == []
+    assert spans[-1]["args"] == {"metric": "relevancy", "cached": True}
+
+    rows = stage_breakdown(spans)
+    assert rows[0] == {"stage": "rag.get", "count": 2, "total_sec": 3.0, "mean_ms": 1500.0,
+                       "p95_ms": rows[0]["p95_ms"], "max_ms": 2000.0}
+    assert Tracer(enabled=False).drain() == []
+
+
+def test_chrome_trace(tmp_path):
+    path = write_chrome_trace([{"name": "rag.get", "start": 1.0, "dur": 0.5, "pid": 1, "tid": 2, "args": {}}],
+                              tmp_path / "trace.json")
+    event = json.loads(path.read_text())["traceEvents"][0]
+    assert (event["ph"], event["cat"], event["ts"], event["dur"]) == ("X", "rag", 1_000_000, 500_000)
+
+
+def test_otel_export_is_skipped_without_opentelemetry(monkeypatch, capsys):
+    monkeypatch.setitem(sys.modules, "opentelemetry", None)     # makes the import fail
+    export_otel([{"name": "rag.get", "start": 1.0, "dur": 0.5, "pid": 1, "tid": 2, "args": {}}])
+    assert "Skipping the OpenTelemetry export" in capsys.readouterr().out